@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+"""
+Lifecycle manager for the Spring Boot application under test.
+
+Several pipeline stages (run_everything_fixed.py, run_bdd_tests.py,
+bdd_test_runner.py) each used to boot their own copy of the application.
+This module records the running instance (pid or container id, port and
+build hash) in a state file so later stages can reattach to a healthy
+instance of the same build instead of paying for another JVM start, and
+provides an explicit teardown for the end of the workflow.
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import logging
+import subprocess
+import requests
+
+import build_cache
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+# Parallel test shards point APP_INSTANCE_FILE at their own state file
+STATE_FILE = os.environ.get("APP_INSTANCE_FILE", ".app_instance.json")
+HEALTH_CHECK_TIMEOUT = 5
+DEFAULT_PORT = 8080
+# API_BASE_URL is the API root, e.g. http://localhost:8080/api/v1: consumers append
+# request paths such as /accounts to it. The instance state and config.json keep
+# the application root URL (http://localhost:8080); export_base_url converts.
+BASE_URL_ENV = "API_BASE_URL"
+API_PREFIX = "/api/v1"
+
+def parse_port_range(port_range):
+    """Parse a port range such as '8080-8099' into a (first, last) tuple."""
+    try:
+        first, _, last = port_range.partition("-")
+        first = int(first)
+        last = int(last) if last else first
+    except (AttributeError, ValueError):
+        logging.error(f"Invalid port range '{port_range}', expected e.g. 8080-8099")
+        return None
+    if first > last:
+        first, last = last, first
+    return first, last
+
+def is_port_free(port):
+    """Check whether nothing is listening on the given local port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind(("", port))
+            return True
+        except OSError:
+            return False
+
+def allocate_port(port_range=None):
+    """Pick a free port for a new application instance.
+
+    With a port range the first free port in it is used. Without one the
+    default port is preferred and an OS-assigned port is the fallback, so
+    several instances can run side by side on one host.
+    """
+    if port_range:
+        bounds = parse_port_range(port_range)
+        if not bounds:
+            return None
+        for port in range(bounds[0], bounds[1] + 1):
+            if is_port_free(port):
+                logging.info(f"Allocated port {port} from range {port_range}")
+                return port
+        logging.error(f"No free port in range {port_range}")
+        return None
+
+    if is_port_free(DEFAULT_PORT):
+        return DEFAULT_PORT
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("", 0))
+        port = sock.getsockname()[1]
+    logging.info(f"Port {DEFAULT_PORT} is in use, allocated free port {port}")
+    return port
+
+def container_name(port):
+    """Docker container name for the application instance on a port."""
+    if port == DEFAULT_PORT:
+        return "spring-boot-app-container"
+    return f"spring-boot-app-container-{port}"
+
+def api_root(base_url):
+    """API root for an application or API root URL, e.g. http://localhost:8080/api/v1."""
+    base_url = base_url.rstrip("/")
+    return base_url if base_url.endswith(API_PREFIX) else base_url + API_PREFIX
+
+def export_base_url(base_url):
+    """Expose the API root (see BASE_URL_ENV) to child processes such as behave."""
+    os.environ[BASE_URL_ENV] = api_root(base_url)
+    logging.info(f"Exported {BASE_URL_ENV}={os.environ[BASE_URL_ENV]}")
+
+def current_build_hash(clone_dir=None):
+    """Hash of the cloned sources, used to match a running instance to its build."""
+    if not clone_dir:
+        clone_dir = build_cache.load_config().get("clone_dir", "./gleanclone")
+    if not os.path.isdir(clone_dir):
+        return None
+    return build_cache.compute_source_hash(clone_dir)
+
+def load_instance():
+    """Load the recorded application instance, or None if there is none."""
+    if not os.path.exists(STATE_FILE):
+        return None
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (IOError, json.JSONDecodeError) as e:
+        logging.warning(f"Could not read application state file {STATE_FILE}: {e}")
+        return None
+
+def clear_instance():
+    """Forget the recorded application instance."""
+    if os.path.exists(STATE_FILE):
+        os.remove(STATE_FILE)
+
+def record_instance(process, port, build_hash=None, base_url=None):
+    """Record a started application in the state file.
+
+    `process` is either a subprocess.Popen or one of the process-like
+    wrappers from start_app.py (Docker container or Docker Compose project).
+    """
+    state = {
+        "port": port,
+        "build_hash": build_hash,
+        "base_url": base_url or f"http://localhost:{port}",
+        "started_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "owner_pid": os.getpid()
+    }
+
+    if hasattr(process, "container_id"):
+        state["kind"] = "container"
+        state["container_id"] = process.container_id
+    elif hasattr(process, "clone_dir"):
+        state["kind"] = "compose"
+        state["compose_dir"] = process.clone_dir
+    else:
+        state["kind"] = "process"
+        state["pid"] = process.pid
+
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=4)
+    logging.info(f"Recorded application instance ({state['kind']}) on port {port} in {STATE_FILE}")
+    return state
+
+def record_container(container_id, port, build_hash=None, base_url=None):
+    """Record an application started as a Docker container outside start_app.py."""
+    class _Container:
+        def __init__(self, container_id):
+            self.container_id = container_id
+    return record_instance(_Container(container_id), port, build_hash, base_url)
+
+def record_compose(compose_dir, port, build_hash=None, base_url=None):
+    """Record an application started with Docker Compose outside start_app.py."""
+    class _Compose:
+        def __init__(self, clone_dir):
+            self.clone_dir = clone_dir
+    return record_instance(_Compose(compose_dir), port, build_hash, base_url)
+
+def _is_pid_running(pid):
+    """Check whether a process with the given pid is still running."""
+    if sys.platform == "win32":
+        result = subprocess.run(
+            ["tasklist", "/FI", f"PID eq {pid}", "/NH"],
+            check=False,
+            capture_output=True,
+            text=True
+        )
+        return str(pid) in result.stdout
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def is_instance_alive(state):
+    """Check that the recorded process or container is still running."""
+    kind = state.get("kind")
+    try:
+        if kind == "process":
+            return _is_pid_running(state["pid"])
+        if kind == "container":
+            result = subprocess.run(
+                ["docker", "inspect", "-f", "{{.State.Running}}", state["container_id"]],
+                check=False,
+                capture_output=True,
+                text=True
+            )
+            return result.returncode == 0 and result.stdout.strip() == "true"
+        if kind == "compose":
+            result = subprocess.run(
+                ["docker-compose", "ps", "-q"],
+                cwd=state["compose_dir"],
+                check=False,
+                capture_output=True,
+                text=True
+            )
+            return result.returncode == 0 and bool(result.stdout.strip())
+    except (KeyError, OSError) as e:
+        logging.warning(f"Could not check application instance: {e}")
+    return False
+
+def is_instance_healthy(state):
+    """Check that the recorded instance is alive and answers HTTP requests."""
+    if not is_instance_alive(state):
+        return False
+    base_url = state.get("base_url") or f"http://localhost:{state.get('port', DEFAULT_PORT)}"
+    try:
+        response = requests.get(f"{base_url}/", timeout=HEALTH_CHECK_TIMEOUT)
+        # Any response code means the server is accepting requests
+        logging.info(f"Application instance at {base_url} responded with status code {response.status_code}")
+        return True
+    except requests.RequestException as e:
+        logging.info(f"Application instance at {base_url} is not responding: {e}")
+        return False
+
+def find_reusable_instance(build_hash=None, port=None):
+    """Return the recorded instance if it is healthy and matches the build and port.
+
+    A recorded instance that is dead, unhealthy or built from different
+    sources is torn down and forgotten so the caller can start a fresh one.
+    """
+    state = load_instance()
+    if not state:
+        return None
+
+    if port is not None and state.get("port") != port:
+        logging.info(f"Recorded application runs on port {state.get('port')}, not {port}; not reusing it")
+        return None
+
+    if build_hash and state.get("build_hash") and state["build_hash"] != build_hash:
+        logging.info("Recorded application was built from different sources; stopping it")
+        teardown_instance(state)
+        return None
+
+    if not is_instance_healthy(state):
+        logging.info("Recorded application instance is no longer healthy; discarding it")
+        teardown_instance(state)
+        return None
+
+    logging.info(f"Reusing running application instance ({state['kind']}) at {state['base_url']}")
+    return state
+
+def teardown_instance(state=None):
+    """Stop the recorded application instance and remove the state file."""
+    state = state or load_instance()
+    if not state:
+        logging.info("No recorded application instance to stop")
+        return False
+
+    kind = state.get("kind")
+    logging.info(f"Stopping application instance ({kind})...")
+    try:
+        if kind == "process" and _is_pid_running(state["pid"]):
+            if sys.platform == "win32":
+                subprocess.run(["taskkill", "/F", "/T", "/PID", str(state["pid"])], check=False, capture_output=True)
+            else:
+                os.kill(state["pid"], signal.SIGTERM)
+        elif kind == "container":
+            subprocess.run(["docker", "rm", "-f", state["container_id"]], check=False, capture_output=True)
+        elif kind == "compose":
+            subprocess.run(["docker-compose", "down"], cwd=state["compose_dir"], check=False, capture_output=True)
+    except (KeyError, OSError) as e:
+        logging.warning(f"Error stopping application instance: {e}")
+
+    clear_instance()
+    logging.info("Application instance stopped")
+    return True
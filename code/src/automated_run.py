@@ -113,13 +113,10 @@ def run_with_automatic_fixes():
     )
     logging.info(f"Enhanced step generator output: {result.stdout}")
     
-    # Step 3: Fix apostrophe issues in the generated file
+    # Step 3: Verify the generated file (string literals are escaped by the generator)
     if api_steps_path.exists():
-        fix_apostrophe_issues(api_steps_path)
-        
-        # Verify the syntax is correct
         if not check_syntax(api_steps_path):
-            logging.error("Syntax check failed after fixing apostrophe issues")
+            logging.error("Syntax check failed for the generated step definitions")
             return 1
     else:
         logging.error(f"Generated step definitions file not found at {api_steps_path}")
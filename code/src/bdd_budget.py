@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+"""
+Time budgets and fail-fast for behave runs.
+
+The runner side (run_with_budget) starts behave with a whole-run timeout and
+passes the per-step and per-scenario budgets and the failure limit to the
+environment.py hooks through environment variables. Inside behave the hooks:
+
+- give every `requests` call a timeout of whatever is left of the step and
+  scenario budget, so a hung backend fails the step instead of blocking;
+- fail the remaining steps of a scenario once its budget is spent;
+- abort the run after --max-failures failed scenarios (--fail-fast is 1);
+- run a watchdog that ends the process when a step hangs outside of HTTP.
+
+Every timeout is written to a JSON report naming the feature, scenario and
+step that ran out of time. The scenario and step clocks are kept per thread,
+so load_test can run scenarios of several virtual users at once.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import subprocess
+
+import requests
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+STEP_TIMEOUT_ENV = "BDD_STEP_TIMEOUT"
+SCENARIO_TIMEOUT_ENV = "BDD_SCENARIO_TIMEOUT"
+MAX_FAILURES_ENV = "BDD_MAX_FAILURES"
+REPORT_ENV = "BDD_BUDGET_REPORT"
+DEFAULT_STEP_TIMEOUT = 30
+DEFAULT_SCENARIO_TIMEOUT = 120
+DEFAULT_RUN_TIMEOUT = 900
+REPORT_FILE = os.path.join("summary", "bdd_test_cases", "reports", "bdd_budget_report.json")
+TIMEOUT_EXIT_CODE = 124
+WATCHDOG_GRACE = 5
+WATCHDOG_INTERVAL = 0.5
+FAILED_STATUSES = ("failed", "error", "hook_error")
+
+_original_request = requests.Session.request
+_active = None
+
+class BudgetExceeded(Exception):
+    """Raised when a scenario has used up its time budget."""
+
+class ScenarioClock(threading.local):
+    """Scenario and step clocks of the current thread."""
+
+    def __init__(self):
+        self.scenario = None
+        self.scenario_start = None
+        self.scenario_expired = False
+        self.step = None
+        self.step_start = None
+
+class Budget:
+    """Budgets, failure count and timeout records of one behave run."""
+
+    def __init__(self, step_timeout, scenario_timeout, max_failures, report_file):
+        self.step_timeout = step_timeout
+        self.scenario_timeout = scenario_timeout
+        self.max_failures = max_failures
+        self.report_file = report_file
+        self.failures = 0
+        self.aborted = False
+        self.timeouts = []
+        self.lock = threading.Lock()
+        self.clock = ScenarioClock()
+        # Steps in progress per thread, for the watchdog: thread id -> (step, start, scenario)
+        self.running = {}
+
+    @classmethod
+    def from_env(cls):
+        """Read the budgets the runner passed through the environment."""
+        return cls(
+            float(os.environ.get(STEP_TIMEOUT_ENV, DEFAULT_STEP_TIMEOUT)),
+            float(os.environ.get(SCENARIO_TIMEOUT_ENV, DEFAULT_SCENARIO_TIMEOUT)),
+            int(os.environ.get(MAX_FAILURES_ENV, 0)),
+            os.environ.get(REPORT_ENV, REPORT_FILE)
+        )
+
+    def remaining(self):
+        """Seconds left of the current step and scenario budgets, or None outside a step."""
+        now = time.monotonic()
+        clock = self.clock
+        limits = []
+        if clock.step_start is not None and self.step_timeout:
+            limits.append(clock.step_start + self.step_timeout - now)
+        if clock.scenario_start is not None and self.scenario_timeout:
+            limits.append(clock.scenario_start + self.scenario_timeout - now)
+        return min(limits) if limits else None
+
+    def record_timeout(self, kind, elapsed, limit, step=None, scenario=None):
+        """Remember which scenario (and step) ran out of time; the current thread's scenario by default."""
+        scenario = scenario or self.clock.scenario
+        entry = {
+            "kind": kind,
+            "feature": getattr(getattr(scenario, "feature", None), "name", None),
+            "scenario": getattr(scenario, "name", None),
+            "location": str(getattr(step or scenario, "location", "")),
+            "step": f"{step.keyword} {step.name}" if step is not None else None,
+            "elapsed_s": round(elapsed, 2),
+            "budget_s": limit
+        }
+        with self.lock:
+            self.timeouts.append(entry)
+        logging.error(f"{kind.capitalize()} timeout after {entry['elapsed_s']}s (budget {limit}s): "
+                      f"{entry['scenario']} {entry['step'] or ''} at {entry['location']}")
+        return entry
+
+    def to_dict(self):
+        """Budgets, failures and timeouts for the JSON report."""
+        return {
+            "step_timeout_s": self.step_timeout,
+            "scenario_timeout_s": self.scenario_timeout,
+            "max_failures": self.max_failures,
+            "failed_scenarios": self.failures,
+            "aborted": self.aborted,
+            "timeouts": list(self.timeouts)
+        }
+
+    def save(self):
+        """Write the timeout report."""
+        write_report(self.report_file, self.to_dict())
+
+def write_report(report_file, report):
+    """Write a budget report, creating its directory."""
+    report_dir = os.path.dirname(report_file)
+    if report_dir:
+        os.makedirs(report_dir, exist_ok=True)
+    with open(report_file, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+def _budget_request(session, method, url, **kwargs):
+    """Replacement for requests.Session.request that never waits past the budget."""
+    remaining = _active.remaining() if _active else None
+    if remaining is None and _active:
+        # Outside a step (e.g. the API check in before_all) a request gets one step budget
+        remaining = _active.step_timeout or None
+    if remaining is not None:
+        if remaining <= 0:
+            raise requests.Timeout(f"Time budget exhausted before {method} {url}")
+        timeout = kwargs.get("timeout")
+        if timeout is None or (isinstance(timeout, (int, float)) and timeout > remaining):
+            kwargs["timeout"] = remaining
+    return _original_request(session, method, url, **kwargs)
+
+def _watchdog(budget):
+    """End the run when a step hangs past its budget without returning."""
+    while _active is budget:
+        time.sleep(WATCHDOG_INTERVAL)
+        if not budget.step_timeout:
+            continue
+        with budget.lock:
+            running = list(budget.running.values())
+        now = time.monotonic()
+        hung = [(now - start, step, scenario) for step, start, scenario in running
+                if now - start > budget.step_timeout + WATCHDOG_GRACE]
+        if hung:
+            elapsed, step, scenario = hung[0]
+            budget.record_timeout("step", elapsed, budget.step_timeout, step, scenario)
+            budget.aborted = True
+            budget.save()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(TIMEOUT_EXIT_CODE)
+
+def install():
+    """Activate the budgets for this behave process; call from before_all."""
+    global _active, _original_request
+    if _active is not None:
+        return _active
+    if requests.Session.request is not _budget_request:
+        _original_request = requests.Session.request
+    _active = Budget.from_env()
+    requests.Session.request = _budget_request
+    threading.Thread(target=_watchdog, args=(_active,), name="bdd-budget-watchdog", daemon=True).start()
+    logging.info(f"Time budgets: {_active.step_timeout}s per step, {_active.scenario_timeout}s per scenario"
+                 + (f", stop after {_active.max_failures} failed scenarios" if _active.max_failures else ""))
+    return _active
+
+def before_scenario(context, scenario):
+    """Start the scenario clock."""
+    if _active:
+        _active.clock.scenario = scenario
+        _active.clock.scenario_start = time.monotonic()
+        _active.clock.scenario_expired = False
+
+def before_step(context, step):
+    """Fail the step if the scenario budget is spent, otherwise start the step clock."""
+    if not _active:
+        return
+    clock = _active.clock
+    if _active.scenario_timeout and clock.scenario_start is not None:
+        elapsed = time.monotonic() - clock.scenario_start
+        if elapsed > _active.scenario_timeout:
+            if not clock.scenario_expired:
+                clock.scenario_expired = True
+                _active.record_timeout("scenario", elapsed, _active.scenario_timeout, step)
+            raise BudgetExceeded(f"Scenario budget of {_active.scenario_timeout}s exhausted")
+    clock.step = step
+    clock.step_start = time.monotonic()
+    with _active.lock:
+        _active.running[threading.get_ident()] = (step, clock.step_start, clock.scenario)
+
+def after_step(context, step):
+    """Record steps that timed out or overran their budget."""
+    if not _active or _active.clock.step_start is None:
+        return
+    clock = _active.clock
+    elapsed = time.monotonic() - clock.step_start
+    with _active.lock:
+        _active.running.pop(threading.get_ident(), None)
+    timed_out = isinstance(getattr(step, "exception", None), requests.Timeout)
+    if timed_out or (_active.step_timeout and elapsed > _active.step_timeout):
+        _active.record_timeout("step", elapsed, _active.step_timeout, step)
+    clock.step = None
+    clock.step_start = None
+
+def after_scenario(context, scenario):
+    """Count failed scenarios and abort the run once the failure limit is hit."""
+    if not _active:
+        return
+    _active.clock.scenario_start = None
+    # behave 1.3 reports non-assertion exceptions (e.g. timeouts) as "error"
+    if getattr(scenario.status, "name", str(scenario.status)) not in FAILED_STATUSES:
+        return
+    with _active.lock:
+        _active.failures += 1
+        abort = _active.max_failures and _active.failures >= _active.max_failures and not _active.aborted
+        if abort:
+            _active.aborted = True
+    if abort:
+        reason = f"Stopping after {_active.failures} failed scenarios"
+        logging.warning(reason)
+        if hasattr(context, "abort"):
+            context.abort(reason)
+        else:
+            context._runner.aborted = True
+
+def after_all(context):
+    """Write the timeout report and restore `requests`."""
+    global _active
+    if not _active:
+        return
+    budget = _active
+    _active = None
+    if requests.Session.request is _budget_request:
+        requests.Session.request = _original_request
+    budget.save()
+    if budget.timeouts:
+        logging.warning(f"{len(budget.timeouts)} timeouts recorded in {budget.report_file}")
+
+def add_budget_arguments(parser):
+    """Add the time budget and fail-fast options to a runner's argument parser."""
+    parser.add_argument("--step-timeout", type=float, default=DEFAULT_STEP_TIMEOUT, help="Seconds a single step may take")
+    parser.add_argument("--scenario-timeout", type=float, default=DEFAULT_SCENARIO_TIMEOUT, help="Seconds a scenario may take")
+    parser.add_argument("--run-timeout", type=float, default=DEFAULT_RUN_TIMEOUT, help="Seconds the whole behave run may take")
+    parser.add_argument("--fail-fast", action="store_true", help="Stop at the first failed scenario")
+    parser.add_argument("--max-failures", type=int, default=0, help="Stop after this many failed scenarios (0 = no limit)")
+
+def budget_from_args(args):
+    """Budget settings for run_with_budget from parsed runner arguments."""
+    return {
+        "step_timeout": args.step_timeout,
+        "scenario_timeout": args.scenario_timeout,
+        "run_timeout": args.run_timeout,
+        "max_failures": 1 if args.fail_fast else args.max_failures
+    }
+
+def budget_to_args(budget):
+    """Command-line options that pass a budget on to another runner script."""
+    if not budget:
+        return []
+    return [
+        "--step-timeout", str(budget["step_timeout"]),
+        "--scenario-timeout", str(budget["scenario_timeout"]),
+        "--run-timeout", str(budget["run_timeout"]),
+        "--max-failures", str(budget["max_failures"])
+    ]
+
+def run_with_budget(cmd, step_timeout=DEFAULT_STEP_TIMEOUT, scenario_timeout=DEFAULT_SCENARIO_TIMEOUT,
+                    run_timeout=DEFAULT_RUN_TIMEOUT, max_failures=0, report_file=REPORT_FILE, **kwargs):
+    """Run a behave command under the time budgets.
+
+    Returns a CompletedProcess. When the whole run exceeds run_timeout the
+    process is killed, the timeout is added to the report and the return
+    code is TIMEOUT_EXIT_CODE.
+    """
+    report_file = os.path.abspath(report_file)
+    env = dict(kwargs.pop("env", None) or os.environ)
+    env[STEP_TIMEOUT_ENV] = str(step_timeout or 0)
+    env[SCENARIO_TIMEOUT_ENV] = str(scenario_timeout or 0)
+    env[MAX_FAILURES_ENV] = str(max_failures or 0)
+    env[REPORT_ENV] = report_file
+    if os.path.exists(report_file):
+        os.remove(report_file)
+
+    start = time.monotonic()
+    try:
+        return subprocess.run(cmd, check=False, timeout=run_timeout or None, env=env, **kwargs)
+    except subprocess.TimeoutExpired as e:
+        elapsed = time.monotonic() - start
+        logging.error(f"BDD run exceeded its {run_timeout}s budget and was stopped after {elapsed:.1f}s")
+        report = load_report(report_file) or {"timeouts": []}
+        report["aborted"] = True
+        report["timeouts"].append({"kind": "run", "elapsed_s": round(elapsed, 2), "budget_s": run_timeout})
+        write_report(report_file, report)
+        text = kwargs.get("text") and kwargs.get("capture_output")
+        return subprocess.CompletedProcess(cmd, TIMEOUT_EXIT_CODE, _partial_output(e.stdout, text), _partial_output(e.stderr, text))
+
+def _partial_output(output, text):
+    """Output captured before a kill comes back as bytes (or None) even in text mode."""
+    if not text:
+        return output
+    if isinstance(output, bytes):
+        return output.decode("utf-8", errors="replace")
+    return output or ""
+
+def load_report(report_file=REPORT_FILE):
+    """Load a budget report, or None if the run did not write one."""
+    try:
+        with open(report_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def log_report(report_file=REPORT_FILE):
+    """Log the timeouts of the last run; return the number of timeouts."""
+    report = load_report(report_file)
+    if not report:
+        return 0
+    for entry in report.get("timeouts", []):
+        where = " ".join(str(part) for part in (entry.get("scenario"), entry.get("step"), entry.get("location")) if part)
+        logging.error(f"{entry['kind'].capitalize()} timeout ({entry['elapsed_s']}s of {entry['budget_s']}s) {where}".rstrip())
+    if report.get("aborted"):
+        logging.error("The BDD run was aborted early")
+    return len(report.get("timeouts", []))
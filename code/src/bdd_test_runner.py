@@ -15,6 +15,11 @@ import json
 import re
 from pathlib import Path
 import requests
+
+import app_lifecycle
+import bdd_budget
+import step_builder
+
 # Import behave only when needed, after verifying installation
 
 # Setup logging
@@ -27,6 +32,7 @@ BEHAVE_DIR = "behave_tests"
 FEATURES_DIR = os.path.join(BEHAVE_DIR, "features")
 STEPS_DIR = os.path.join(BEHAVE_DIR, "features", "steps")
 CONFIG_FILE = "config.json"
+BUDGET_REPORT_FILE = os.path.join(BEHAVE_DIR, "reports", "bdd_budget_report.json")
 
 def setup_behave_environment():
     """Set up the Behave environment structure."""
@@ -48,11 +54,28 @@ def setup_behave_environment():
             f.write('''
 import os
 import sys
-import logging
 import json
+import logging
+import importlib
 import requests
 from behave import *
 
+def optional_import(name):
+    """The named module, or None when it cannot be imported."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+# Optional record/replay of HTTP traffic (HTTP_CASSETTE_MODE=record|replay)
+http_cassette = optional_import("http_cassette")
+# Optional per-endpoint request latency histograms
+step_metrics = optional_import("step_metrics")
+# Optional per-step/per-scenario time budgets and fail-fast (see bdd_budget.py)
+bdd_budget = optional_import("bdd_budget")
+# Optional pre-seeded account pool shared across scenarios (see account_pool.py)
+account_pool = optional_import("account_pool")
+
 # Load configuration
 def load_config():
     config_file = "config.json"
@@ -65,21 +88,76 @@ def load_config():
 def before_all(context):
     """Setup before all tests."""
     config = load_config()
-    context.base_url = config.get("api_base_url", "http://localhost:8080")
+    # Record or replay HTTP traffic instead of only talking to the live API
+    context.cassette = http_cassette.install_from_env() if http_cassette else None
+    # Time every request the steps make, including retries and connection errors
+    context.step_metrics = step_metrics.install() if step_metrics else None
+    # Bound every request by the step and scenario budgets set by the runner
+    if bdd_budget:
+        bdd_budget.install()
+    # behave -D base_url=... and API_BASE_URL from the launcher take precedence over config.json.
+    # API_BASE_URL is the API root; these steps add the /api/v1 prefix themselves.
+    context.base_url = (
+        context.config.userdata.get("base_url")
+        or os.environ.get("API_BASE_URL")
+        or config.get("api_base_url", "http://localhost:8080")
+    ).rstrip("/")
+    if context.base_url.endswith("/api/v1"):
+        context.base_url = context.base_url[:-len("/api/v1")]
     context.headers = {"Content-Type": "application/json"}
     context.last_response = None
     logging.basicConfig(level=logging.INFO)
     logging.info(f"Using base URL: {context.base_url}")
+    
+    # Verify API is accessible
+    api_available = False
+    try:
+        requests.get(context.base_url, timeout=5)
+        api_available = True
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        logging.warning(f"Could not access API at {context.base_url}; the account pool is not seeded")
+    
+    # Seed the account pool once the API answers; the steps check accounts out instead of creating them
+    use_pool = account_pool and api_available and not getattr(context, "mock_api", False)
+    context.account_pool = account_pool.install(context, "api/v1/accounts") if use_pool else None
 
 def before_scenario(context, scenario):
     """Setup before each scenario."""
     context.scenario_data = {}
     context.auth_token = None
+    if bdd_budget:
+        bdd_budget.before_scenario(context, scenario)
     logging.info(f"Running scenario: {scenario.name}")
 
+def before_step(context, step):
+    """Start the step time budget."""
+    if bdd_budget:
+        bdd_budget.before_step(context, step)
+
+def after_step(context, step):
+    """Record steps that ran out of time."""
+    if bdd_budget:
+        bdd_budget.after_step(context, step)
+
 def after_scenario(context, scenario):
     """Cleanup after each scenario."""
     logging.info(f"Completed scenario: {scenario.name} - Status: {scenario.status}")
+    if account_pool:
+        account_pool.after_scenario(context, scenario)
+    if bdd_budget:
+        bdd_budget.after_scenario(context, scenario)
+
+def after_all(context):
+    """Write budget and latency reports and save or release the HTTP cassette."""
+    if account_pool:
+        account_pool.after_all(context)
+    if bdd_budget:
+        bdd_budget.after_all(context)
+    if context.step_metrics:
+        step_metrics.uninstall()
+        step_metrics.dump(context.step_metrics, os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports", "step_latency.json"))
+    if context.cassette:
+        http_cassette.uninstall()
 ''')
     
     logging.info("Behave environment setup completed")
@@ -150,9 +228,8 @@ def generate_step_definitions(skip_existing=False):
         logging.info(f"Skipping step definitions generation as {step_file} already exists")
         return True
     
-    # We'll generate a more comprehensive step definitions file that handles all API scenarios
-    with open(step_file, 'w', encoding='utf-8') as f:
-        f.write('''
+    # A comprehensive step definitions file that handles all API scenarios
+    code = '''
 import os
 import json
 import requests
@@ -209,7 +286,11 @@ def step_impl(context):
     context.headers["Authorization"] = f"Bearer {context.auth_token}"
     
     # Create an account for the authenticated user if needed
-    if not hasattr(context, 'account_details'):
+    pooled = context.account_pool.checkout(context) if getattr(context, 'account_pool', None) else None
+    if pooled:
+        context.account_details = pooled[1]
+        logger.info(f"Using pooled account for authenticated user: {context.account_details}")
+    elif not hasattr(context, 'account_details'):
         # First create an account
         account_details = generate_account_details()
         response = requests.put(
@@ -425,6 +506,8 @@ def step_impl(context, amount):
     }
     
     logger.info(f"Withdrawing ${amount} from account: {context.account['accountNumber']}")
+    # The balance changes, so a pooled account is not handed to another scenario
+    context.account_dirty = True
     context.last_response = requests.post(
         context.base_url + "/api/v1/withdraw",
         headers=context.headers,
@@ -443,6 +526,8 @@ def step_impl(context):
     }
     
     logger.info(f"Attempting withdrawal without amount from account: {context.account['accountNumber']}")
+    # The balance changes, so a pooled account is not handed to another scenario
+    context.account_dirty = True
     context.last_response = requests.post(
         context.base_url + "/api/v1/withdraw",
         headers=context.headers,
@@ -574,6 +659,8 @@ def step_impl(context):
     )
     
     logger.info(f"Making transaction: {transaction_data}")
+    # The balance changes, so a pooled account is not handed to another scenario
+    context.account_dirty = True
     context.last_response = requests.post(
         context.base_url + "/api/v1/transactions",
         headers=context.headers,
@@ -608,6 +695,8 @@ def step_impl(context):
     )
     
     logger.info(f"Making transaction with excessive amount {excessive_amount}: {transaction_data}")
+    # The balance changes, so a pooled account is not handed to another scenario
+    context.account_dirty = True
     context.last_response = requests.post(
         context.base_url + "/api/v1/transactions",
         headers=context.headers,
@@ -672,7 +761,11 @@ def step_impl(context):
     logger.info(f"Source account balance unchanged: {current_balance}")
     
     # In a real test, we would compare to the previous balance
-''')
+'''
+    
+    # An unchanged module is not rewritten, so behave keeps its compiled copy
+    if not step_builder.write_module(step_file, code):
+        return False
     
     logging.info("Comprehensive step definitions generated")
     return True
@@ -733,7 +826,7 @@ logging_format = %(asctime)s - %(name)s - %(levelname)s - %(message)s
     logging.info(f"Created Behave configuration file: {behave_config}")
     return True
 
-def run_behave_tests(tags=None, specific_feature=None):
+def run_behave_tests(tags=None, specific_feature=None, budget=None):
     """Run the Behave tests."""
     logging.info("Running Behave tests...")
     
@@ -757,13 +850,18 @@ def run_behave_tests(tags=None, specific_feature=None):
     
     # Run Behave
     try:
-        result = subprocess.run(
+        result = bdd_budget.run_with_budget(
             cmd,
-            check=False,  # Don't raise exception on test failure
+            report_file=BUDGET_REPORT_FILE,
             capture_output=False,  # Show output directly
-            text=True
+            text=True,
+            **(budget or {})
         )
         
+        bdd_budget.log_report(BUDGET_REPORT_FILE)
+        if result.returncode == bdd_budget.TIMEOUT_EXIT_CODE:
+            logging.error(f"Tests ran out of time; see {BUDGET_REPORT_FILE}")
+            return False
         if result.returncode == 0:
             logging.info("All tests passed!")
             return True
@@ -781,7 +879,9 @@ def main():
     parser.add_argument("--api-url", help="Base URL for the API (e.g. 'http://localhost:8080')")
     parser.add_argument("--setup-only", action="store_true", help="Only set up the test environment, don't run tests")
     parser.add_argument("--use-running-app", action="store_true", help="Use already running app instead of starting a new one")
+    parser.add_argument("--keep-app", action="store_true", help="Leave a started app running after the tests so later stages can reuse it")
     parser.add_argument("feature_file", nargs="?", help="Specific feature file to run tests from")
+    bdd_budget.add_budget_arguments(parser)
     args = parser.parse_args()
     
     # Update API URL in config if provided
@@ -811,17 +911,21 @@ def main():
         logging.info("Test environment setup completed. Skipping test execution.")
         return 0
     
-    # If not using a running app, start the app
-    if not args.use_running_app:
+    # If not using a running app, reuse a healthy instance from an earlier stage or start the app
+    started_app = False
+    if not args.use_running_app and app_lifecycle.find_reusable_instance(app_lifecycle.current_build_hash()):
+        logging.info("Using the application instance started by an earlier stage.")
+    elif not args.use_running_app:
         # Try to import and use start_app.py
         try:
             import start_app
             logging.info("Starting the Spring Boot application...")
             # The start_app module handles starting the application
-            result = start_app.main()
+            result = start_app.main(["--detach", "--no-reuse"])
             if result != 0:
                 logging.error("Failed to start application. BDD tests require a running application.")
                 return 1
+            started_app = True
         except ImportError:
             logging.warning("start_app.py not found or could not be imported.")
             logging.warning("Assuming application is already running or will be started separately.")
@@ -849,7 +953,13 @@ def main():
             logging.warning(f"Error checking application: {e}")
     
     # Run tests
-    if run_behave_tests(args.tags, args.feature_file):
+    success = run_behave_tests(args.tags, args.feature_file, bdd_budget.budget_from_args(args))
+    
+    # Stop the application this run started unless it should stay warm
+    if started_app and not args.keep_app:
+        app_lifecycle.teardown_instance()
+    
+    if success:
         return 0
     else:
         return 1
@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+"""
+Local build artifact cache for the Spring Boot application under test.
+
+The cloned repository is deleted and re-cloned on most runs, so the build
+output in target/ (or build/libs/) never survives between runs. This module
+keeps built JARs in a cache directory keyed by a hash of the build files and
+sources, so an unchanged source tree restores its JAR without building. Only
+the most recently used JARs are kept. It also provides the Maven/Gradle
+arguments that keep dependency caches persistent.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import subprocess
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+CONFIG_FILE = "config.json"
+BUILD_CACHE_DIR = ".build_cache"
+ARTIFACTS_DIR = os.path.join(BUILD_CACHE_DIR, "artifacts")
+BUILD_STATE_FILE = ".build_state.json"
+SOURCE_HASH_LABEL = "catfe.source-hash"
+DEFAULT_CACHE_KEEP = 5
+
+# Multi-stage Dockerfile that resolves Maven dependencies in their own layer.
+# Only a change to a pom.xml (the root one and those of any modules, filled in
+# for {module_poms}) invalidates the dependency layer; other changes rebuild
+# from the "build" stage on, which copies the whole build context. The
+# BuildKit cache mount keeps the local Maven repository between builds even
+# when the dependency layer is rebuilt.
+LAYERED_DOCKERFILE = """# syntax=docker/dockerfile:1
+FROM maven:3-eclipse-temurin-17 AS deps
+WORKDIR /app
+{module_poms}
+RUN --mount=type=cache,target=/root/.m2 mvn -B dependency:go-offline -DskipTests
+
+FROM deps AS build
+COPY . .
+RUN --mount=type=cache,target=/root/.m2 mvn -B package -DskipTests
+
+FROM eclipse-temurin:17-jdk-alpine
+VOLUME /tmp
+COPY --from=build /app/target/*.jar app.jar
+ENTRYPOINT ["java","-jar","/app.jar"]
+"""
+
+# Files whose content decides dependency resolution and the build itself
+BUILD_FILES = [
+    "pom.xml",
+    "build.gradle",
+    "build.gradle.kts",
+    "settings.gradle",
+    "settings.gradle.kts",
+    "gradle.properties",
+    os.path.join(".mvn", "wrapper", "maven-wrapper.properties"),
+    os.path.join("gradle", "wrapper", "gradle-wrapper.properties"),
+]
+
+# Directories that hold build inputs and those that never do. Build output
+# directories are only skipped next to a module's build file, so packages
+# named build or target are still hashed.
+SOURCE_DIRS = ["src"]
+SKIP_DIRS = {".git", "node_modules", ".gradle", ".idea"}
+BUILD_OUTPUT_DIRS = {"target", "build"}
+MODULE_BUILD_FILES = {"pom.xml", "build.gradle", "build.gradle.kts"}
+
+def load_config():
+    """Load configuration from config.json."""
+    try:
+        with open(CONFIG_FILE, "r", encoding="utf-8-sig") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _update_hash_with_file(digest, file_path):
+    """Feed a file's content into the digest in fixed-size chunks."""
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+
+def input_dirs(dirs, files):
+    """Subdirectories of a directory being walked that may hold build inputs, sorted."""
+    module_root = bool(MODULE_BUILD_FILES.intersection(files))
+    return sorted(d for d in dirs if d not in SKIP_DIRS and not (module_root and d in BUILD_OUTPUT_DIRS))
+
+def compute_build_file_hash(clone_dir):
+    """Hash only the build files (pom.xml, build.gradle, wrapper properties)."""
+    digest = hashlib.sha256()
+    for build_file in BUILD_FILES:
+        file_path = os.path.join(clone_dir, build_file)
+        if os.path.isfile(file_path):
+            digest.update(build_file.replace(os.sep, "/").encode("utf-8"))
+            _update_hash_with_file(digest, file_path)
+    return digest.hexdigest()
+
+def compute_source_hash(clone_dir):
+    """Hash the build files plus every file under the source directories.
+
+    Paths are hashed in sorted order so the result does not depend on the
+    order in which the file system lists directory entries.
+    """
+    digest = hashlib.sha256()
+    digest.update(compute_build_file_hash(clone_dir).encode("utf-8"))
+
+    for source_dir in SOURCE_DIRS:
+        source_root = os.path.join(clone_dir, source_dir)
+        if not os.path.isdir(source_root):
+            continue
+        source_files = []
+        for root, dirs, files in os.walk(source_root):
+            dirs[:] = input_dirs(dirs, files)
+            for file in files:
+                source_files.append(os.path.join(root, file))
+        for file_path in sorted(source_files):
+            relative_path = os.path.relpath(file_path, clone_dir).replace(os.sep, "/")
+            digest.update(relative_path.encode("utf-8"))
+            _update_hash_with_file(digest, file_path)
+
+    source_hash = digest.hexdigest()
+    logging.info(f"Source tree hash for {clone_dir}: {source_hash[:12]}")
+    return source_hash
+
+def find_built_jar(clone_dir):
+    """Find an already built JAR in target/ (Maven) or build/libs/ (Gradle)."""
+    for output_dir in [os.path.join(clone_dir, "target"), os.path.join(clone_dir, "build", "libs")]:
+        if os.path.exists(output_dir):
+            for file in os.listdir(output_dir):
+                if file.endswith(".jar") and not file.endswith("-sources.jar") and not file.endswith("-javadoc.jar"):
+                    logging.info(f"Found JAR: {file}")
+                    return os.path.join(output_dir, file)
+    return None
+
+def get_cached_jar(source_hash):
+    """Return the cached JAR for a source hash, or None if there is none."""
+    cache_dir = os.path.join(ARTIFACTS_DIR, source_hash)
+    if not os.path.isdir(cache_dir):
+        return None
+    for file in os.listdir(cache_dir):
+        if file.endswith(".jar"):
+            return os.path.join(cache_dir, file)
+    return None
+
+def restore_cached_jar(clone_dir, source_hash):
+    """Copy a cached JAR back into target/ so later steps find it as usual."""
+    cached_jar = get_cached_jar(source_hash)
+    if not cached_jar:
+        logging.info(f"No cached build artifact for source hash {source_hash[:12]}")
+        return None
+
+    # Mark the entry as recently used so pruning keeps it
+    os.utime(os.path.dirname(cached_jar))
+    target_dir = os.path.join(clone_dir, "target")
+    os.makedirs(target_dir, exist_ok=True)
+    restored_jar = os.path.join(target_dir, os.path.basename(cached_jar))
+    shutil.copy2(cached_jar, restored_jar)
+    logging.info(f"Restored cached JAR {os.path.basename(cached_jar)} for source hash {source_hash[:12]}")
+    return restored_jar
+
+def store_jar(jar_path, source_hash):
+    """Store a freshly built JAR in the cache under its source hash."""
+    try:
+        cache_dir = os.path.join(ARTIFACTS_DIR, source_hash)
+        os.makedirs(cache_dir, exist_ok=True)
+        shutil.copy2(jar_path, os.path.join(cache_dir, os.path.basename(jar_path)))
+        os.utime(cache_dir)
+        logging.info(f"Cached JAR {os.path.basename(jar_path)} for source hash {source_hash[:12]}")
+        prune_cache()
+        return True
+    except (IOError, OSError) as e:
+        logging.warning(f"Could not cache JAR {jar_path}: {e}")
+        return False
+
+def prune_cache(keep=None):
+    """Keep only the most recently used cached JARs (build_cache_keep in config.json, default 5)."""
+    if keep is None:
+        keep = int(load_config().get("build_cache_keep", DEFAULT_CACHE_KEEP))
+    if not os.path.isdir(ARTIFACTS_DIR):
+        return 0
+    entries = [entry for entry in os.scandir(ARTIFACTS_DIR) if entry.is_dir()]
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    evicted = 0
+    for entry in entries[max(keep, 1):]:
+        try:
+            shutil.rmtree(entry.path)
+            evicted += 1
+        except OSError as e:
+            logging.warning(f"Could not evict cached build {entry.name[:12]}: {e}")
+    if evicted:
+        logging.info(f"Evicted {evicted} cached builds, keeping the {max(keep, 1)} most recent")
+    return evicted
+
+def needs_clean_build(clone_dir, output_dir="target"):
+    """Decide whether the build has to start with `clean`.
+
+    A fresh clone has no output directory, so there is nothing stale to clean.
+    An existing output directory is reused incrementally only when it was
+    produced from the same build files; otherwise plugins or dependencies may
+    have changed and a clean build is the safe choice.
+    """
+    build_output = os.path.join(clone_dir, output_dir)
+    if not os.path.isdir(build_output):
+        return False
+
+    state_file = os.path.join(build_output, BUILD_STATE_FILE)
+    if not os.path.exists(state_file):
+        return True
+
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (IOError, json.JSONDecodeError):
+        return True
+
+    return state.get("build_file_hash") != compute_build_file_hash(clone_dir)
+
+def record_build_state(clone_dir, output_dir="target"):
+    """Remember which build files produced the current output directory."""
+    build_output = os.path.join(clone_dir, output_dir)
+    if not os.path.isdir(build_output):
+        return
+    with open(os.path.join(build_output, BUILD_STATE_FILE), "w", encoding="utf-8") as f:
+        json.dump({"build_file_hash": compute_build_file_hash(clone_dir)}, f, indent=4)
+
+def get_maven_repo_dir():
+    """Return the persistent local Maven repository (defaults to ~/.m2/repository)."""
+    config = load_config()
+    repo_dir = config.get("maven_repo_local") or os.path.join(os.path.expanduser("~"), ".m2", "repository")
+    repo_dir = os.path.abspath(repo_dir)
+    os.makedirs(repo_dir, exist_ok=True)
+    return repo_dir
+
+def get_gradle_user_home():
+    """Return the persistent Gradle user home (defaults to ~/.gradle)."""
+    config = load_config()
+    gradle_home = config.get("gradle_user_home") or os.path.join(os.path.expanduser("~"), ".gradle")
+    gradle_home = os.path.abspath(gradle_home)
+    os.makedirs(gradle_home, exist_ok=True)
+    return gradle_home
+
+def maven_build_args(clone_dir):
+    """Maven goals for packaging, dropping `clean` when an incremental build is safe."""
+    args = ["clean"] if needs_clean_build(clone_dir, "target") else []
+    if not args:
+        logging.info("Skipping 'clean' - build output is absent or matches the current build files")
+    args += ["package", "-DskipTests", f"-Dmaven.repo.local={get_maven_repo_dir()}"]
+    return args
+
+def gradle_build_env(env):
+    """Return a copy of env that points Gradle at the persistent user home."""
+    env = dict(env)
+    env["GRADLE_USER_HOME"] = get_gradle_user_home()
+    return env
+
+def find_module_poms(repo_dir):
+    """Relative paths of every pom.xml in the repository, the root one first."""
+    poms = []
+    for root, dirs, files in os.walk(repo_dir):
+        dirs[:] = input_dirs(dirs, files)
+        if "pom.xml" in files:
+            poms.append(os.path.relpath(os.path.join(root, "pom.xml"), repo_dir).replace(os.sep, "/"))
+    return poms
+
+def write_layered_dockerfile(dockerfile_path):
+    """Write the dependency-layered multi-stage Dockerfile for the repository it is placed in."""
+    repo_dir = os.path.dirname(os.path.abspath(dockerfile_path))
+    copies = [f"COPY {pom} ./{os.path.dirname(pom) + '/' if os.path.dirname(pom) else ''}"
+              for pom in find_module_poms(repo_dir) or ["pom.xml"]]
+    # Maven configuration and extensions also decide dependency resolution
+    if os.path.isdir(os.path.join(repo_dir, ".mvn")):
+        copies.append("COPY .mvn ./.mvn")
+    with open(dockerfile_path, "w", encoding="utf-8") as f:
+        f.write(LAYERED_DOCKERFILE.replace("{module_poms}", "\n".join(copies)))
+    logging.info(f"Created layered multi-stage Dockerfile at {dockerfile_path}")
+    return dockerfile_path
+
+def image_hash(source_hash, dockerfile_path):
+    """Hash an image is labelled with: the source hash plus the Dockerfile it is built from.
+
+    A changed Dockerfile (or Dockerfile template) then rebuilds existing images.
+    """
+    digest = hashlib.sha256(source_hash.encode("utf-8"))
+    if dockerfile_path and os.path.isfile(dockerfile_path):
+        _update_hash_with_file(digest, dockerfile_path)
+    return digest.hexdigest()
+
+def get_image_source_hash(image_name):
+    """Return the source hash label of a local Docker image, or None."""
+    result = subprocess.run(
+        ["docker", "image", "inspect", "-f", f'{{{{ index .Config.Labels "{SOURCE_HASH_LABEL}" }}}}', image_name],
+        check=False,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        return None
+    label = result.stdout.strip()
+    return label if label and label != "<no value>" else None
+
+def docker_image_is_current(image_name, source_hash):
+    """Check whether the local image was built from the current sources (see image_hash)."""
+    if not source_hash:
+        return False
+    if get_image_source_hash(image_name) == source_hash:
+        logging.info(f"Docker image {image_name} is up to date for source hash {source_hash[:12]}; skipping docker build")
+        return True
+    return False
+
+def docker_build_command(image_name, source_hash, dockerfile_path=None):
+    """Return the docker build command that labels the image with its source hash."""
+    cmd = ["docker", "build", "-t", image_name, "--label", f"{SOURCE_HASH_LABEL}={source_hash}"]
+    if dockerfile_path:
+        cmd.extend(["-f", dockerfile_path])
+    cmd.append(".")
+    return cmd
+
+def docker_build_env():
+    """Return an environment with BuildKit enabled so cache mounts work."""
+    env = os.environ.copy()
+    env["DOCKER_BUILDKIT"] = "1"
+    return env
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+"""
+Persisted component dependency graph over the code index.
+
+Components are the indexed Java files (by class name, as in the component
+relationship matrix) and an edge A -> B means A imports B. The graph is a
+networkx DiGraph stored in code_index/component_graph.json together with the
+dependencies each file contributed, so sync() only touches the files whose
+imports changed instead of rebuilding the graph from the whole index.
+
+The graph answers transitive dependencies, reverse dependencies and
+dependency cycles, and renders the component relationship matrix by writing
+one row at a time.
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+
+import networkx as nx
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+INDEX_DIR = "code_index"
+INDEX_JSON = os.path.join(INDEX_DIR, "index.json")
+GRAPH_FILE = os.path.join(INDEX_DIR, "component_graph.json")
+GRAPH_VERSION = 1
+
+def is_external(dependency, external_packages):
+    """Whether an import belongs to one of the packages, by dotted prefix ('java' does not match 'javalang')."""
+    return any(dependency == package or dependency.startswith(package + ".") for package in external_packages)
+
+def component_name(file_path):
+    """Component of an indexed file, e.g. 'AccountService' for .../AccountService.java."""
+    # The index may have been built on Windows
+    return file_path.replace("\\", "/").rsplit("/", 1)[-1].replace(".java", "")
+
+class ComponentGraph:
+    """Component dependency graph, updated per changed file."""
+
+    def __init__(self, external_packages=()):
+        self.external_packages = set(external_packages)
+        self.graph = nx.DiGraph()
+        self.files = {}
+
+    def file_dependencies(self, file_data):
+        """Internal components a file depends on (imports outside the external packages)."""
+        return sorted({dependency.split(".")[-1] for dependency in file_data.get("dependencies", [])
+                       if not is_external(dependency, self.external_packages)})
+
+    def _add_edges(self, component, dependencies, delta):
+        """Add (delta=1) or withdraw (delta=-1) one file's edges; edge weights count contributing files."""
+        for dependency in dependencies:
+            if delta > 0:
+                weight = self.graph.get_edge_data(component, dependency, {}).get("weight", 0)
+                self.graph.add_edge(component, dependency, weight=weight + 1)
+            elif self.graph.has_edge(component, dependency):
+                weight = self.graph[component][dependency]["weight"] - 1
+                if weight > 0:
+                    self.graph[component][dependency]["weight"] = weight
+                else:
+                    self.graph.remove_edge(component, dependency)
+                    for node in (component, dependency):
+                        if self.graph.degree(node) == 0:
+                            self.graph.remove_node(node)
+
+    def update_file(self, file_path, file_data):
+        """Replace the edges contributed by a file; return whether they changed."""
+        dependencies = self.file_dependencies(file_data)
+        old = self.files.get(file_path)
+        if old and old["dependencies"] == dependencies:
+            return False
+        if old:
+            self._add_edges(old["component"], old["dependencies"], -1)
+        component = component_name(file_path)
+        self._add_edges(component, dependencies, 1)
+        self.files[file_path] = {"component": component, "dependencies": dependencies}
+        return True
+
+    def remove_file(self, file_path):
+        """Drop the edges contributed by a file that is no longer indexed."""
+        old = self.files.pop(file_path, None)
+        if old:
+            self._add_edges(old["component"], old["dependencies"], -1)
+
+    def sync(self, index_data):
+        """Bring the graph up to date with the index; return how many files changed."""
+        changed = sum(self.update_file(file_path, file_data) for file_path, file_data in index_data.items())
+        removed = [file_path for file_path in self.files if file_path not in index_data]
+        for file_path in removed:
+            self.remove_file(file_path)
+        logging.info(f"Component graph: {changed} files updated, {len(removed)} removed, "
+                     f"{self.graph.number_of_nodes()} components, {self.graph.number_of_edges()} dependencies")
+        return changed + len(removed)
+
+    def dependencies(self, component, transitive=False):
+        """Components a component depends on, directly or transitively."""
+        if component not in self.graph:
+            return set()
+        return nx.descendants(self.graph, component) if transitive else set(self.graph.successors(component))
+
+    def dependents(self, component, transitive=False):
+        """Components that depend on a component, directly or transitively."""
+        if component not in self.graph:
+            return set()
+        return nx.ancestors(self.graph, component) if transitive else set(self.graph.predecessors(component))
+
+    def cycles(self):
+        """Groups of components that depend on each other (strongly connected components), largest first."""
+        groups = [sorted(group) for group in nx.strongly_connected_components(self.graph)
+                  if len(group) > 1 or self.graph.has_edge(next(iter(group)), next(iter(group)))]
+        return sorted(groups, key=lambda group: (-len(group), group))
+
+    def write_matrix(self, matrix_file):
+        """Write the component relationship matrix (and any cycles) row by row."""
+        matrix_dir = os.path.dirname(matrix_file)
+        if matrix_dir:
+            os.makedirs(matrix_dir, exist_ok=True)
+        with open(matrix_file, "w", encoding="utf-8") as f:
+            f.write("# Component Relationship Matrix\n\n")
+            f.write("| Component | Depends On | Used By |\n")
+            f.write("|-----------|-----------|--------|\n")
+            for component in sorted(self.graph.nodes):
+                deps = ", ".join(sorted(self.graph.successors(component)))
+                users = ", ".join(sorted(self.graph.predecessors(component)))
+                f.write(f"| {component} | {deps} | {users} |\n")
+            cycles = self.cycles()
+            if cycles:
+                f.write("\n## Dependency Cycles\n\n")
+                for group in cycles:
+                    f.write(f"- {' -> '.join(group)}\n")
+        return matrix_file
+
+    def save(self, graph_file=GRAPH_FILE):
+        """Persist the graph and the dependencies of every file."""
+        graph_dir = os.path.dirname(graph_file)
+        if graph_dir:
+            os.makedirs(graph_dir, exist_ok=True)
+        data = {
+            "version": GRAPH_VERSION,
+            "external_packages": sorted(self.external_packages),
+            "files": self.files,
+            "edges": [[u, v, weight] for u, v, weight in self.graph.edges(data="weight")]
+        }
+        with open(graph_file, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+
+def load_graph(external_packages=None, graph_file=GRAPH_FILE):
+    """The persisted graph; empty when missing, outdated or built with other external packages.
+
+    With external_packages=None the persisted graph's packages are used.
+    """
+    try:
+        with open(graph_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        data = {}
+    persisted_packages = set(data.get("external_packages", []))
+    graph = ComponentGraph(persisted_packages if external_packages is None else external_packages)
+    if data.get("version") != GRAPH_VERSION or persisted_packages != graph.external_packages:
+        return graph
+    graph.files = data.get("files", {})
+    graph.graph.add_weighted_edges_from(data.get("edges", []))
+    return graph
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Query the component dependency graph of the code index")
+    parser.add_argument("command", choices=["deps", "rdeps", "cycles", "matrix"])
+    parser.add_argument("component", nargs="?", help="Component for deps/rdeps, output file for matrix")
+    parser.add_argument("--direct", action="store_true", help="Only direct dependencies or dependents")
+    args = parser.parse_args()
+
+    try:
+        with open(INDEX_JSON, "r", encoding="utf-8") as f:
+            index_data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logging.error(f"Could not load {INDEX_JSON}: {e}. Run generate_artifacts.py first.")
+        return 1
+
+    # Keeps the external packages generate_artifacts.py built the graph with
+    graph = load_graph()
+    if graph.sync(index_data):
+        graph.save()
+
+    if args.command == "cycles":
+        for group in graph.cycles():
+            print(" -> ".join(group))
+    elif args.command == "matrix":
+        print(graph.write_matrix(args.component or os.path.join("summary", "component_relationship_matrix.md")))
+    elif not args.component:
+        parser.error(f"{args.command} needs a component")
+    else:
+        find = graph.dependencies if args.command == "deps" else graph.dependents
+        for component in sorted(find(args.component, transitive=not args.direct)):
+            print(component)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
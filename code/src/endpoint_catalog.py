@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Endpoint catalog over the code index.
+
+generate_artifacts.py already extracts every controller endpoint into
+code_index/api_flow.json while indexing the repository. This module exposes
+that data as a flat list of endpoints (HTTP method, full path, parameters,
+controller, service chain and structural fingerprint), so step generation, API verification and
+feature updates all read the same records instead of scanning the Java
+sources again. The catalog is loaded once per process and reloaded only when
+api_flow.json changes.
+"""
+
+import os
+import re
+import sys
+import json
+import logging
+import argparse
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+API_FLOW_FILE = os.path.join("code_index", "api_flow.json")
+PATH_VARIABLE = re.compile(r"^\{[^/{}]+\}$")
+
+_cache = {}
+
+def normalize_path(path):
+    """Full path without surrounding slashes, e.g. 'api/v1/accounts'."""
+    return "/".join(segment for segment in path.strip().split("/") if segment)
+
+def endpoints_from_api_flow(api_flow):
+    """Flatten api_flow.json data ({full_path: {endpoints, service_calls}}) into catalog records."""
+    catalog = []
+    for full_path, data in sorted(api_flow.items()):
+        path = normalize_path(full_path)
+        for endpoint in data.get("endpoints", []):
+            http_method = (endpoint.get("http_method") or "GET").upper()
+            controller = endpoint.get("class", "")
+            catalog.append({
+                "id": f"{http_method}_{path.replace('/', '_')}",
+                "method": http_method,
+                "path": path,
+                "params": endpoint.get("parameters", []),
+                "controller": controller,
+                "controller_method": endpoint.get("method", ""),
+                "line_number": endpoint.get("line_number"),
+                "fingerprint": endpoint.get("fingerprint"),
+                "dto_types": endpoint.get("dto_types", []),
+                "service_chain": [
+                    {"service": call.get("service", ""), "field": call.get("field", "")}
+                    for call in data.get("service_calls", [])
+                    if call.get("class", controller) == controller
+                ]
+            })
+    return catalog
+
+def load_catalog(api_flow_file=API_FLOW_FILE):
+    """All endpoints in the code index; an empty list when the repository has not been indexed."""
+    try:
+        mtime = os.path.getmtime(api_flow_file)
+    except OSError:
+        logging.warning(f"API flow file not found: {api_flow_file}. Run generate_artifacts.py first.")
+        return []
+    cached = _cache.get(api_flow_file)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(api_flow_file, "r", encoding="utf-8") as f:
+            catalog = endpoints_from_api_flow(json.load(f))
+    except (OSError, json.JSONDecodeError) as e:
+        logging.error(f"Error loading API flow from {api_flow_file}: {e}")
+        return []
+    _cache[api_flow_file] = (mtime, catalog)
+    return catalog
+
+def path_matches(template, path):
+    """Whether a concrete path such as 'api/v1/transactions/42/status' matches a catalog path."""
+    template_segments = normalize_path(template).split("/")
+    segments = normalize_path(path).split("/")
+    if len(template_segments) != len(segments):
+        return False
+    return all(t == s or PATH_VARIABLE.match(t) for t, s in zip(template_segments, segments))
+
+def find(http_method, path, catalog=None):
+    """The catalog endpoint for a method and path (exact path or path template), or None."""
+    catalog = load_catalog() if catalog is None else catalog
+    http_method = http_method.upper()
+    path = normalize_path(path)
+    candidates = [e for e in catalog if e["method"] == http_method]
+    exact = next((e for e in candidates if e["path"] == path), None)
+    return exact or next((e for e in candidates if path_matches(e["path"], path)), None)
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="List the endpoints in the code index")
+    parser.add_argument("--api-flow", default=API_FLOW_FILE, help="Path to api_flow.json")
+    parser.add_argument("--json", action="store_true", help="Print the catalog as JSON")
+    args = parser.parse_args()
+
+    catalog = load_catalog(args.api_flow)
+    if args.json:
+        print(json.dumps(catalog, indent=2))
+        return 0
+    for endpoint in catalog:
+        services = ", ".join(call["service"] for call in endpoint["service_chain"]) or "-"
+        params = ", ".join(p.get("name", "") for p in endpoint["params"]) or "-"
+        print(f"{endpoint['method']:<7} {endpoint['path']:<50} {endpoint['controller']}.{endpoint['controller_method']}"
+              f"  params: {params}  services: {services}")
+    return 0 if catalog else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+"""
+Enhanced API flow for LLM prompts, built from the code index.
+
+summary/enhanced_api_flow.json describes every endpoint with its controller,
+the service methods it reaches, the repositories it accesses and the data
+models involved. FlowIndex precomputes per-class lookup tables from
+index.json once (defining file, call graph, implementations, injected field
+types, referenced types, repositories and models). Each endpoint then only
+walks what its handler can reach: the method-level call graph when the
+index has one, otherwise the graph of injected fields. Repositories and
+models that the endpoint cannot reach are no longer attached to it.
+
+After an incremental update, only the entries of endpoints that reach a
+class defined in a changed file (endpoints_reaching) are rebuilt; the others
+are kept from the existing file.
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+from collections import deque
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+INDEX_JSON = os.path.join("code_index", "index.json")
+API_FLOW_JSON = os.path.join("code_index", "api_flow.json")
+ENHANCED_FLOW_FILE = os.path.join("summary", "enhanced_api_flow.json")
+MODEL_DIRS = ("models", "entities")
+
+def base_type(type_name):
+    """Type name without generic arguments or array brackets, e.g. 'List' for 'List<Account>[]'."""
+    return type_name.split("<", 1)[0].replace("[]", "").strip()
+
+def endpoint_id(endpoint):
+    """Endpoint id as used for affected endpoints, e.g. 'GET_/accounts'."""
+    return f"{endpoint.get('http_method', '')}_{endpoint.get('path', '')}"
+
+class FlowIndex:
+    """Per-class lookup tables over index.json, built once per flow generation."""
+
+    def __init__(self, index_data):
+        self.class_files = {}
+        self.calls = {}
+        self.implementations = {}
+        self.field_types = {}
+        self.references = {}
+        self.repositories = set()
+        self.models = set()
+        for file_path, data in index_data.items():
+            file_name = os.path.basename(file_path)
+            in_model_dir = any(model_dir in file_path for model_dir in MODEL_DIRS)
+            for class_info in data.get("classes", []):
+                self.class_files[class_info["name"]] = file_name
+                annotations = class_info.get("annotations", [])
+                if "Repository" in annotations:
+                    self.repositories.add(class_info["name"])
+                if in_model_dir or "Entity" in annotations:
+                    self.models.add(class_info["name"])
+            for relation in data.get("inheritance", []):
+                # Interfaces (e.g. Spring Data repositories) only appear here
+                self.class_files.setdefault(relation["class"], file_name)
+                if in_model_dir:
+                    self.models.add(relation["class"])
+                for parent in relation.get("extends", []) + relation.get("implements", []):
+                    self.implementations.setdefault(parent, []).append(relation["class"])
+            for field in data.get("fields", []):
+                self.field_types.setdefault(field["class"], set()).add(base_type(field["type"]))
+            for reference in data.get("references", []):
+                self.references[reference["class"]] = set(reference["types"])
+            for entry in data.get("call_graph", []):
+                self.calls[entry["caller"]] = entry["calls"]
+        self.repositories.update(name for name in self.class_files if "Repository" in name)
+
+    def file_of(self, type_name):
+        """File defining a type, assuming <Type>.java when it is not indexed."""
+        return self.class_files.get(type_name, f"{type_name}.java")
+
+    def expand(self, type_name):
+        """A type and its (transitive) implementations and subclasses."""
+        types = [type_name]
+        seen = {type_name}
+        for candidate in types:
+            for subtype in self.implementations.get(candidate, []):
+                if subtype not in seen:
+                    seen.add(subtype)
+                    types.append(subtype)
+        return types
+
+    def reachable_methods(self, handler):
+        """Call graph nodes ("Type.method") reachable from a handler, in BFS order.
+
+        Calls on an interface also reach the implementing classes' methods.
+        Returns None when the index predates call graphs (handlers without
+        resolvable calls are simply absent from one).
+        """
+        if not self.calls:
+            return None
+        seen = {handler}
+        order = []
+        queue = deque([handler])
+        while queue:
+            for callee in self.calls.get(queue.popleft(), []):
+                type_name, _, method = callee.partition(".")
+                for target in (f"{t}.{method}" for t in self.expand(type_name)):
+                    if target not in seen:
+                        seen.add(target)
+                        order.append(target)
+                        queue.append(target)
+        return order
+
+    def reachable_types(self, class_name):
+        """Types reachable from a class through injected fields (and their implementations)."""
+        seen = set(self.expand(class_name))
+        queue = deque(seen)
+        while queue:
+            for field_type in self.field_types.get(queue.popleft(), ()):
+                for target in self.expand(field_type):
+                    if target not in seen:
+                        seen.add(target)
+                        queue.append(target)
+        return seen
+
+    def endpoint_types(self, endpoint):
+        """Types an endpoint's handler reaches, through the call graph when the index has one."""
+        controller = endpoint.get("class", "")
+        reached = self.reachable_methods(f"{controller}.{endpoint.get('method', '')}")
+        if reached is None:
+            return self.reachable_types(controller)
+        return {controller} | {node.partition(".")[0] for node in reached}
+
+    def endpoint_entry(self, endpoint_path, endpoint, service_calls):
+        """Enhanced flow entry of one endpoint."""
+        controller = endpoint.get("class", "")
+        services = {base_type(call.get("service", "")) for call in service_calls}
+        service_types = {t for service in services for t in self.expand(service)}
+        service_chain = {}
+        repository_access = {}
+
+        reached = self.reachable_methods(f"{controller}.{endpoint.get('method', '')}")
+        if reached is not None:
+            reached_types = {controller}
+            for node in reached:
+                type_name, _, method = node.partition(".")
+                reached_types.add(type_name)
+                if type_name in service_types:
+                    service_chain.setdefault((type_name, method), None)
+                elif type_name in self.repositories:
+                    repository_access.setdefault((type_name, method), None)
+        else:
+            # No call graph in the index: fall back to the injected-field graph
+            reached_types = self.reachable_types(controller)
+            for service in sorted(services):
+                service_chain[(service, "Unknown")] = None
+            for repository in sorted(reached_types & self.repositories):
+                repository_access[(repository, "Unknown")] = None
+
+        models = set()
+        for type_name in reached_types:
+            models.update(self.references.get(type_name, ()))
+        models = (models | reached_types) & self.models
+
+        return {
+            "endpoint": endpoint_path,
+            "method": endpoint.get("http_method", "GET"),
+            "controller": {
+                "file": self.file_of(controller),
+                "method": endpoint.get("method", ""),
+                "responsibility": f"Handles {endpoint_path} requests"
+            },
+            "serviceChain": [
+                {"file": self.file_of(service), "method": method, "responsibility": f"Business logic for {endpoint_path}"}
+                for service, method in service_chain
+            ],
+            "repositoryAccess": [
+                {"file": self.file_of(repository), "method": method, "dataAccessed": repository.replace("Repository", "")}
+                for repository, method in repository_access
+            ],
+            "dataModels": sorted(self.file_of(model) for model in models),
+            "dependencies": list(dict.fromkeys(self.file_of(service) for service, _ in service_chain))
+        }
+
+def defined_classes(index_data, files):
+    """Names of the classes and interfaces that the given files define in index data."""
+    names = set()
+    for file_path in files:
+        data = index_data.get(file_path, {})
+        names.update(class_info["name"] for class_info in data.get("classes", []))
+        names.update(relation["class"] for relation in data.get("inheritance", []))
+    return names
+
+def endpoints_reaching(api_flow_data, index_data, class_names):
+    """Ids of the endpoints whose handlers reach any of class_names."""
+    flow_index = FlowIndex(index_data)
+    return {endpoint_id(endpoint) for endpoint_data in api_flow_data.values()
+            for endpoint in endpoint_data.get("endpoints", [])
+            if flow_index.endpoint_types(endpoint) & set(class_names)}
+
+def build_enhanced_flow(api_flow_data, index_data, existing=None, affected_endpoints=None):
+    """Enhanced flow of all endpoints; with affected_endpoints, other entries are kept from existing."""
+    flow_index = FlowIndex(index_data)
+    existing = existing or {}
+    enhanced_flow = {}
+    rebuilt = 0
+    for endpoint_path, endpoint_data in api_flow_data.items():
+        for endpoint in endpoint_data.get("endpoints", []):
+            key = f"{endpoint_path}:{endpoint.get('http_method', 'GET')}"
+            if key in enhanced_flow:
+                continue
+            if affected_endpoints is not None and key in existing and endpoint_id(endpoint) not in affected_endpoints:
+                enhanced_flow[key] = existing[key]
+                continue
+            enhanced_flow[key] = flow_index.endpoint_entry(endpoint_path, endpoint, endpoint_data.get("service_calls", []))
+            rebuilt += 1
+    logging.info(f"Built enhanced flow entries for {rebuilt} of {len(enhanced_flow)} endpoints")
+    return enhanced_flow
+
+def load_enhanced_flow(flow_file=ENHANCED_FLOW_FILE):
+    """Existing enhanced flow, or None when there is none."""
+    try:
+        with open(flow_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def write_enhanced_flow(api_flow_data, index_data, affected_endpoints=None, flow_file=ENHANCED_FLOW_FILE):
+    """Build and save the enhanced flow compactly; return the file path."""
+    existing = load_enhanced_flow(flow_file) if affected_endpoints is not None else None
+    enhanced_flow = build_enhanced_flow(api_flow_data, index_data, existing,
+                                        affected_endpoints if existing is not None else None)
+    flow_dir = os.path.dirname(flow_file)
+    if flow_dir:
+        os.makedirs(flow_dir, exist_ok=True)
+    with open(flow_file, "w", encoding="utf-8") as f:
+        json.dump(enhanced_flow, f, separators=(",", ":"))
+    logging.info(f"Enhanced API flow representation saved to {flow_file}")
+    return flow_file
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Build the enhanced API flow for LLM prompts from the code index")
+    parser.add_argument("--index", default=INDEX_JSON, help="Path to index.json")
+    parser.add_argument("--api-flow", default=API_FLOW_JSON, help="Path to api_flow.json")
+    parser.add_argument("--output", default=ENHANCED_FLOW_FILE, help="Enhanced flow file to write")
+    parser.add_argument("--endpoint", action="append", dest="endpoints",
+                        help="Only rebuild this endpoint id (e.g. GET_/accounts); may be repeated")
+    args = parser.parse_args()
+
+    try:
+        with open(args.index, "r", encoding="utf-8") as f:
+            index_data = json.load(f)
+        with open(args.api_flow, "r", encoding="utf-8") as f:
+            api_flow_data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logging.error(f"Could not load the code index: {e}. Run generate_artifacts.py first.")
+        return 1
+
+    write_enhanced_flow(api_flow_data, index_data, set(args.endpoints) if args.endpoints else None, args.output)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
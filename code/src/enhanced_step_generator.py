@@ -2,12 +2,27 @@
 import os
 import re
 import json
-import glob
 import logging
+import ast
+import hashlib
+
+import step_builder
+import gherkin_parser
+import test_selection
+import endpoint_catalog
+
+try:
+    import parse
+except ImportError:
+    parse = None
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Which feature files and endpoints contributed which generated step functions
+MANIFEST_FILE = os.path.join("code_index", "step_manifest.json")
+MANIFEST_VERSION = 1
+
 def extract_steps_from_feature_files(feature_dir):
     """Extract all steps from feature files in the given directory"""
     all_steps = {
@@ -16,64 +31,73 @@ def extract_steps_from_feature_files(feature_dir):
         'then': set(),
     }
     
-    # Find all feature files
-    feature_files = glob.glob(os.path.join(feature_dir, "*.feature"))
-    
-    for file_path in feature_files:
-        logging.info(f"Extracting steps from {file_path}")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-            # Extract Given steps
-            given_steps = re.findall(r'Given\s+(.+?)$', content, re.MULTILINE)
-            for step in given_steps:
-                all_steps['given'].add(step.strip())
-            
-            # Extract When steps
-            when_steps = re.findall(r'When\s+(.+?)$', content, re.MULTILINE)
-            for step in when_steps:
-                all_steps['when'].add(step.strip())
-            
-            # Extract Then steps
-            then_steps = re.findall(r'Then\s+(.+?)$', content, re.MULTILINE)
-            for step in then_steps:
-                all_steps['then'].add(step.strip())
-            
-            # Extract And steps (need to figure out if they're Given, When, or Then)
-            and_steps = re.findall(r'And\s+(.+?)$', content, re.MULTILINE)
-            # We'll need to determine the type later
+    # One streaming pass per changed feature; And/But steps get the type of the step before them
+    features = gherkin_parser.parse_feature_dir(feature_dir)
+    for file_path, feature in features.items():
+        for step_type, step in gherkin_parser.iter_steps(feature):
+            all_steps[step_type].add(step)
     
     logging.info(f"Extracted {len(all_steps['given'])} Given steps, {len(all_steps['when'])} When steps, {len(all_steps['then'])} Then steps")
     return all_steps
 
-def convert_step_to_regex(step):
-    """Convert a step text to a regex pattern that can be used in step definitions"""
-    # Check if string contains an apostrophe - if so, we'll use double quotes
-    use_double_quotes = "'" in step
-    
-    # Replace quoted text with capturing groups
-    pattern = re.sub(r'"([^"]*)"', r'"([^"]*)"', step)
-    
-    # Replace numeric values with capturing groups
-    pattern = re.sub(r'\$(\d+)', r'\\$(\\d+)', pattern)
-    
-    # Replace parameters with capturing groups
-    pattern = re.sub(r'{([^}]+)}', r'(?P<\\1>[^"]*)', pattern)
-    
-    # Replace decimal values with capturing groups
-    pattern = re.sub(r'(\d+\.\d+)', r'(\\d+\\.\\d+)', pattern)
-    
-    # Escape apostrophes in the pattern
-    if use_double_quotes:
-        pattern = pattern.replace("'", "\\'")
-    
-    return pattern
+def feature_step_index(features):
+    """Steps and endpoints contributed by each parsed feature file
+
+    Request paths in steps are resolved against the endpoint catalog, so a
+    concrete path such as api/v1/transactions/42/status maps to its endpoint.
+    """
+    catalog = endpoint_catalog.load_catalog()
+    index = {}
+    for file_path, feature in features.items():
+        steps = sorted(set(gherkin_parser.iter_steps(feature)))
+        endpoints = set()
+        for _, step in steps:
+            for http_method, path in test_selection.STEP_REQUEST_PATTERN.findall(step):
+                endpoint = endpoint_catalog.find(http_method, path, catalog)
+                endpoints.add(endpoint["id"] if endpoint else test_selection.endpoint_id(http_method, path))
+        index[file_path] = {"steps": [list(step) for step in steps], "endpoints": sorted(endpoints)}
+    return index
+
+def file_hash(path):
+    """SHA-1 of a file's content, or None if it does not exist"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+def load_manifest(output_file, signature, manifest_file=MANIFEST_FILE):
+    """The manifest of the last generation of output_file, or None if it cannot be reused"""
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if (manifest.get("version") != MANIFEST_VERSION or manifest.get("signature") != signature
+            or manifest.get("output_file") != os.path.normpath(output_file)):
+        return None
+    # A module edited or restored outside the generator no longer matches the manifest
+    if manifest.get("output_hash") != file_hash(output_file):
+        return None
+    return manifest
+
+def save_manifest(manifest, manifest_file=MANIFEST_FILE):
+    """Persist the step manifest"""
+    os.makedirs(os.path.dirname(manifest_file), exist_ok=True)
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+# Literal values in step text that become {param} placeholders, in text order
+STEP_VALUE_PATTERN = re.compile(
+    r'"(?P<quoted>[^"]*)"|\$(?P<amount>\d+(?:\.\d+)?)|\b(?P<decimal>\d+\.\d+)\b|\b(?P<number>\d+)\b'
+)
 
 def generate_step_function_name(step):
     """Generate a Python function name for a step"""
-    # Remove quotes and special characters
+    # Remove quotes, placeholders and special characters
     name = re.sub(r'"[^"]*"', 'value', step)
     name = re.sub(r'\$\d+', 'amount', name)
+    name = re.sub(r'{[^}]*}', '', name)
     name = re.sub(r'[^a-zA-Z0-9_]', '_', name)
     name = re.sub(r'_+', '_', name)
     name = name.strip('_')
@@ -84,81 +108,116 @@ def generate_step_function_name(step):
     
     return f"step_impl_{name.lower()}"
 
-def generate_parameter_definitions(step):
-    """Generate parameter type hints for step definition function"""
+def step_parameters(step):
+    """Return (match, name, parse type) for each literal value in a step, in text order"""
     params = []
-    
-    # Extract parameters from quoted text
-    quotes = re.findall(r'"([^"]*)"', step)
-    for i, quote in enumerate(quotes):
-        if 'PUT' in quote or 'POST' in quote or 'GET' in quote or 'DELETE' in quote:
-            params.append(f'method')
-        elif 'api/v1' in quote:
-            params.append(f'endpoint')
+    quote_index = decimal_index = number_index = 0
+    for match in STEP_VALUE_PATTERN.finditer(step):
+        if match.group('quoted') is not None:
+            quote_index += 1
+            quote = match.group('quoted')
+            if 'PUT' in quote or 'POST' in quote or 'GET' in quote or 'DELETE' in quote:
+                name = 'method'
+            elif 'api/v1' in quote:
+                name = 'endpoint'
+            else:
+                name = f'param{quote_index}'
+            param_type = ''
+        elif match.group('amount') is not None:
+            name = 'amount'
+            param_type = ':f' if '.' in match.group('amount') else ':d'
+        elif match.group('decimal') is not None:
+            decimal_index += 1
+            name = f'value{decimal_index}'
+            param_type = ':f'
         else:
-            params.append(f'param{i+1}')
-    
-    # Extract numeric parameters
-    amounts = re.findall(r'\$(\d+)', step)
-    for i, amount in enumerate(amounts):
-        params.append(f'amount')
-    
-    # Extract decimal parameters
-    decimals = re.findall(r'(\d+\.\d+)', step)
-    for i, decimal in enumerate(decimals):
-        params.append(f'value{i+1}')
-    
+            number_index += 1
+            name = f'number{number_index}'
+            param_type = ':d'
+        
+        # parse needs distinct field names unless the values are equal
+        used = [p[1] for p in params]
+        if name in used:
+            name = f'{name}_{len(params) + 1}'
+        params.append((match, name, param_type))
     return params
 
-def generate_step_function(step_type, step):
-    """Generate a Python function for a step definition"""
-    regex_pattern = convert_step_to_regex(step)
-    func_name = generate_step_function_name(step)
-    params = generate_parameter_definitions(step)
-    
-    # Create parameter string for function definition
-    param_str = ", ".join(["context"] + params)
-    
-    # Check if string contains an apostrophe or quoted text - if so, we'll use double quotes
-    use_double_quotes = "'" in step or '"' in step
-    
-    # If there are nested quotes, we need to escape them
-    if '"' in step:
-        regex_pattern = regex_pattern.replace('"', '\\"')
-    
-    # Create function code
-    if use_double_quotes:
-        if step_type == 'given':
-            decorator = f'@behave.given(u"{regex_pattern}")'
-        elif step_type == 'when':
-            decorator = f'@behave.when(u"{regex_pattern}")'
-        elif step_type == 'then':
-            decorator = f'@behave.then(u"{regex_pattern}")'
-    else:
-        if step_type == 'given':
-            decorator = f"@behave.given(u'{regex_pattern}')"
-        elif step_type == 'when':
-            decorator = f"@behave.when(u'{regex_pattern}')"
-        elif step_type == 'then':
-            decorator = f"@behave.then(u'{regex_pattern}')"
-    
-    # Escape quotes in the step text for the docstring
-    step_for_docstring = step.replace('"', '\\"')
-    
-    function_code = f"""
-{decorator}
-def {func_name}({param_str}):
-    \"\"\"Implementation for: {step_for_docstring}\"\"\"
-    # For mocked API mode
-    if hasattr(context, 'mock_api') and context.mock_api:
-        logging.info("Running in mock API mode, mocking implementation")
-        return
+def generate_parameter_definitions(step):
+    """Generate parameter names for step definition function"""
+    return [name for _, name, _ in step_parameters(step)]
+
+def step_template(step):
+    """Turn a step into a parse template with {param} placeholders for its literal values"""
+    parts = []
+    position = 0
+    for match, name, param_type in step_parameters(step):
+        # Braces in the literal text must be doubled for parse
+        parts.append(step[position:match.start()].replace('{', '{{').replace('}', '}}'))
+        if match.group('quoted') is not None:
+            parts.append(f'"{{{name}}}"')
+        elif match.group('amount') is not None:
+            parts.append(f'${{{name}{param_type}}}')
+        else:
+            parts.append(f'{{{name}{param_type}}}')
+        position = match.end()
+    parts.append(step[position:].replace('{', '{{').replace('}', '}}'))
+    return ''.join(parts), generate_parameter_definitions(step)
+
+def cluster_steps(all_steps, is_covered=None):
+    """Group steps that differ only in literal values into one template per step type.
+
+    Returns a list of (step_type, template, params, examples), most specific
+    template first so behave tries it before a more general one.
+    """
+    clusters = {}
+    for step_type, steps in all_steps.items():
+        for step in sorted(steps):
+            if is_covered and is_covered(step_type, step):
+                continue
+            template, params = step_template(step)
+            cluster = clusters.setdefault((step_type, template), (params, []))
+            cluster[1].append(step)
     
-    # Add your implementation here
-    logging.info(f"Executing step: {step_for_docstring}")
+    ordered = sorted(clusters.items(), key=lambda item: (-len(item[1][0]), -len(item[0][1]), item[0][1]))
+    return [(step_type, template, params, examples) for (step_type, template), (params, examples) in ordered]
+
+def implementation_patterns(implementations):
+    """Decorator patterns of the hand-written implementations, keyed by step type"""
+    patterns = {}
+    for step_type, steps in implementations.items():
+        for implementation in steps.values():
+            decorator = next(line for line in implementation.splitlines() if line.startswith('@behave.'))
+            call = ast.parse(decorator[1:], mode='eval').body
+            patterns.setdefault(step_type, []).append(call.args[0].value)
+    return patterns
+
+def pattern_matches(pattern, text):
+    """Whether behave's default parse matcher would match text with pattern"""
+    if parse is None:
+        return pattern == text
+    return parse.parse(pattern, text, case_sensitive=True) is not None
+
+def generate_step_function(template, params, examples):
+    """Generate the docstring and body of a step function for a step template"""
+    shown = examples[:3] + ([f"... {len(examples) - 3} more"] if len(examples) > 3 else [])
+    docstring = f"Implementation for {len(examples)} step(s):\n" + "\n".join(f"- {example}" for example in shown) + "\n"
+    values = ", ".join(f"{name}={{{name}!r}}" for name in params)
+    # Steps that send a request carry its method and endpoint as parameters
+    dirty = ("# A request that moves money leaves a pooled account dirty\n"
+             "if changes_balance(method, endpoint):\n"
+             "    context.account_dirty = True\n\n") if "method" in params and "endpoint" in params else ""
+    
+    body = f"""
+# For mocked API mode
+if hasattr(context, 'mock_api') and context.mock_api:
+    logging.info("Running in mock API mode, mocking implementation")
+    return
+
+{dirty}# Add your implementation here
+logging.info("Executing step: " + {template!r} + f" ({values})")
 """
     
-    return function_code
+    return docstring, body
 
 def generate_specific_step_implementations():
     """Generate specific step implementations for common patterns"""
@@ -197,6 +256,13 @@ def step_impl_authenticated_user(context):
     # Create an account for this user if needed
     try:
         if not hasattr(context, 'mock_api') or not context.mock_api:
+            # Check out an account from the pool seeded in before_all instead of creating one
+            pooled = context.account_pool.checkout(context) if getattr(context, 'account_pool', None) else None
+            if pooled:
+                context.account_details, context.account = pooled
+                logging.info(f"Using pooled account: {context.account}")
+                return
+            
             # Try to create via accounts endpoint
             response = requests.put(
                 f"{context.base_url}/accounts",
@@ -406,6 +472,8 @@ def step_impl_post_deposit_valid(context):
     
     logging.info(f"Depositing with payload: {payload}")
     
+    # The balance changes, so a pooled account is not handed to another scenario
+    context.account_dirty = True
     try:
         context.response = requests.post(url, json=payload, headers=context.headers)
         
@@ -511,23 +579,28 @@ def step_impl_check_balance_in_response(context):
     
     return implementations
 
-def generate_step_definitions(feature_dir, output_file):
-    """Generate step definitions based on the steps found in feature files"""
-    # Extract steps from feature files
-    all_steps = extract_steps_from_feature_files(feature_dir)
+def generate_step_definitions(feature_dir, output_file, manifest_file=MANIFEST_FILE, rebuild=False):
+    """Generate step definitions based on the steps found in feature files
+
+    Functions are only added for new steps and removed once no feature uses
+    them; an unchanged step module is not rewritten.
+    """
+    # Steps of every feature file, from the parse cache for unchanged files
+    index = feature_step_index(gherkin_parser.parse_feature_dir(feature_dir))
     
     # Get specific implementations for common patterns
     specific_implementations = generate_specific_step_implementations()
     
     # Start with the header
-    content = """import json
+    content = """import os
+import re
+import json
+import time
+import random
+import string
 import logging
 import requests
 import behave
-import random
-import string
-import time
-import os
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -565,100 +638,129 @@ def is_successful_status(status_code):
     \"\"\"Check if status code indicates success (2xx)\"\"\"
     return 200 <= status_code < 300
 
+# Requests that move money; a pooled account they touch is not handed to another scenario
+BALANCE_ENDPOINTS = {"api/v1/deposit", "api/v1/withdraw", "api/v1/transactions"}
+
+def changes_balance(method, endpoint):
+    \"\"\"Whether a request changes the balance of the account it uses\"\"\"
+    return method.upper() == "POST" and endpoint.strip("/") in BALANCE_ENDPOINTS
+
+# Postman samples are keyed like postman_samples.sample_key: ids and path variables become {id}
+ID_SEGMENT = re.compile(r"^(\\d+|[0-9a-fA-F-]{32,36}|\\{\\{?[^/{}]+\\}?\\}|:\\w+)$")
+
+def sample_key(method, endpoint):
+    \"\"\"Postman sample index key, e.g. 'GET api/v1/transactions/{id}/status'\"\"\"
+    segments = ["{id}" if ID_SEGMENT.match(segment) else segment for segment in endpoint.split("/") if segment]
+    return f"{method.upper()} {'/'.join(segments)}"
+
 def get_sample_data(method, endpoint):
     \"\"\"Get sample data for an endpoint from various sources\"\"\"
-    # Check for successful API data first
-    key = f"{method}_{endpoint}"
+    # Check for successful API data first (keyed by the last path segment)
+    key = f"{method}_{endpoint.split('/')[-1]}"
     if key in SUCCESSFUL_API_DATA:
         logging.info(f"Using successful request data for {key}")
         return SUCCESSFUL_API_DATA[key]
     
-    # Then check for Postman sample data
-    if endpoint in POSTMAN_SAMPLE_DATA and method in POSTMAN_SAMPLE_DATA[endpoint]:
-        postman_data = POSTMAN_SAMPLE_DATA[endpoint][method]
-        if postman_data and len(postman_data) > 0:
-            logging.info(f"Using Postman sample data for {method} {endpoint}")
-            return postman_data[0]  # Use the first sample
+    # Then check for Postman sample data, indexed by method and full path
+    postman_data = POSTMAN_SAMPLE_DATA.get(sample_key(method, endpoint))
+    if postman_data:
+        logging.info(f"Using Postman sample data for {method} {endpoint}")
+        return postman_data[0]  # Use the first sample
     
     # Return None if no sample data found
     return None
 
 """
     
-    # Check each step and prepare implementations
-    processed_steps = set()
+    signature = hashlib.sha1("".join([content] + [code for steps in specific_implementations.values() for code in steps.values()]).encode('utf-8')).hexdigest()
+    manifest = None if rebuild else load_manifest(output_file, signature, manifest_file)
+    if manifest and manifest["features"] == index:
+        logging.info(f"Step definitions in {output_file} are up to date with {len(index)} feature files")
+        return True
+    
+    # Feature files that use each step
+    contributors = {}
+    for file_path, entry in index.items():
+        for step_type, step in entry["steps"]:
+            contributors.setdefault((step_type, step), set()).add(file_path)
+    
+    # Keep the functions of the last run for the steps that still exist
+    specific_patterns = implementation_patterns(specific_implementations)
+    registered = {step_type: list(patterns) for step_type, patterns in specific_patterns.items()}
+    templates = []
+    removed = 0
+    for template in manifest["templates"] if manifest else []:
+        template["examples"] = [step for step in template["examples"] if (template["type"], step) in contributors]
+        if template["examples"]:
+            templates.append(template)
+            registered.setdefault(template["type"], []).append(template["template"])
+        else:
+            logging.info(f"Removing step template no longer used by any feature: {template['template']}")
+            removed += 1
+    kept = len(templates)
+    
+    def serving_template(step_type, step):
+        """The generated template behave would use for a step, or None"""
+        return next((t for t in templates if t["type"] == step_type and pattern_matches(t["template"], step)), None)
+    
+    # New steps either match a hand-written or kept template, or are clustered into new ones
+    known = {(t["type"], step) for t in templates for step in t["examples"]}
+    new_steps = {}
+    for step_type, step in sorted(set(contributors) - known):
+        if any(pattern_matches(p, step) for p in specific_patterns.get(step_type, [])):
+            continue
+        template = serving_template(step_type, step)
+        if template:
+            template["examples"] = sorted(template["examples"] + [step])
+        else:
+            new_steps.setdefault(step_type, set()).add(step)
+    
+    for step_type, template, params, examples in cluster_steps(new_steps):
+        # behave refuses a pattern that an earlier one already matches; those steps are served by it
+        if any(pattern_matches(p, template) for p in registered.get(step_type, [])):
+            logging.info(f"Skipping template already covered by an earlier step: {template}")
+            existing = serving_template(step_type, template)
+            if existing:
+                existing["examples"] = sorted(existing["examples"] + examples)
+            continue
+        registered.setdefault(step_type, []).append(template)
+        templates.append({"type": step_type, "template": template, "params": params, "examples": examples})
+    
+    builder = step_builder.StepModuleBuilder(content)
     
     # Add specific implementations first
-    content += "# Specific implementations for common patterns\n"
+    builder.add_comment("Specific implementations for common patterns")
     for step_type, steps in specific_implementations.items():
         for step_text, implementation in steps.items():
-            content += implementation + "\n"
-            processed_steps.add((step_type, step_text))
-    
-    # Add generic implementations for other steps
-    content += "# Generic implementations for other steps\n"
-    for step_type, steps in all_steps.items():
-        for step in steps:
-            # Skip steps that already have specific implementations
-            if (step_type, step) in processed_steps:
-                continue
-            
-            # Generate function for this step
-            content += generate_step_function(step_type, step) + "\n"
-            processed_steps.add((step_type, step))
-    
-    # Perform a final check for apostrophes
-    content = check_and_fix_string_quotes(content)
-    
-    # Write to output file
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(content)
-    
+            builder.add_code(implementation)
+    
+    # Add one generic implementation per template for the other steps, in their original order
+    builder.add_comment("Generic implementations for other steps")
+    for template in templates:
+        docstring, body = generate_step_function(template["template"], template["params"], template["examples"])
+        func_name = template.get("function") or generate_step_function_name(template["template"])
+        template["function"] = builder.add_step(template["type"], template["template"], func_name, template["params"], body, docstring)
+        template["features"] = sorted(set().union(*(contributors[(template["type"], step)] for step in template["examples"])))
+        template["endpoints"] = sorted({endpoint for file_path in template["features"] for endpoint in index[file_path]["endpoints"]})
+    
+    logging.info(f"Clustered {len(contributors)} distinct steps into {len(templates)} step templates "
+                 f"({kept} kept, {removed} removed, {len(templates) - kept} added)")
+    
+    # Validate the module once and write it if it changed
+    if not builder.write(output_file):
+        logging.error(f"Generated step definitions for {output_file} are not valid Python")
+        return False
+    
+    save_manifest({
+        "version": MANIFEST_VERSION,
+        "signature": signature,
+        "output_file": os.path.normpath(output_file),
+        "output_hash": file_hash(output_file),
+        "features": index,
+        "templates": templates
+    }, manifest_file)
     logging.info(f"Generated step definitions written to {output_file}")
-
-def check_and_fix_string_quotes(content):
-    """Check for apostrophes in steps and ensure proper string quoting"""
-    # Find all behave decorator lines
-    lines = content.split('\n')
-    for i in range(len(lines)):
-        if '@behave.' in lines[i]:
-            # Check for various formatting issues
-            
-            # 1. Check for apostrophes within single quotes
-            if "''" in lines[i] or ("'" in lines[i] and ("users'" in lines[i] or "accounts'" in lines[i])):
-                # This line has an apostrophe inside quotes
-                if '(u"' not in lines[i]:  # Not already fixed
-                    # Extract the correct decorator type
-                    if lines[i].startswith('@behave.given'):
-                        decorator_type = 'given'
-                    elif lines[i].startswith('@behave.when'):
-                        decorator_type = 'when'
-                    elif lines[i].startswith('@behave.then'):
-                        decorator_type = 'then'
-                    else:
-                        continue
-                        
-                    # Extract the step text
-                    match = re.search(r'@behave\.' + decorator_type + r'\((?:u)?[\'"](.+?)[\'"]', lines[i])
-                    if match:
-                        step_text = match.group(1)
-                        # Escape quotes and convert to double-quoted string
-                        step_text = step_text.replace('"', '\\"')
-                        step_text = step_text.replace("'", "\\'")
-                        lines[i] = f'@behave.{decorator_type}(u"{step_text}")'
-            
-            # 2. Check for nested quotes that need escaping
-            if '"' in lines[i] and 'request to' in lines[i] and '@behave.' in lines[i]:
-                # This is likely a step with nested quotes for a request
-                match = re.search(r'@behave\.(given|when|then)\(u"I send a "([^"]+)" request to "([^"]+)"', lines[i])
-                if match:
-                    decorator_type, method, endpoint = match.groups()
-                    # Replace with proper escaping
-                    regex = f'@behave.{decorator_type}(u"I send a \\"'
-                    replacement = f'{regex}{method}\\" request to \\"{endpoint}\\"'
-                    lines[i] = re.sub(r'@behave\.' + decorator_type + r'\(u"I send a "([^"]+)" request to "([^"]+)"', replacement, lines[i])
-    
-    return '\n'.join(lines)
+    return True
 
 if __name__ == "__main__":
     # Get feature directory and output file from command line arguments
@@ -666,6 +768,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate step definitions from feature files")
     parser.add_argument("--feature-dir", default="summary/bdd_test_cases", help="Directory containing feature files")
     parser.add_argument("--output-file", default="summary/bdd_test_cases/steps/api_steps.py", help="Output file for step definitions")
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate every step function instead of only those for changed features")
     
     args = parser.parse_args()
     
@@ -673,4 +776,4 @@ if __name__ == "__main__":
     os.makedirs(os.path.dirname(args.output_file), exist_ok=True)
     
     # Generate step definitions
-    generate_step_definitions(args.feature_dir, args.output_file) 
\ No newline at end of file
+    generate_step_definitions(args.feature_dir, args.output_file, rebuild=args.rebuild) 
\ No newline at end of file
@@ -61,7 +61,8 @@ def fix_apostrophe_issues(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
     
-    logging.info(f"Processing file with {len(content.split('\n'))} lines")
+    line_count = len(content.split('\n'))
+    logging.info(f"Processing file with {line_count} lines")
     
     # Count behave decorators
     behave_count = content.count('@behave.')
@@ -82,7 +82,10 @@ def generate_random_data(data_type="string", length=10):
 def setup_context(context):
     """Setup context with default values"""
     # Set default base URL for API testing
-    context.base_url = os.environ.get('API_BASE_URL', 'http://localhost:8080')
+    # API_BASE_URL is the API root; these steps are given paths that include api/v1
+    context.base_url = os.environ.get('API_BASE_URL', 'http://localhost:8080').rstrip('/')
+    if context.base_url.endswith('/api/v1'):
+        context.base_url = context.base_url[:-len('/api/v1')]
     context.headers = {"Content-Type": "application/json"}
     context.request_body = None
     context.response = None
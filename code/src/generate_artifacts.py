@@ -6,8 +6,6 @@ import hashlib
 import logging
 import concurrent.futures
 from tqdm import tqdm
-from collections import defaultdict
-import networkx as nx
 import subprocess
 import stat
 import matplotlib.pyplot as plt
@@ -20,6 +18,12 @@ from pathlib import Path
 import argparse
 import shutil
 
+import test_selection
+import repo_catalog
+import enhanced_flow
+import component_graph
+import prompt_builder
+
 # Setup structured logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -71,7 +75,7 @@ def is_test_class(class_name, file_path):
     return any(test_dir in path_parts for test_dir in test_dirs)
 
 def is_external_dependency(dependency):
-    return any(dependency.startswith(pkg) for pkg in EXTERNAL_PACKAGES)
+    return component_graph.is_external(dependency, EXTERNAL_PACKAGES)
 
 def get_package_name(file_path):
     try:
@@ -126,13 +130,13 @@ def clone_repo(repo_url, clone_dir):
         # ✅ Ensure `cloned_repo/` has full read/write/execute permissions
         os.chmod(clone_dir, stat.S_IRWXU | stat.S_IRWXG | stat.S_IRWXO)
 
-        # ✅ Recursively set permissions for all files and directories
-        for root, dirs, files in os.walk(clone_dir):
-            for dir_name in dirs:
-                os.chmod(os.path.join(root, dir_name), stat.S_IRWXU | stat.S_IRWXG | stat.S_IRWXO)
-            for file_name in files:
-                os.chmod(os.path.join(root, file_name),
-                         stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IWGRP | stat.S_IROTH)
+        # ✅ Recursively set permissions for all files and directories while cataloguing the clone
+        def set_permissions(entry):
+            if entry.is_dir(follow_symlinks=False):
+                os.chmod(entry.path, stat.S_IRWXU | stat.S_IRWXG | stat.S_IRWXO)
+            else:
+                os.chmod(entry.path, stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IWGRP | stat.S_IROTH)
+        repo_catalog.build_catalog(clone_dir, visit=set_permissions)
 
         logging.info(f"Permissions set for {clone_dir} to allow read & write access.")
 
@@ -230,6 +234,178 @@ def extract_api_endpoints(tree):
                             })
     return endpoints
 
+def extract_endpoint_parameters(method):
+    """Name, type and request source (body, path, query, header) of a controller method's parameters."""
+    sources = {'RequestBody': 'body', 'PathVariable': 'path', 'RequestParam': 'query', 'RequestHeader': 'header'}
+    parameters = []
+    for param in method.parameters:
+        source = next((sources[ann.name] for ann in param.annotations if ann.name in sources), None)
+        parameters.append({
+            "name": param.name,
+            "type": param.type.name,
+            "source": source
+        })
+    return parameters
+
+def java_type_names(java_type):
+    """Names of a type and its generic arguments, e.g. ResponseEntity<List<AccountDTO>> gives all three."""
+    if java_type is None:
+        return []
+    names = [java_type.name]
+    for argument in getattr(java_type, "arguments", None) or []:
+        names.extend(java_type_names(getattr(argument, "type", None)))
+    return names
+
+def java_type_string(java_type):
+    """Source-like spelling of a type for signatures and shapes, 'void' for None."""
+    if java_type is None:
+        return "void"
+    arguments = [java_type_string(getattr(a, "type", None)) for a in getattr(java_type, "arguments", None) or []]
+    generic = f"<{','.join(arguments)}>" if arguments else ""
+    return java_type.name + generic + "[]" * len(getattr(java_type, "dimensions", None) or [])
+
+def normalized_ast(node):
+    """JSON-serialisable form of an AST node without positions or comments."""
+    if isinstance(node, javalang.ast.Node):
+        return [type(node).__name__] + [normalized_ast(getattr(node, attr)) for attr in node.attrs if attr != "documentation"]
+    if isinstance(node, (list, tuple)):
+        return [normalized_ast(child) for child in node]
+    if isinstance(node, set):
+        return sorted(str(child) for child in node)
+    return node
+
+def ast_hash(node):
+    """Hash of the normalized AST, so reformatting, comments and moved lines do not change it."""
+    return hashlib.sha1(json.dumps(normalized_ast(node), default=str).encode("utf-8")).hexdigest()
+
+def extract_type_shapes(tree):
+    """Field lists of every class ({class: ["type name", ...]}), the shape of DTOs and entities."""
+    shapes = {}
+    for path, node in tree.filter(javalang.tree.ClassDeclaration):
+        shapes[node.name] = [f"{java_type_string(field.type)} {var.name}"
+                             for field in node.fields for var in field.declarators]
+    return shapes
+
+def extract_method_signatures(tree):
+    """Method signatures of every class and interface ({type: {method: ["signature", ...]}})."""
+    signatures = {}
+    for path, node in tree:
+        if isinstance(node, (javalang.tree.ClassDeclaration, javalang.tree.InterfaceDeclaration)):
+            methods = signatures.setdefault(node.name, {})
+            for method in node.methods:
+                params = ", ".join(java_type_string(param.type) for param in method.parameters)
+                methods.setdefault(method.name, []).append(f"{java_type_string(method.return_type)} {method.name}({params})")
+    return signatures
+
+def resolve_invocations(method, field_types, class_name):
+    """Sorted "Type.method" callees of a method, resolving receivers to their declared types.
+
+    Unqualified calls resolve to the method's own class, field and
+    this.field receivers to the injected field type, locals and parameters
+    to their declared type and capitalized qualifiers to static calls.
+    Calls on the result of another call are skipped as their type is unknown.
+    """
+    local_types = {param.name: param.type.name for param in method.parameters}
+    for _, local in method.filter(javalang.tree.LocalVariableDeclaration):
+        for var in local.declarators:
+            local_types[var.name] = local.type.name
+    callees = set()
+    for _, call in method.filter(javalang.tree.MethodInvocation):
+        if call.qualifier is None:
+            continue
+        receiver = call.qualifier.split(".")[0]
+        if not receiver:
+            callees.add(f"{class_name}.{call.member}")
+        elif receiver in local_types:
+            callees.add(f"{local_types[receiver]}.{call.member}")
+        elif receiver in field_types:
+            callees.add(f"{field_types[receiver]}.{call.member}")
+        elif receiver[0].isupper():
+            callees.add(f"{call.qualifier}.{call.member}")
+    for _, this in method.filter(javalang.tree.This):
+        selectors = this.selectors or []
+        for reference, call in zip(selectors, selectors[1:]):
+            if (isinstance(reference, javalang.tree.MemberReference) and isinstance(call, javalang.tree.MethodInvocation)
+                    and reference.member in field_types):
+                callees.add(f"{field_types[reference.member]}.{call.member}")
+    return sorted(callees)
+
+def extract_class_relations(tree, file_path):
+    """Fields, inheritance, per-method call graph and referenced types of the file's classes."""
+    relations = {"fields": [], "inheritance": [], "call_graph": [], "references": []}
+    for path, node in tree:
+        if not isinstance(node, (javalang.tree.ClassDeclaration, javalang.tree.InterfaceDeclaration)):
+            continue
+        if is_test_class(node.name, file_path):
+            continue
+        field_types = {}
+        for field in node.fields:
+            for var in field.declarators:
+                field_types[var.name] = field.type.name
+                relations["fields"].append({
+                    "class": node.name,
+                    "name": var.name,
+                    "type": java_type_string(field.type),
+                    "annotations": [ann.name for ann in field.annotations]
+                })
+        # Classes extend one type, interfaces a list of them
+        extends = node.extends if isinstance(node.extends, list) else [node.extends] if node.extends else []
+        relations["inheritance"].append({
+            "class": node.name,
+            "extends": [t.name for t in extends],
+            "implements": [t.name for t in getattr(node, "implements", None) or []]
+        })
+        for method in node.methods:
+            calls = resolve_invocations(method, field_types, node.name)
+            if calls:
+                relations["call_graph"].append({"caller": f"{node.name}.{method.name}", "calls": calls})
+        referenced = {ref.name for _, ref in node.filter(javalang.tree.ReferenceType)} - {node.name}
+        relations["references"].append({"class": node.name, "types": sorted(referenced)})
+    return relations
+
+def endpoint_fingerprint(endpoint, service_calls, type_shapes, method_signatures):
+    """Structural fingerprint of an endpoint, or None for index data without handler hashes.
+
+    Combines the normalized handler AST, the shapes of the request/response
+    types it uses and the signatures of the service methods it invokes, so an
+    endpoint only counts as changed when one of those does.
+    """
+    if "handler_hash" not in endpoint:
+        return None
+    services = {call["field"]: call["service"] for call in service_calls if call.get("class") == endpoint["class"]}
+    reached = []
+    for field, method_name in endpoint.get("service_invocations", []):
+        service = services.get(field)
+        if service:
+            for service_type in (service, f"{service}Impl"):
+                reached.append([service_type, method_signatures.get(service_type, {}).get(method_name)])
+    payload = {
+        "handler": endpoint["handler_hash"],
+        "types": {name: type_shapes.get(name) for name in sorted(set(endpoint.get("dto_types", [])))},
+        "services": sorted(reached, key=str)
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+def endpoint_fingerprints(api_flow_data):
+    """Fingerprints of all endpoints in API flow data, keyed like get_file_endpoints ids."""
+    return {f"{endpoint.get('http_method', '')}_{endpoint.get('path', '')}": endpoint.get("fingerprint")
+            for data in api_flow_data.values() for endpoint in data.get("endpoints", [])}
+
+def endpoint_locations(endpoint_ids, api_flow_data):
+    """(HTTP method, full path) of endpoint ids keyed like get_file_endpoints, e.g. ('POST', 'api/v1/accounts').
+
+    Ids that are no longer in the API flow (deleted endpoints) are returned unchanged.
+    """
+    locations = set()
+    resolved = set()
+    for full_path, data in api_flow_data.items():
+        for endpoint in data.get("endpoints", []):
+            endpoint_id = f"{endpoint.get('http_method', '')}_{endpoint.get('path', '')}"
+            if endpoint_id in endpoint_ids:
+                locations.add((endpoint.get("http_method", ""), full_path))
+                resolved.add(endpoint_id)
+    return locations | (set(endpoint_ids) - resolved)
+
 def extract_api_flow(tree, file_path):
     """Extract API flow including service and repository dependencies."""
     api_flow = {
@@ -294,12 +470,24 @@ def extract_api_flow(tree, file_path):
                                 break
                         
                         if http_method:
+                            parameters = extract_endpoint_parameters(member)
+                            dto_types = java_type_names(member.return_type)
+                            for param in member.parameters:
+                                if param.name in {p["name"] for p in parameters if p["source"] == "body"}:
+                                    dto_types.extend(java_type_names(param.type))
                             api_flow["endpoints"].append({
                                 "method": current_method,
                                 "path": endpoint_path,
                                 "class": current_class,
                                 "line_number": member.position.line,
-                                "http_method": http_method
+                                "http_method": http_method,
+                                "parameters": parameters,
+                                "handler_hash": ast_hash(member),
+                                "dto_types": dto_types,
+                                "service_invocations": sorted({
+                                    (call.qualifier, call.member)
+                                    for _, call in member.filter(javalang.tree.MethodInvocation) if call.qualifier
+                                })
                             })
             
             # Track service and repository dependencies
@@ -336,17 +524,20 @@ def parse_java_file(file_path):
     index_data = load_from_file(INDEX_JSON)
     package_name = get_package_name(file_path)
 
+    relations = extract_class_relations(tree, file_path)
     parsed_data = {
         "package": package_name,
         "classes": [], 
         "methods": [], 
-        "fields": [], 
+        "fields": relations["fields"], 
         "dependencies": [],
-        "call_graph": [], 
-        "inheritance": [], 
+        "call_graph": relations["call_graph"], 
+        "inheritance": relations["inheritance"], 
         "annotations": [], 
-        "references": [],
-        "api_flow": extract_api_flow(tree, file_path)
+        "references": relations["references"],
+        "api_flow": extract_api_flow(tree, file_path),
+        "type_shapes": extract_type_shapes(tree),
+        "method_signatures": extract_method_signatures(tree)
     }
 
     for path, node in tree:
@@ -377,6 +568,13 @@ def parse_java_file(file_path):
     # Clear existing data to avoid duplicates
     api_flow_data = {}
 
+    # DTO shapes and service signatures can live in any indexed file
+    type_shapes = {}
+    method_signatures = {}
+    for data in index_data.values():
+        type_shapes.update(data.get("type_shapes", {}))
+        method_signatures.update(data.get("method_signatures", {}))
+
     # Group endpoints by their full path
     for file_path, data in index_data.items():
         for endpoint in data.get("api_flow", {}).get("endpoints", []):
@@ -404,7 +602,11 @@ def parse_java_file(file_path):
                 "path": endpoint["path"],
                 "class": endpoint["class"],
                 "line_number": endpoint["line_number"],
-                "http_method": endpoint.get("http_method", "")
+                "http_method": endpoint.get("http_method", ""),
+                "parameters": endpoint.get("parameters", []),
+                "dto_types": endpoint.get("dto_types", []),
+                "fingerprint": endpoint_fingerprint(endpoint, data.get("api_flow", {}).get("service_calls", []),
+                                                    type_shapes, method_signatures)
             })
             
             # Add service calls for this endpoint's controller
@@ -474,22 +676,8 @@ def detect_changes_from_git(repo_path):
     
     if not last_commit:
         logging.info("No previous commit found. Treating all files as new.")
-        # Find all Java files in the repository
-        java_files = []
-        for root, _, files in os.walk(repo_path):
-            # Skip .git directories
-            if '.git' in root:
-                continue
-                
-            # Skip test directories
-            if 'test' in root.lower():
-                continue
-                
-            # Process Java files
-            for file in files:
-                if file.endswith(".java"):
-                    file_path = os.path.join(root, file)
-                    java_files.append(file_path)
+        # Find all Java files in the repository, skipping test directories
+        java_files = repo_catalog.java_files(repo_path)
         
         # Save the current commit hash
         save_last_commit(current_commit)
@@ -547,22 +735,10 @@ def scan_directory_incremental(directory):
     
     logging.info(f"Starting scan of directory: {directory}")
     
-    # Walk through all directories and find Java files
-    for root, dirs, files in os.walk(directory):
-        # Skip .git directories
-        if '.git' in root:
-            continue
-            
-        # Skip test directories
-        if 'test' in root.lower():
-            continue
-            
-        # Process Java files
-        for file in files:
-            if file.endswith(".java"):
-                file_path = os.path.join(root, file)
-                java_files.append(file_path)
-                logging.info(f"Adding file to analysis: {file_path}")
+    # Java files from the repository catalog, skipping test directories
+    for file_path in repo_catalog.java_files(directory):
+        java_files.append(file_path)
+        logging.info(f"Adding file to analysis: {file_path}")
 
     logging.info(f"Found {len(java_files)} Java files to analyze")
     
@@ -661,7 +837,9 @@ def call_openai_api(prompt, max_retries=3, retry_delay=2):
                 max_tokens=1000,
                 temperature=0.2
             )
-            return response.choices[0].message.content
+            completion = response.choices[0].message.content
+            prompt_builder.record_usage(prompt, completion, getattr(response, "usage", None))
+            return completion
         except Exception as e:
             logging.error(f"Error calling OpenAI API (attempt {attempt+1}/{max_retries}): {e}")
             if attempt < max_retries - 1:
@@ -699,16 +877,17 @@ def generate_bdd_test_cases():
             http_method = endpoint.get("http_method", "GET")
             endpoint_id = f"{http_method}_{endpoint_path.replace('/', '_').strip('_')}"
             
-            # Prepare the prompt with endpoint information
+            # Prepare the prompt with endpoint information and index facts within the token budget
             endpoint_info = {
                 "path": endpoint_path,
                 "method": http_method,
                 "controller": endpoint.get("class", ""),
                 "controller_method": endpoint.get("method", ""),
+                "parameters": endpoint.get("parameters", []),
                 "service_calls": endpoint_data.get("service_calls", [])
             }
             
-            prompt = f"{bdd_template}\n\nAPI Endpoint Information:\n```json\n{json.dumps(endpoint_info, indent=2)}\n```"
+            prompt = prompt_builder.build_bdd_prompt(bdd_template, endpoint_info, endpoint.get("dto_types", []))
             
             # Call OpenAI API to generate test cases
             test_cases = call_openai_api(prompt)
@@ -725,6 +904,8 @@ def generate_bdd_test_cases():
             generated_test_cases.append(test_case_file)
             logging.info(f"Generated BDD test cases for endpoint: {endpoint_path}")
     
+    logging.info(prompt_builder.usage_summary())
+    
     # Create a summary of generated test cases
     if generated_test_cases:
         summary_file = os.path.join(BDD_TEST_CASES_DIR, "test_cases_summary.md")
@@ -759,11 +940,12 @@ def generate_summaries(directory, force_regenerate=False):
         logging.info(f"BDD test cases generated: {bdd_test_summary}")
 
 
-def generate_api_flow_for_llm(directory):
+def generate_api_flow_for_llm(directory, affected_endpoints=None):
     """Generate API flow representation in JSON format for better LLM consumption.
     
     This creates a more structured representation of the API endpoints and their relationships
-    to controllers, services, and repositories for easier consumption by LLMs.
+    to controllers, services, and repositories for easier consumption by LLMs (see enhanced_flow.py).
+    With affected_endpoints, only those entries of an existing file are rebuilt.
     """
     logging.info("Generating API flow representation for LLM consumption...")
     
@@ -779,78 +961,16 @@ def generate_api_flow_for_llm(directory):
         logging.warning("No index data found. Run scan_directory_incremental first.")
         return None
     
-    # Create the enhanced API flow representation
-    enhanced_api_flow = {}
-    
-    for endpoint_path, endpoint_data in api_flow_data.items():
-        for endpoint in endpoint_data.get("endpoints", []):
-            endpoint_key = f"{endpoint_path}:{endpoint.get('http_method', 'GET')}"
-            
-            # Initialize the endpoint entry
-            if endpoint_key not in enhanced_api_flow:
-                enhanced_api_flow[endpoint_key] = {
-                    "endpoint": endpoint_path,
-                    "method": endpoint.get("http_method", "GET"),
-                    "controller": {
-                        "file": f"{endpoint.get('class', '')}.java",
-                        "method": endpoint.get("method", ""),
-                        "responsibility": f"Handles {endpoint_path} requests"
-                    },
-                    "serviceChain": [],
-                    "repositoryAccess": [],
-                    "dataModels": [],
-                    "dependencies": []
-                }
-            
-            # Add service chain information
-            for service_call in endpoint_data.get("service_calls", []):
-                service_info = {
-                    "file": f"{service_call.get('service', '')}.java",
-                    "method": "Unknown",  # We don't have this information in the current data
-                    "responsibility": f"Business logic for {endpoint_path}"
-                }
-                
-                if service_info not in enhanced_api_flow[endpoint_key]["serviceChain"]:
-                    enhanced_api_flow[endpoint_key]["serviceChain"].append(service_info)
-                
-                # Add as a dependency as well
-                if service_info["file"] not in enhanced_api_flow[endpoint_key]["dependencies"]:
-                    enhanced_api_flow[endpoint_key]["dependencies"].append(service_info["file"])
-            
-            # Try to find repository access information from the index data
-            for file_path, file_data in index_data.items():
-                # Check if this is a repository file
-                if "Repository" in file_path:
-                    # Add to repository access
-                    repo_info = {
-                        "file": os.path.basename(file_path),
-                        "method": "Unknown",  # We don't have this information in the current data
-                        "dataAccessed": os.path.basename(file_path).replace("Repository.java", "")
-                    }
-                    
-                    if repo_info not in enhanced_api_flow[endpoint_key]["repositoryAccess"]:
-                        enhanced_api_flow[endpoint_key]["repositoryAccess"].append(repo_info)
-                
-                # Check if this is a model file
-                elif "models" in file_path or "entities" in file_path:
-                    model_file = os.path.basename(file_path)
-                    if model_file not in enhanced_api_flow[endpoint_key]["dataModels"]:
-                        enhanced_api_flow[endpoint_key]["dataModels"].append(model_file)
-    
-    # Save the enhanced API flow representation
-    enhanced_api_flow_file = os.path.join(SUMMARY_DIR, "enhanced_api_flow.json")
-    with open(enhanced_api_flow_file, 'w', encoding='utf-8') as f:
-        json.dump(enhanced_api_flow, f, indent=2)
-    
-    logging.info(f"Enhanced API flow representation saved to {enhanced_api_flow_file}")
-    return enhanced_api_flow_file
+    return enhanced_flow.write_enhanced_flow(api_flow_data, index_data, affected_endpoints,
+                                             os.path.join(SUMMARY_DIR, "enhanced_api_flow.json"))
 
 
 def generate_component_relationship_matrix():
     """Generate a component relationship matrix showing dependencies between components.
     
     This creates a markdown table showing which components depend on which other components,
-    and which components use each component.
+    and which components use each component. The persisted component graph (component_graph.py)
+    is only updated for files whose imports changed.
     """
     logging.info("Generating component relationship matrix...")
     
@@ -860,44 +980,12 @@ def generate_component_relationship_matrix():
         logging.warning("No index data found. Run scan_directory_incremental first.")
         return None
     
-    # Create dictionaries to track dependencies
-    depends_on = defaultdict(set)
-    used_by = defaultdict(set)
-    
-    # Process all files to build the dependency graph
-    for file_path, file_data in index_data.items():
-        component_name = os.path.basename(file_path).replace(".java", "")
-        
-        # Process dependencies
-        for dependency in file_data.get("dependencies", []):
-            # Skip external dependencies
-            if any(ext_pkg in dependency for ext_pkg in EXTERNAL_PACKAGES):
-                continue
-                
-            # Extract the component name from the dependency
-            dep_parts = dependency.split(".")
-            if len(dep_parts) > 0:
-                dep_component = dep_parts[-1]
-                depends_on[component_name].add(dep_component)
-                used_by[dep_component].add(component_name)
-    
-    # Create the markdown table
-    matrix_content = "# Component Relationship Matrix\n\n"
-    matrix_content += "| Component | Depends On | Used By |\n"
-    matrix_content += "|-----------|-----------|--------|\n"
-    
-    # Sort components alphabetically
-    components = sorted(set(list(depends_on.keys()) + list(used_by.keys())))
-    
-    for component in components:
-        deps = ", ".join(sorted(depends_on[component])) if component in depends_on else ""
-        users = ", ".join(sorted(used_by[component])) if component in used_by else ""
-        matrix_content += f"| {component} | {deps} | {users} |\n"
+    graph = component_graph.load_graph(EXTERNAL_PACKAGES)
+    if graph.sync(index_data):
+        graph.save()
     
     # Save the matrix
-    matrix_file = os.path.join(SUMMARY_DIR, "component_relationship_matrix.md")
-    with open(matrix_file, 'w', encoding='utf-8') as f:
-        f.write(matrix_content)
+    matrix_file = graph.write_matrix(os.path.join(SUMMARY_DIR, "component_relationship_matrix.md"))
     
     logging.info(f"Component relationship matrix saved to {matrix_file}")
     return matrix_file
@@ -1183,6 +1271,7 @@ def update_affected_api_endpoints(modified_files, deleted_files, new_files):
     # Load the index and API flow data
     index_data = load_from_file(INDEX_JSON)
     api_flow_data = load_from_file(API_FLOW_JSON)
+    old_fingerprints = endpoint_fingerprints(api_flow_data)
     
     affected_endpoints = set()
     
@@ -1204,6 +1293,29 @@ def update_affected_api_endpoints(modified_files, deleted_files, new_files):
         file_endpoints = get_file_endpoints(file_path, index_data)
         affected_endpoints.update(file_endpoints)
     
+    # Endpoints of changed files whose structure is the same (e.g. another method of the
+    # controller changed, or only comments and formatting) need no regenerated test case
+    new_fingerprints = endpoint_fingerprints(load_from_file(API_FLOW_JSON))
+    unchanged = {endpoint_id for endpoint_id in affected_endpoints
+                 if old_fingerprints.get(endpoint_id) and old_fingerprints[endpoint_id] == new_fingerprints.get(endpoint_id)}
+    if unchanged:
+        logging.info(f"Skipping {len(unchanged)} endpoints whose structural fingerprint did not change.")
+        affected_endpoints -= unchanged
+    
+    # Every endpoint whose fingerprint is new or changed is regenerated, including those that only
+    # reach a changed file through a DTO or method signature get_file_endpoints does not follow
+    # (an index from before fingerprints has None for all endpoints and is not compared)
+    changed = {endpoint_id for endpoint_id, fingerprint in new_fingerprints.items()
+               if fingerprint and (endpoint_id not in old_fingerprints
+                                   or old_fingerprints[endpoint_id] and old_fingerprints[endpoint_id] != fingerprint)}
+    changed -= affected_endpoints
+    if changed:
+        logging.info(f"Adding {len(changed)} endpoints whose structural fingerprint changed.")
+        affected_endpoints |= changed
+    
+    # parse_java_file saved the re-parsed files; continue from that index
+    index_data = load_from_file(INDEX_JSON)
+    
     # Process deleted files
     for file_path in deleted_files:
         # Check if this file affected any API endpoints
@@ -1300,16 +1412,17 @@ def update_bdd_test_case(endpoint_id):
         logging.error("Failed to read BDD test case template.")
         return None
     
-    # Prepare the prompt with endpoint information
+    # Prepare the prompt with endpoint information and index facts within the token budget
     endpoint_info = {
         "path": path,
         "method": http_method,
         "controller": endpoint.get("class", ""),
         "controller_method": endpoint.get("method", ""),
+        "parameters": endpoint.get("parameters", []),
         "service_calls": endpoint_data.get("service_calls", [])
     }
     
-    prompt = f"{bdd_template}\n\nAPI Endpoint Information:\n```json\n{json.dumps(endpoint_info, indent=2)}\n```"
+    prompt = prompt_builder.build_bdd_prompt(bdd_template, endpoint_info, endpoint.get("dto_types", []))
     
     # Call OpenAI API to generate test cases
     test_cases = call_openai_api(prompt)
@@ -1330,13 +1443,28 @@ def update_summaries_and_test_cases(modified_files, deleted_files, new_files):
     """Update BDD test cases for modified, deleted, and new files."""
     logging.info("Updating BDD test cases...")
     
+    # Classes of the changed files before the update; deleted files leave the index
+    changed_classes = enhanced_flow.defined_classes(load_from_file(INDEX_JSON), list(modified_files) + list(deleted_files))
+    
     # Update affected API endpoints
     affected_endpoints = update_affected_api_endpoints(modified_files, deleted_files, new_files)
     
+    # Remember the change set so the next BDD run can select only impacted features; feature
+    # files are mapped by full path, so the method-level ids are resolved through the API flow
+    test_selection.record_changed_endpoints(endpoint_locations(affected_endpoints, load_from_file(API_FLOW_JSON)))
+    
     # Update BDD test cases for affected endpoints
     for endpoint_id in affected_endpoints:
         update_bdd_test_case(endpoint_id)
     
+    # Keep an existing enhanced API flow current without rebuilding unaffected entries. Its entries
+    # follow the call graph, so every endpoint reaching a changed class is rebuilt, whether or
+    # not its fingerprint changed
+    index_data = load_from_file(INDEX_JSON)
+    changed_classes |= enhanced_flow.defined_classes(index_data, list(modified_files) + list(new_files))
+    if changed_classes and os.path.exists(os.path.join(SUMMARY_DIR, "enhanced_api_flow.json")):
+        generate_api_flow_for_llm(None, enhanced_flow.endpoints_reaching(load_from_file(API_FLOW_JSON), index_data, changed_classes))
+    
     # Update BDD test cases summary
     if affected_endpoints:
         update_bdd_test_cases_summary()
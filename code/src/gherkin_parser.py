@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+"""
+Streaming Gherkin parser for step extraction.
+
+Feature files are read line by line in a single pass. Every line is
+classified once (comment, tag, section header, step, table row, doc string,
+description), so keywords inside descriptions, comments and doc strings are
+never taken for steps. And/But (and *) steps take the type of the preceding
+step, Background steps are kept separately, and Scenario Outline steps are
+expanded with the rows of their Examples tables, giving exactly the step
+texts behave will try to match.
+
+Parsed features are cached by content hash in code_index/gherkin_cache.json,
+so regenerating over hundreds of unchanged features only hashes them.
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import logging
+import argparse
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+INDEX_DIR = "code_index"
+CACHE_FILE = os.path.join(INDEX_DIR, "gherkin_cache.json")
+CACHE_VERSION = 1
+
+SECTION_KEYWORDS = [
+    ("Scenario Outline:", "outline"),
+    ("Scenario Template:", "outline"),
+    ("Background:", "background"),
+    ("Scenario:", "scenario"),
+    ("Example:", "scenario"),
+    ("Examples:", "examples"),
+    ("Scenarios:", "examples"),
+    ("Feature:", "feature"),
+    ("Rule:", "rule"),
+]
+STEP_KEYWORDS = {"Given": "given", "When": "when", "Then": "then", "And": None, "But": None, "*": None}
+DOCSTRING_DELIMITERS = ('"""', "```")
+PLACEHOLDER_PATTERN = re.compile(r"<([^<>]+)>")
+
+_memory_cache = {}
+
+def tokenize(lines):
+    """Yield (line_number, kind, keyword, text) for every line of a feature file.
+
+    kind is one of: blank, comment, tag, feature, rule, background, scenario,
+    outline, examples, step, row, docstring, description.
+    """
+    delimiter = None
+    for line_number, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if delimiter:
+            if stripped.startswith(delimiter):
+                delimiter = None
+            yield line_number, "docstring", None, stripped
+            continue
+        if not stripped:
+            yield line_number, "blank", None, ""
+            continue
+        if stripped.startswith("#"):
+            yield line_number, "comment", None, stripped
+            continue
+        if stripped.startswith("@"):
+            yield line_number, "tag", None, stripped
+            continue
+        if stripped.startswith("|"):
+            yield line_number, "row", None, stripped
+            continue
+        if stripped.startswith(DOCSTRING_DELIMITERS):
+            delimiter = stripped[:3]
+            yield line_number, "docstring", None, stripped
+            continue
+        for keyword, kind in SECTION_KEYWORDS:
+            if stripped.startswith(keyword):
+                yield line_number, kind, keyword, stripped[len(keyword):].strip()
+                break
+        else:
+            keyword, _, text = stripped.partition(" ")
+            if keyword in STEP_KEYWORDS and text.strip():
+                yield line_number, "step", keyword, text.strip()
+            else:
+                yield line_number, "description", None, stripped
+
+def split_row(row):
+    """Split a '| a | b |' table row into cells, honouring \\| and \\\\ escapes."""
+    cells = []
+    cell = []
+    chars = iter(row.strip()[1:])
+    for char in chars:
+        if char == "\\":
+            escaped = next(chars, "")
+            cell.append({"n": "\n", "|": "|", "\\": "\\"}.get(escaped, "\\" + escaped))
+        elif char == "|":
+            cells.append("".join(cell).strip())
+            cell = []
+        else:
+            cell.append(char)
+    return cells
+
+def parse_feature(lines):
+    """Parse feature file lines into a JSON-serialisable dict in a single pass."""
+    feature = {"name": None, "tags": [], "backgrounds": [], "scenarios": []}
+    pending_tags = []
+    section = None
+    rule = None
+    last_type = None
+    last_step = None
+    examples = None
+
+    for line_number, kind, keyword, text in tokenize(lines):
+        if kind == "tag":
+            pending_tags.extend(tag.lstrip("@") for tag in text.split() if tag.startswith("@"))
+        elif kind == "feature":
+            feature["name"] = text
+            feature["tags"] = pending_tags
+            pending_tags = []
+        elif kind == "rule":
+            rule = text
+            section = None
+            pending_tags = []
+        elif kind == "background":
+            section = {"rule": rule, "line": line_number, "steps": []}
+            feature["backgrounds"].append(section)
+            last_type = last_step = examples = None
+        elif kind in ("scenario", "outline"):
+            section = {
+                "name": text,
+                "line": line_number,
+                "rule": rule,
+                "tags": pending_tags,
+                "outline": kind == "outline",
+                "steps": [],
+                "examples": []
+            }
+            feature["scenarios"].append(section)
+            pending_tags = []
+            last_type = last_step = examples = None
+        elif kind == "examples":
+            examples = {"line": line_number, "tags": pending_tags, "header": None, "rows": []}
+            if section is not None and "examples" in section:
+                # Gherkin 6 allows Examples under a plain Scenario; it runs as an outline
+                section["outline"] = True
+                section["examples"].append(examples)
+            pending_tags = []
+            last_step = None
+        elif kind == "step" and section is not None:
+            # And/But/* continue the type of the previous step in the same section
+            step_type = STEP_KEYWORDS[keyword] or last_type or "given"
+            last_step = {"type": step_type, "keyword": keyword, "text": text, "line": line_number}
+            section["steps"].append(last_step)
+            last_type = step_type
+            examples = None
+        elif kind == "row":
+            if examples is not None:
+                if examples["header"] is None:
+                    examples["header"] = split_row(text)
+                else:
+                    examples["rows"].append(split_row(text))
+            elif last_step is not None:
+                last_step.setdefault("table", []).append(split_row(text))
+    return feature
+
+def expand_outline(scenario):
+    """Yield (type, text) for every step of a scenario, expanding outline placeholders."""
+    if not scenario.get("outline"):
+        for step in scenario["steps"]:
+            yield step["type"], step["text"]
+        return
+    for examples in scenario["examples"]:
+        header = examples["header"] or []
+        for row in examples["rows"]:
+            values = dict(zip(header, row))
+            for step in scenario["steps"]:
+                text = PLACEHOLDER_PATTERN.sub(lambda m: values.get(m.group(1), m.group(0)), step["text"])
+                yield step["type"], text
+
+def iter_steps(feature):
+    """Yield (type, text) for every step behave would run in a parsed feature."""
+    for background in feature["backgrounds"]:
+        for step in background["steps"]:
+            yield step["type"], step["text"]
+    for scenario in feature["scenarios"]:
+        yield from expand_outline(scenario)
+
+def load_cache(cache_file=CACHE_FILE):
+    """Load the parsed-feature cache; a missing, corrupt or outdated file is empty."""
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == CACHE_VERSION:
+            return cache.get("features", {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return {}
+
+def save_cache(features, cache_file=CACHE_FILE):
+    """Persist parsed features keyed by content hash."""
+    cache_dir = os.path.dirname(cache_file)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    with open(cache_file, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "features": features}, f)
+
+def parse_feature_file(file_path, cache=None):
+    """Parse a feature file, reusing a cached parse of identical content."""
+    with open(file_path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()
+    cache = _memory_cache if cache is None else cache
+    if digest not in cache:
+        cache[digest] = parse_feature(data.decode("utf-8").splitlines())
+    return digest, cache[digest]
+
+def parse_feature_dir(feature_dir, cache_file=CACHE_FILE):
+    """Parse every feature file in a directory; return {file_path: feature}.
+
+    Unchanged files are served from the content-hash cache, and entries for
+    content that no longer exists are dropped when the cache is saved.
+    """
+    cache = load_cache(cache_file) if cache_file else {}
+    _memory_cache.update(cache)
+    features = {}
+    used = {}
+    for entry in sorted(os.scandir(feature_dir), key=lambda e: e.name) if os.path.isdir(feature_dir) else []:
+        if not (entry.is_file() and entry.name.endswith(".feature")):
+            continue
+        try:
+            digest, feature = parse_feature_file(entry.path, _memory_cache)
+        except (OSError, UnicodeDecodeError) as e:
+            logging.warning(f"Could not read feature file {entry.path}: {e}")
+            continue
+        features[entry.path] = feature
+        used[digest] = feature
+
+    parsed = len(set(used) - set(cache))
+    if cache_file and (parsed or set(used) != set(cache)):
+        save_cache(used, cache_file)
+    logging.info(f"Parsed {len(features)} feature files ({parsed} changed since the last run)")
+    return features
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="List the steps of Gherkin feature files with resolved step types")
+    parser.add_argument("feature_dir", nargs="?", default=os.path.join("summary", "bdd_test_cases"))
+    parser.add_argument("--no-cache", action="store_true", help="Parse every feature file instead of using the cache")
+    args = parser.parse_args()
+
+    features = parse_feature_dir(args.feature_dir, None if args.no_cache else CACHE_FILE)
+    for file_path, feature in features.items():
+        print(f"{file_path}: {feature['name']}")
+        for step_type, text in iter_steps(feature):
+            print(f"  {step_type:<5} {text}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+"""
+Record-and-replay cassettes for HTTP calls made through `requests`.
+
+In record mode every request sent by the step definitions or test_api.py is
+forwarded to the application and the response is stored in a cassette file.
+In replay mode the responses are served from memory, so step definitions can
+be iterated without starting the application. Entries are keyed by method,
+path and normalized JSON body; repeated identical requests replay their
+responses in recorded order. The recorded elapsed times double as a latency
+baseline (see `python http_cassette.py summary <cassette>`).
+
+The mode is chosen with the HTTP_CASSETTE_MODE environment variable
+(record or replay) and the file with HTTP_CASSETTE_FILE.
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+import threading
+from urllib.parse import urlsplit
+
+import requests
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+MODE_ENV = "HTTP_CASSETTE_MODE"
+FILE_ENV = "HTTP_CASSETTE_FILE"
+DEFAULT_CASSETTE_FILE = os.path.join("summary", "bdd_test_cases", "cassettes", "api_cassette.json")
+RECORD = "record"
+REPLAY = "replay"
+
+_original_request = requests.Session.request
+_lock = threading.Lock()
+_active = None
+
+def normalize_body(data=None, json_body=None):
+    """Return a canonical string for a request body so equal payloads share a key."""
+    if json_body is not None:
+        return json.dumps(json_body, sort_keys=True, separators=(",", ":"))
+    if data is None:
+        return ""
+    if isinstance(data, bytes):
+        data = data.decode("utf-8", errors="replace")
+    if isinstance(data, str):
+        try:
+            return json.dumps(json.loads(data), sort_keys=True, separators=(",", ":"))
+        except json.JSONDecodeError:
+            return data
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+
+def request_key(method, url, data=None, json_body=None):
+    """Key a request by method, path (host and port ignored) and normalized body."""
+    path = urlsplit(url).path.rstrip("/") or "/"
+    return f"{method.upper()} {path} {normalize_body(data, json_body)}"
+
+def _route_of(key):
+    """The method and path part of a request key."""
+    return " ".join(key.split(" ", 2)[:2])
+
+class Cassette:
+    """Recorded request/response pairs plus replay cursors."""
+
+    def __init__(self, path, mode):
+        self.path = path
+        self.mode = mode
+        self.entries = {}
+        self.cursors = {}
+        self.misses = 0
+        if mode == REPLAY:
+            self.load()
+
+    def load(self):
+        """Load the cassette file; a missing file replays nothing."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("interactions", {})
+            logging.info(f"Loaded {sum(len(v) for v in self.entries.values())} recorded responses from {self.path}")
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            logging.warning(f"Could not load cassette {self.path}: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Write recorded interactions to the cassette file."""
+        cassette_dir = os.path.dirname(self.path)
+        if cassette_dir:
+            os.makedirs(cassette_dir, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"interactions": self.entries}, f, indent=1)
+        logging.info(f"Saved {sum(len(v) for v in self.entries.values())} responses to cassette {self.path}")
+
+    def record(self, key, response):
+        """Store a live response under its request key."""
+        entry = {
+            "status": response.status_code,
+            "content_type": response.headers.get("Content-Type", ""),
+            "body": response.text,
+            "elapsed_ms": round(response.elapsed.total_seconds() * 1000, 2)
+        }
+        with _lock:
+            self.entries.setdefault(key, []).append(entry)
+
+    def lookup(self, key):
+        """Next recorded response for a key, falling back to the same method and path."""
+        with _lock:
+            if key not in self.entries:
+                route = _route_of(key)
+                key = next((k for k in self.entries if _route_of(k) == route), None)
+                if key is None:
+                    self.misses += 1
+                    return None
+                logging.debug(f"No exact cassette match, replaying {key}")
+            responses = self.entries[key]
+            cursor = self.cursors.get(key, 0)
+            self.cursors[key] = cursor + 1
+            # Replay in recorded order and keep returning the last response after that
+            return responses[min(cursor, len(responses) - 1)]
+
+def _build_response(entry, method, url):
+    """Turn a cassette entry back into a requests.Response."""
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response._content = entry["body"].encode("utf-8")
+    response.encoding = "utf-8"
+    response.url = url
+    if entry.get("content_type"):
+        response.headers["Content-Type"] = entry["content_type"]
+    response.request = requests.Request(method, url).prepare()
+    return response
+
+def _cassette_request(session, method, url, **kwargs):
+    """Replacement for requests.Session.request while a cassette is active."""
+    key = request_key(method, url, kwargs.get("data"), kwargs.get("json"))
+    if _active.mode == REPLAY:
+        entry = _active.lookup(key)
+        if entry is None:
+            raise requests.ConnectionError(f"No recorded response in cassette for {key}")
+        return _build_response(entry, method, url)
+
+    response = _original_request(session, method, url, **kwargs)
+    _active.record(key, response)
+    return response
+
+def install(mode, path=DEFAULT_CASSETTE_FILE):
+    """Start recording or replaying all requests made through `requests`."""
+    global _active
+    if mode not in (RECORD, REPLAY):
+        logging.error(f"Unknown cassette mode '{mode}', expected '{RECORD}' or '{REPLAY}'")
+        return None
+    _active = Cassette(path, mode)
+    requests.Session.request = _cassette_request
+    logging.info(f"HTTP cassette {mode} mode active ({path})")
+    return _active
+
+def install_from_env():
+    """Install a cassette when HTTP_CASSETTE_MODE is set; return it or None."""
+    mode = os.environ.get(MODE_ENV)
+    if not mode:
+        return None
+    return install(mode, os.environ.get(FILE_ENV, DEFAULT_CASSETTE_FILE))
+
+def uninstall():
+    """Restore live HTTP, saving the cassette first when recording."""
+    global _active
+    if _active is None:
+        return
+    if _active.mode == RECORD:
+        _active.save()
+    elif _active.misses:
+        logging.warning(f"{_active.misses} requests had no recorded response in {_active.path}")
+    requests.Session.request = _original_request
+    _active = None
+
+def latency_baseline(path):
+    """Per-route request count, mean and max recorded latency in milliseconds."""
+    with open(path, "r", encoding="utf-8") as f:
+        interactions = json.load(f).get("interactions", {})
+    routes = {}
+    for key, responses in interactions.items():
+        routes.setdefault(_route_of(key), []).extend(r["elapsed_ms"] for r in responses)
+    return {
+        route: {"count": len(times), "mean_ms": round(sum(times) / len(times), 2), "max_ms": max(times)}
+        for route, times in routes.items()
+    }
+
+def main():
+    """Print the latency baseline stored in a cassette."""
+    parser = argparse.ArgumentParser(description="Inspect HTTP cassettes")
+    parser.add_argument("command", choices=["summary"], help="What to do with the cassette")
+    parser.add_argument("cassette", nargs="?", default=DEFAULT_CASSETTE_FILE, help="Cassette file")
+    args = parser.parse_args()
+
+    try:
+        baseline = latency_baseline(args.cassette)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logging.error(f"Could not read cassette {args.cassette}: {e}")
+        return 1
+
+    print(f"{'Route':<50} {'Count':>6} {'Mean ms':>10} {'Max ms':>10}")
+    for route, stats in sorted(baseline.items()):
+        print(f"{route:<50} {stats['count']:>6} {stats['mean_ms']:>10} {stats['max_ms']:>10}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
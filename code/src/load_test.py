@@ -0,0 +1,345 @@
+#!/usr/bin/env python
+"""
+Load-test mode for the generated BDD suite.
+
+Parses the generated feature files, loads the existing step definitions
+(steps/api_steps.py) and replays the scenarios as N concurrent virtual users
+for a fixed duration or number of iterations. Every HTTP call made by the
+steps is timed, and the run reports throughput plus p50/p95/p99 latency and
+error rate per endpoint, turning the functional suite into a performance
+regression suite.
+
+The virtual users are asyncio tasks. The step definitions use the blocking
+`requests` API, so each scenario runs in a thread pool sized to the number
+of users rather than on an async HTTP client; the steps themselves are
+reused unchanged.
+
+The environment.py hooks run as under behave: before_all and after_all once
+for the whole run (each virtual user starts from a copy of the context they
+set up), and the scenario and step hooks around every scenario and step.
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import asyncio
+import logging
+import argparse
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from behave.model_core import Status
+
+from step_metrics import endpoint_name
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+FEATURES_DIR = os.path.join("summary", "bdd_test_cases")
+REPORT_FILE = os.path.join("summary", "bdd_test_cases", "reports", "load_test_report.json")
+
+_untimed_request = requests.Session.request
+
+class UserData(dict):
+    """Minimal stand-in for behave's userdata."""
+
+class LoadConfig:
+    """Minimal stand-in for behave's context.config."""
+
+    def __init__(self, userdata):
+        self.userdata = UserData(userdata)
+
+class LoadContext:
+    """Attribute bag that step functions and environment hooks can use as a behave context."""
+
+    def __init__(self, userdata, stop_event=None):
+        self.config = LoadConfig(userdata)
+        self.table = None
+        self.text = None
+        self.stop_event = stop_event or threading.Event()
+
+    def for_user(self):
+        """A virtual user's context: the before_all setup, with its own copies of containers."""
+        context = LoadContext({}, self.stop_event)
+        for name, value in vars(self).items():
+            setattr(context, name, copy.copy(value) if isinstance(value, (dict, list, set)) else value)
+        return context
+
+    def abort(self, reason=None):
+        """Stop all virtual users (e.g. when bdd_budget's failure limit is hit)."""
+        self.stop_event.set()
+
+    def use_with_user_mode(self):
+        return contextlib.nullcontext()
+
+class RunItem:
+    """One run of a parsed scenario or step, with its own status.
+
+    The parsed scenarios are shared by all virtual users, so results are
+    kept on these wrappers instead; other attributes come from the parsed
+    model.
+    """
+
+    def __init__(self, item):
+        self.item = item
+        self.status = Status.untested
+        self.exception = None
+
+    def __getattr__(self, name):
+        return getattr(self.item, name)
+
+class LatencyRecorder:
+    """Thread-safe per-endpoint latencies and error counts."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, endpoint, elapsed_ms, error):
+        with self.lock:
+            self.latencies.setdefault(endpoint, []).append(elapsed_ms)
+            if error:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+def install_timing(recorder):
+    """Time every request made through `requests` (on top of the hooks' patches) and record it per endpoint."""
+    global _untimed_request
+    _untimed_request = untimed = requests.Session.request
+
+    def timed_request(session, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = untimed(session, method, url, **kwargs)
+        except requests.RequestException:
+            recorder.record(endpoint_name(method, url), (time.perf_counter() - start) * 1000, True)
+            raise
+        recorder.record(endpoint_name(method, url), (time.perf_counter() - start) * 1000, response.status_code >= 500)
+        return response
+
+    requests.Session.request = timed_request
+
+def uninstall_timing():
+    """Restore the untimed requests implementation."""
+    requests.Session.request = _untimed_request
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+def load_steps(features_dir):
+    """Execute the step modules so their definitions land in behave's registry."""
+    from behave.runner_util import exec_file
+
+    steps_dir = os.path.join(features_dir, "steps")
+    sys.path.insert(0, steps_dir)
+    for file in sorted(os.listdir(steps_dir)):
+        if file.endswith(".py") and not file.startswith("__"):
+            exec_file(os.path.join(steps_dir, file), {})
+
+def load_environment(features_dir):
+    """Load environment.py hooks, if any."""
+    from behave.runner_util import exec_file
+
+    env_file = os.path.join(features_dir, "environment.py")
+    hooks = {}
+    if os.path.exists(env_file):
+        exec_file(env_file, hooks)
+    return hooks
+
+def load_scenarios(features_dir, feature_names=None):
+    """Parse feature files and keep the scenarios whose steps are all defined."""
+    from behave.parser import parse_file
+    from behave.step_registry import registry
+
+    runnable = []
+    skipped = 0
+    for file in sorted(os.listdir(features_dir)):
+        if not file.endswith(".feature") or (feature_names and file not in feature_names):
+            continue
+        feature = parse_file(os.path.join(features_dir, file))
+        if feature is None:
+            continue
+        for scenario in feature.walk_scenarios():
+            steps = list(feature.background.steps if feature.background else []) + list(scenario.steps)
+            matches = [registry.find_match(step) for step in steps]
+            if all(matches):
+                runnable.append((scenario, list(zip(steps, matches))))
+            else:
+                skipped += 1
+    logging.info(f"Loaded {len(runnable)} runnable scenarios ({skipped} skipped with undefined steps)")
+    return runnable
+
+def run_hook(hooks, name, *args):
+    """Run an environment hook if it is defined; return the exception it raised, if any."""
+    if name not in hooks:
+        return None
+    try:
+        hooks[name](*args)
+        return None
+    except Exception as e:
+        logging.debug(f"Hook {name} failed: {e}")
+        return e
+
+def failed_status(error):
+    """behave's status for a step that raised: assertions fail, other exceptions are errors."""
+    return Status.failed if isinstance(error, AssertionError) else Status.error
+
+def run_scenario(hooks, context, scenario):
+    """Run one scenario and its hooks synchronously; return True if every step passed."""
+    parsed, steps = scenario
+    run = RunItem(parsed)
+    # Like behave's scenario layer: attributes set during the scenario are dropped afterwards
+    saved = dict(vars(context))
+    context.scenario = run
+    try:
+        if run_hook(hooks, "before_scenario", context, run):
+            run.status = Status.hook_error
+        for step, match in steps:
+            step_run = RunItem(step)
+            if run.status != Status.untested:
+                step_run.status = Status.skipped
+                continue
+            context.table = step.table
+            context.text = step.text
+            error = run_hook(hooks, "before_step", context, step_run)
+            if error is None:
+                try:
+                    match.run(context)
+                    step_run.status = Status.passed
+                except Exception as e:
+                    error = e
+            if error is not None:
+                logging.debug(f"Scenario '{parsed.name}' failed at '{step.name}': {error}")
+                step_run.status = run.status = failed_status(error)
+                step_run.exception = error
+            run_hook(hooks, "after_step", context, step_run)
+        if run.status == Status.untested:
+            run.status = Status.passed
+        if run_hook(hooks, "after_scenario", context, run) and run.status == Status.passed:
+            run.status = Status.hook_error
+        return run.status == Status.passed
+    finally:
+        vars(context).clear()
+        vars(context).update(saved)
+
+async def virtual_user(user_id, loop, executor, hooks, shared, scenarios, deadline, iterations, results):
+    """Replay scenarios round-robin until the deadline or iteration count is reached."""
+    context = shared.for_user()
+    count = 0
+    while ((iterations and count < iterations) or (not iterations and time.monotonic() < deadline)) \
+            and not shared.stop_event.is_set():
+        scenario = scenarios[(user_id + count) % len(scenarios)]
+        passed = await loop.run_in_executor(executor, run_scenario, hooks, context, scenario)
+        results["scenarios"] += 1
+        if not passed:
+            results["failed_scenarios"] += 1
+        count += 1
+
+async def run_load(users, duration, iterations, hooks, shared, scenarios):
+    """Run the virtual users concurrently, starting from the context before_all set up."""
+    loop = asyncio.get_running_loop()
+    results = {"scenarios": 0, "failed_scenarios": 0}
+    deadline = time.monotonic() + duration
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        await asyncio.gather(*[
+            virtual_user(user_id, loop, executor, hooks, shared, scenarios, deadline, iterations, results)
+            for user_id in range(users)
+        ])
+    return results
+
+def build_report(recorder, results, elapsed, users):
+    """Summarise throughput, latency percentiles and error rates per endpoint."""
+    endpoints = {}
+    for endpoint, latencies in sorted(recorder.latencies.items()):
+        latencies = sorted(latencies)
+        errors = recorder.errors.get(endpoint, 0)
+        endpoints[endpoint] = {
+            "requests": len(latencies),
+            "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "error_rate": round(errors / len(latencies), 4)
+        }
+    total_requests = sum(e["requests"] for e in endpoints.values())
+    return {
+        "users": users,
+        "duration_s": round(elapsed, 2),
+        "scenarios": results["scenarios"],
+        "failed_scenarios": results["failed_scenarios"],
+        "requests": total_requests,
+        "throughput_rps": round(total_requests / elapsed, 2) if elapsed else 0.0,
+        "endpoints": endpoints
+    }
+
+def print_report(report):
+    """Print the load test report as a table."""
+    print(f"\nUsers: {report['users']}  Duration: {report['duration_s']}s  "
+          f"Scenarios: {report['scenarios']} ({report['failed_scenarios']} failed)  "
+          f"Requests: {report['requests']}  Throughput: {report['throughput_rps']} req/s\n")
+    print(f"{'Endpoint':<50} {'Reqs':>7} {'RPS':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'Errors':>7}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:<50} {stats['requests']:>7} {stats['throughput_rps']:>8} {stats['p50_ms']:>8} "
+              f"{stats['p95_ms']:>8} {stats['p99_ms']:>8} {stats['error_rate']:>7.1%}")
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Replay the generated BDD scenarios as concurrent virtual users")
+    parser.add_argument("--features-dir", default=FEATURES_DIR, help="Directory with feature files, steps/ and environment.py")
+    parser.add_argument("--users", type=int, default=10, help="Number of concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Run for this many seconds")
+    parser.add_argument("--iterations", type=int, help="Scenarios per user instead of a fixed duration")
+    parser.add_argument("--base-url", help="API base URL (defaults to API_BASE_URL or the environment.py default)")
+    parser.add_argument("--report", default=REPORT_FILE, help="Where to write the JSON report")
+    parser.add_argument("feature", nargs="*", help="Only replay these feature files")
+    args = parser.parse_args()
+
+    # Step modules log every request; keep the load run readable
+    logging.getLogger().setLevel(logging.WARNING)
+
+    load_steps(args.features_dir)
+    hooks = load_environment(args.features_dir)
+    scenarios = load_scenarios(args.features_dir, args.feature)
+    if not scenarios:
+        logging.error("No runnable scenarios found. Check that the step definitions cover the feature files.")
+        return 1
+
+    # Set up once for all virtual users: API check, account pool and request instrumentation
+    shared = LoadContext({"base_url": args.base_url} if args.base_url else {})
+    error = run_hook(hooks, "before_all", shared)
+    if error:
+        logging.error(f"before_all failed: {error}")
+        return 1
+    recorder = LatencyRecorder()
+    install_timing(recorder)
+    start = time.monotonic()
+    try:
+        results = asyncio.run(run_load(args.users, args.duration, args.iterations, hooks, shared, scenarios))
+    finally:
+        uninstall_timing()
+        run_hook(hooks, "after_all", shared)
+    elapsed = time.monotonic() - start
+    if shared.stop_event.is_set():
+        logging.warning("The load test was stopped early by the failure limit")
+
+    report = build_report(recorder, results, elapsed, args.users)
+    print_report(report)
+
+    os.makedirs(os.path.dirname(args.report), exist_ok=True)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nLoad test report written to {args.report}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""
+Background log pump for launched application processes.
+
+A process started with stdout=PIPE and stderr=PIPE blocks as soon as the OS
+pipe buffer fills up, so both streams have to be drained for as long as the
+process runs. The pump reads each stream on its own thread, writes every line
+to a rotating log file, keeps the most recent lines in memory for failure
+diagnostics and signals readiness when a line matches the readiness check.
+
+A detached process outlives the threads that would drain its pipes, so it
+writes to the log file itself (open_log_file) and LogTail follows that file
+for readiness and diagnostics instead.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+LOG_DIR = "logs"
+APP_LOG_FILE = os.path.join(LOG_DIR, "spring_app.log")
+MAX_LOG_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+RING_BUFFER_SIZE = 200
+
+def spring_boot_ready(line):
+    """Readiness check for the Spring Boot 'Started ... in ... seconds' banner."""
+    return "Started " in line and "in" in line and "seconds" in line
+
+class LogPump:
+    """Drain a process's stdout and stderr on background threads."""
+
+    def __init__(self, process, log_file=APP_LOG_FILE, ready_check=spring_boot_ready, ring_size=RING_BUFFER_SIZE, write_log=True):
+        self.process = process
+        self.ready_check = ready_check
+        self.ready = threading.Event()
+        self.lines = deque(maxlen=ring_size)
+        self.lock = threading.Lock()
+        self.threads = []
+        self.log_file = log_file
+        self.handler = None
+        # Without write_log the process writes the log file itself (see LogTail)
+        if write_log:
+            self._open_log()
+
+    def _open_log(self):
+        """Write captured lines to the rotating log file."""
+        log_dir = os.path.dirname(self.log_file)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        self.logger = logging.getLogger(f"app_output.{self.process.pid}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.handler = RotatingFileHandler(self.log_file, maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+        self.handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
+        self.logger.addHandler(self.handler)
+
+    def start(self):
+        """Start one reader thread per captured stream."""
+        for name, stream in [("stdout", self.process.stdout), ("stderr", self.process.stderr)]:
+            if stream is None:
+                continue
+            thread = threading.Thread(target=self._pump, args=(name, stream), name=f"log-pump-{name}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logging.info(f"Streaming application output to {self.log_file}")
+        return self
+
+    def _pump(self, name, stream):
+        """Read lines from a stream until it closes."""
+        try:
+            for line in iter(stream.readline, ""):
+                line = line.rstrip("\r\n")
+                with self.lock:
+                    self.lines.append(f"[{name}] {line}")
+                self.logger.info(f"[{name}] {line}")
+                logging.debug(line)
+                if not self.ready.is_set() and self.ready_check and self.ready_check(line):
+                    self.ready.set()
+        except (ValueError, OSError):
+            # The stream was closed underneath us while the process shut down
+            pass
+
+    def wait_until_ready(self, timeout):
+        """Wait for the readiness check to match; return False on timeout or process exit."""
+        waited = 0.0
+        while waited < timeout:
+            if self.ready.wait(0.5):
+                return True
+            if self.process.poll() is not None:
+                return self.ready.is_set()
+            waited += 0.5
+        return self.ready.is_set()
+
+    def tail(self, count=50):
+        """Return the last `count` captured lines."""
+        with self.lock:
+            return list(self.lines)[-count:]
+
+    def stop(self, timeout=2):
+        """Wait briefly for the reader threads and close the log file."""
+        for thread in self.threads:
+            thread.join(timeout)
+        if self.handler:
+            self.logger.removeHandler(self.handler)
+            self.handler.close()
+
+def open_log_file(log_file=APP_LOG_FILE):
+    """Open the log file for a detached process to write its output to directly.
+
+    The file is rotated first when it has reached MAX_LOG_BYTES; it is not
+    rotated while the detached process runs.
+    """
+    log_dir = os.path.dirname(log_file)
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    if os.path.exists(log_file) and os.path.getsize(log_file) >= MAX_LOG_BYTES:
+        handler = RotatingFileHandler(log_file, maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+        handler.doRollover()
+        handler.close()
+    return open(log_file, "a", encoding="utf-8")
+
+class LogTail(LogPump):
+    """Follow the log file a detached process writes to, with the same interface as LogPump."""
+
+    def __init__(self, process, log_file=APP_LOG_FILE, ready_check=spring_boot_ready, ring_size=RING_BUFFER_SIZE, offset=0):
+        super().__init__(process, log_file, ready_check, ring_size, write_log=False)
+        self.stopped = threading.Event()
+        # Where the process started writing, so earlier runs' output is skipped
+        self.offset = offset
+
+    def start(self):
+        """Start the thread that follows the log file."""
+        thread = threading.Thread(target=self._follow, name="log-tail", daemon=True)
+        thread.start()
+        self.threads.append(thread)
+        logging.info(f"Application output is written to {self.log_file}")
+        return self
+
+    def _follow(self):
+        """Read new lines from the log file until stopped or the process exits."""
+        with open(self.log_file, "r", encoding="utf-8", errors="replace") as f:
+            f.seek(self.offset)
+            while not self.stopped.is_set():
+                # Checked before reading so output written before the exit is still read
+                exited = self.process.poll() is not None
+                position = f.tell()
+                line = f.readline()
+                if not line.endswith("\n") and not exited:
+                    # Nothing new yet, or a line that is still being written
+                    f.seek(position)
+                    time.sleep(0.2)
+                    continue
+                if not line:
+                    break
+                line = line.rstrip("\r\n")
+                with self.lock:
+                    self.lines.append(line)
+                if not self.ready.is_set() and self.ready_check and self.ready_check(line):
+                    self.ready.set()
+
+    def stop(self, timeout=2):
+        """Stop following the log file; the process keeps writing to it."""
+        self.stopped.set()
+        for thread in self.threads:
+            thread.join(timeout)
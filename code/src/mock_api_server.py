@@ -0,0 +1,350 @@
+#!/usr/bin/env python
+"""
+In-process mock of the Spring Boot banking API.
+
+Routes are derived from code_index/api_flow.json, so the mock serves the same
+paths and HTTP methods as the indexed controllers. Requests for known
+controller methods (account creation, balance checks, deposits, withdrawals,
+transfers, transaction status) run against stateful in-memory accounts;
+any other indexed route gets a generic JSON success response.
+
+The server is a ThreadingHTTPServer speaking HTTP/1.1 with keep-alive, so it
+can be used for high-concurrency BDD runs without the JVM or Docker, either
+from another module (start_in_background) or standalone:
+
+    python mock_api_server.py --port 8080
+"""
+
+import os
+import re
+import sys
+import json
+import uuid
+import random
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+API_FLOW_FILE = os.path.join("code_index", "api_flow.json")
+DEFAULT_SORT_CODE = "53-68-92"
+
+# Fallback routes used when api_flow.json is missing
+DEFAULT_API_FLOW = {
+    "api/v1/accounts": {"endpoints": [
+        {"method": "checkAccountBalance", "path": "/accounts", "http_method": "POST"},
+        {"method": "createAccount", "path": "/accounts", "http_method": "PUT"}
+    ]},
+    "api/v1/transactions": {"endpoints": [
+        {"method": "makeTransfer", "path": "/transactions", "http_method": "POST"}
+    ]},
+    "api/v1/withdraw": {"endpoints": [
+        {"method": "withdraw", "path": "/withdraw", "http_method": "POST"}
+    ]},
+    "api/v1/deposit": {"endpoints": [
+        {"method": "deposit", "path": "/deposit", "http_method": "POST"}
+    ]},
+    "api/v1/transactions/{transactionId}/status": {"endpoints": [
+        {"method": "getTransactionStatus", "path": "/transactions/{transactionId}/status", "http_method": "GET"}
+    ]}
+}
+
+def load_api_flow(api_flow_file=API_FLOW_FILE):
+    """Load the API flow index, falling back to the known banking routes."""
+    try:
+        with open(api_flow_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logging.warning(f"Could not load {api_flow_file} ({e}); using default banking routes")
+        return DEFAULT_API_FLOW
+
+def build_routes(api_flow):
+    """Turn the API flow index into (http_method, regex, controller_method, path) routes.
+
+    Path variables such as {transactionId} become named groups. Routes also
+    match when a client repeats the API prefix (base URL ending in /api/v1
+    plus an endpoint starting with api/v1), which the generated steps do.
+    """
+    routes = []
+    for api_path, flow in api_flow.items():
+        full_path = "/" + api_path.strip("/")
+        pattern = ""
+        for part in re.split(r"(\{\w+\})", full_path):
+            variable = re.fullmatch(r"\{(\w+)\}", part)
+            pattern += f"(?P<{variable.group(1)}>[^/]+)" if variable else re.escape(part)
+        regex = re.compile(rf"^(?:/.*)?{pattern}/?$")
+        for endpoint in flow.get("endpoints", []):
+            http_method = endpoint.get("http_method", "GET").upper()
+            routes.append((http_method, regex, endpoint.get("method", ""), full_path))
+    # Most specific routes first so /transactions/{id}/status wins over /transactions
+    routes.sort(key=lambda route: len(route[3]), reverse=True)
+    return routes
+
+class BankState:
+    """Thread-safe in-memory accounts and transactions."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.accounts = {}
+        self.transactions = {}
+
+    def create_account(self, bank_name, owner_name):
+        """Open an account and return a copy of it."""
+        with self.lock:
+            account_number = str(random.randint(10000000, 99999999))
+            while account_number in self.accounts:
+                account_number = str(random.randint(10000000, 99999999))
+            account = {
+                "id": len(self.accounts) + 1,
+                "sortCode": DEFAULT_SORT_CODE,
+                "accountNumber": account_number,
+                "currentBalance": 0.0,
+                "bankName": bank_name,
+                "ownerName": owner_name,
+                "transactions": []
+            }
+            self.accounts[account_number] = account
+            return dict(account)
+
+    def get_account(self, account_number, sort_code=None):
+        """Return a copy of an account, or None if it does not exist."""
+        with self.lock:
+            account = self.accounts.get(str(account_number))
+            if account is None or (sort_code and account["sortCode"] != sort_code):
+                return None
+            return dict(account)
+
+    def adjust_balance(self, account_number, delta):
+        """Apply a balance change; return (account, error) with error one of None, 'not_found', 'insufficient'."""
+        with self.lock:
+            account = self.accounts.get(str(account_number))
+            if account is None:
+                return None, "not_found"
+            if account["currentBalance"] + delta < 0:
+                return dict(account), "insufficient"
+            account["currentBalance"] = round(account["currentBalance"] + delta, 2)
+            return dict(account), None
+
+    def transfer(self, source_number, target_number, amount, reference):
+        """Move money between accounts atomically; return (transaction, error)."""
+        with self.lock:
+            source = self.accounts.get(str(source_number))
+            target = self.accounts.get(str(target_number))
+            if source is None or target is None:
+                return None, "not_found"
+            if source["currentBalance"] < amount:
+                return None, "insufficient"
+            source["currentBalance"] = round(source["currentBalance"] - amount, 2)
+            target["currentBalance"] = round(target["currentBalance"] + amount, 2)
+            transaction = {
+                "transactionId": str(uuid.uuid4()),
+                "sourceAccountNumber": source["accountNumber"],
+                "targetAccountNumber": target["accountNumber"],
+                "amount": amount,
+                "reference": reference,
+                "status": "COMPLETED"
+            }
+            self.transactions[transaction["transactionId"]] = transaction
+            return dict(transaction), None
+
+def _amount(payload):
+    """Parse a positive amount from a request payload, or return None."""
+    try:
+        amount = float(payload.get("amount"))
+    except (TypeError, ValueError):
+        return None
+    return amount if amount > 0 else None
+
+def handle_create_account(state, payload, params):
+    """PUT /accounts: open an account with a zero balance."""
+    if not payload.get("bankName") or not payload.get("ownerName"):
+        return 400, {"message": "bankName and ownerName are required"}
+    return 200, state.create_account(payload["bankName"], payload["ownerName"])
+
+def handle_check_balance(state, payload, params):
+    """POST /accounts: return the account identified by sort code and number."""
+    if not payload.get("accountNumber") or not payload.get("sortCode"):
+        return 400, {"message": "sortCode and accountNumber are required"}
+    account = state.get_account(payload["accountNumber"], payload["sortCode"])
+    if account is None:
+        return 404, {"message": "Account not found"}
+    return 200, account
+
+def handle_deposit(state, payload, params):
+    """POST /deposit: add a positive amount to the target account."""
+    account_number = payload.get("targetAccountNo") or payload.get("accountNumber")
+    if not account_number:
+        return 400, {"message": "targetAccountNo is required"}
+    amount = _amount(payload)
+    if amount is None:
+        return 400, {"message": "Invalid deposit amount"}
+    account, error = state.adjust_balance(account_number, amount)
+    if error == "not_found":
+        return 404, {"message": "Account not found"}
+    return 200, account
+
+def handle_withdraw(state, payload, params):
+    """POST /withdraw: take a positive amount from an account with enough balance."""
+    if not payload.get("accountNumber"):
+        return 400, {"message": "sortCode and accountNumber are required"}
+    amount = _amount(payload)
+    if amount is None:
+        return 400, {"message": "Invalid withdrawal amount"}
+    if state.get_account(payload["accountNumber"], payload.get("sortCode")) is None:
+        return 404, {"message": "Account not found"}
+    account, error = state.adjust_balance(payload["accountNumber"], -amount)
+    if error == "insufficient":
+        return 400, {"message": "Insufficient balance"}
+    return 200, account
+
+def handle_transfer(state, payload, params):
+    """POST /transactions: move money from the source to the target account."""
+    source = payload.get("sourceAccount") or {}
+    target = payload.get("targetAccount") or {}
+    if not source.get("accountNumber") or not target.get("accountNumber"):
+        return 400, {"message": "Invalid account details"}
+    amount = _amount(payload)
+    if amount is None:
+        return 400, {"message": "Invalid transaction details"}
+    transaction, error = state.transfer(source["accountNumber"], target["accountNumber"], amount, payload.get("reference", ""))
+    if error == "not_found":
+        return 400, {"message": "Invalid account details"}
+    if error == "insufficient":
+        return 400, {"message": "Insufficient balance"}
+    # The transaction's own status is COMPLETED; the envelope's status comes last so it is kept
+    return 200, {**transaction, "status": "success", "message": "Transaction completed successfully"}
+
+def handle_transaction_status(state, payload, params):
+    """GET /transactions/{transactionId}/status: report a recorded transfer."""
+    transaction_id = params.get("transactionId")
+    if not transaction_id:
+        return 400, {"message": "transactionId is required"}
+    with state.lock:
+        transaction = state.transactions.get(transaction_id)
+    if transaction is None:
+        return 404, {"message": "Transaction not found"}
+    return 200, {"transactionId": transaction_id, "status": transaction["status"]}
+
+# Controller method name (from api_flow.json) -> stateful handler
+HANDLERS = {
+    "createAccount": handle_create_account,
+    "checkAccountBalance": handle_check_balance,
+    "deposit": handle_deposit,
+    "withdraw": handle_withdraw,
+    "makeTransfer": handle_transfer,
+    "getTransactionStatus": handle_transaction_status
+}
+
+def handle_generic(state, payload, params):
+    """Response for indexed routes without a dedicated handler."""
+    return 200, {"status": "success", "message": "Operation completed successfully", **params}
+
+class MockAPIHandler(BaseHTTPRequestHandler):
+    """Dispatch requests to the route handlers; HTTP/1.1 keeps connections open."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle's algorithm
+    # plus delayed ACKs add ~40 ms to every response on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def _send_json(self, status_code, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_payload(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        raw = self.rfile.read(length)
+        try:
+            payload = json.loads(raw.decode("utf-8"))
+            return payload if isinstance(payload, dict) else {}
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return None
+
+    def _dispatch(self):
+        payload = self._read_payload()
+        if payload is None:
+            self._send_json(400, {"message": "Malformed JSON request body"})
+            return
+
+        path = self.path.split("?", 1)[0]
+        path_matched = False
+        for http_method, regex, controller_method, _ in self.server.routes:
+            match = regex.match(path)
+            if not match:
+                continue
+            path_matched = True
+            if http_method != self.command:
+                continue
+            handler = HANDLERS.get(controller_method, handle_generic)
+            status_code, body = handler(self.server.state, payload, match.groupdict())
+            self._send_json(status_code, body)
+            return
+
+        if path_matched:
+            self._send_json(405, {"message": f"Method {self.command} not allowed for {path}"})
+        elif self.command == "GET":
+            # Root and unknown GETs act as a health check, like the previous mock
+            self._send_json(200, {"message": "Mock Spring Boot Banking API", "status": "UP", "version": "1.0.0"})
+        else:
+            self._send_json(404, {"message": f"No route for {path}"})
+
+    do_GET = _dispatch
+    do_POST = _dispatch
+    do_PUT = _dispatch
+    do_DELETE = _dispatch
+
+    def log_message(self, format, *args):
+        logging.debug(f"Mock API: {format % args}")
+
+class MockAPIServer(ThreadingHTTPServer):
+    """Threaded mock server holding the routes and the shared bank state."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, port=8080, api_flow_file=API_FLOW_FILE, host=""):
+        self.routes = build_routes(load_api_flow(api_flow_file))
+        self.state = BankState()
+        super().__init__((host, port), MockAPIHandler)
+
+    @property
+    def base_url(self):
+        return f"http://localhost:{self.server_address[1]}/api/v1"
+
+def start_in_background(port=0, api_flow_file=API_FLOW_FILE):
+    """Start the mock server on a daemon thread; port 0 picks a free port."""
+    server = MockAPIServer(port, api_flow_file)
+    thread = threading.Thread(target=server.serve_forever, name="mock-api-server", daemon=True)
+    thread.start()
+    logging.info(f"Mock API server with {len(server.routes)} routes running at {server.base_url}")
+    return server
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Run a mock of the banking API derived from api_flow.json")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--api-flow", default=API_FLOW_FILE, help="Path to api_flow.json")
+    args = parser.parse_args()
+
+    server = MockAPIServer(args.port, args.api_flow)
+    logging.info(f"Serving mock API with {len(server.routes)} routes at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+"""
+Streaming Postman collection ingestion.
+
+Candidate files come from the repository catalog. Each one is sniffed by
+reading only its first few kilobytes: a Postman collection starts with an
+"info" object carrying the Postman schema URL or _postman_id, so any other
+JSON file is rejected without being parsed. Accepted collections are hashed
+and extracted once; the request bodies they contain are cached per content
+hash in code_index/postman_samples.json, shared by all repositories, so
+later runs only re-extract collections that changed.
+
+Samples are indexed by method and normalized full path, e.g.
+"PUT api/v1/accounts" or "GET api/v1/transactions/{id}/status", so
+/accounts and /admin/accounts no longer collide.
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import logging
+import argparse
+from urllib.parse import urlsplit
+
+import repo_catalog
+
+try:
+    import ijson
+    # ijson's parse errors (e.g. IncompleteJSONError) do not derive from ValueError
+    PARSE_ERRORS = (OSError, ValueError, ijson.JSONError)
+except ImportError:
+    ijson = None
+    PARSE_ERRORS = (OSError, ValueError)
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+INDEX_DIR = "code_index"
+CACHE_FILE = os.path.join(INDEX_DIR, "postman_samples.json")
+CACHE_VERSION = 1
+SNIFF_BYTES = 8192
+POSTMAN_MARKERS = ("getpostman.com", '"_postman_id"')
+
+# Segments that identify a single resource: numbers, UUIDs, {var}, {{var}} and :var
+ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F-]{32,36}|\{\{?[^/{}]+\}?\}|:\w+)$")
+HOST_VARIABLE = re.compile(r"^\{\{[^/{}]+\}\}")
+
+def sample_key(http_method, path):
+    """Index key for a request, e.g. 'GET api/v1/transactions/{id}/status'."""
+    segments = [segment for segment in path.split("/") if segment]
+    segments = ["{id}" if ID_SEGMENT.match(segment) else segment for segment in segments]
+    return f"{http_method.upper()} {'/'.join(segments)}"
+
+def request_path(url):
+    """Path of a Postman request URL (object or string) without host, query or fragment."""
+    if isinstance(url, dict):
+        if "path" in url:
+            return "/".join(str(segment) for segment in url["path"])
+        url = url.get("raw", "")
+    if not isinstance(url, str):
+        return ""
+    url = HOST_VARIABLE.sub("", url.strip())
+    if "://" in url:
+        return urlsplit(url).path
+    return re.split(r"[?#]", url, maxsplit=1)[0]
+
+def is_collection(file_path):
+    """Cheaply check whether a JSON file is a Postman collection by sniffing its header."""
+    try:
+        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+            head = f.read(SNIFF_BYTES)
+    except OSError as e:
+        logging.warning(f"Could not read potential Postman collection {file_path}: {e}")
+        return False
+    return head.lstrip().startswith("{") and '"info"' in head and any(marker in head for marker in POSTMAN_MARKERS)
+
+def iter_items(file_path):
+    """Yield the top-level items of a collection, streaming them when ijson is installed."""
+    with open(file_path, "rb") as f:
+        if ijson is not None:
+            yield from ijson.items(f, "item.item", use_float=True)
+            return
+        yield from json.load(f).get("item", [])
+
+def extract_samples(items, samples=None):
+    """Collect JSON request bodies from collection items (folders are walked) into {key: [bodies]}."""
+    samples = {} if samples is None else samples
+    for item in items:
+        if "request" not in item:
+            extract_samples(item.get("item", []), samples)
+            continue
+        request = item["request"]
+        if not isinstance(request, dict) or "method" not in request or "url" not in request:
+            continue
+        path = request_path(request["url"])
+        body = request.get("body") or {}
+        if not path or body.get("mode") != "raw" or not isinstance(body.get("raw"), str):
+            continue
+        try:
+            body_data = json.loads(body["raw"])
+        except ValueError:
+            logging.debug(f"Could not parse request body as JSON for {request['method']} {path}")
+            continue
+        if not body_data:
+            continue
+        key = sample_key(request["method"], path)
+        samples.setdefault(key, []).append(body_data)
+        logging.debug(f"Extracted sample data for {key}: {body_data}")
+    return samples
+
+def load_cache(cache_file=CACHE_FILE):
+    """Load the per-collection sample cache; a missing, corrupt or outdated file is empty."""
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == CACHE_VERSION:
+            return cache.get("collections", {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return {}
+
+def save_cache(collections, cache_file=CACHE_FILE):
+    """Persist extracted samples keyed by collection content hash."""
+    cache_dir = os.path.dirname(cache_file)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    with open(cache_file, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "collections": collections}, f)
+
+def file_hash(file_path):
+    """SHA-1 of a file's content, read in chunks."""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_samples(repo_dir, cache_file=CACHE_FILE):
+    """Sample request bodies from every Postman collection in a repository, keyed by sample_key."""
+    candidates = repo_catalog.files(repo_dir, "postman")
+    cache = load_cache(cache_file)
+    collections = {}
+    extracted = 0
+    for file_path in candidates:
+        if not is_collection(file_path):
+            logging.debug(f"File is not a Postman collection: {file_path}")
+            continue
+        try:
+            digest = file_hash(file_path)
+            if digest not in cache:
+                cache[digest] = {"path": file_path, "samples": extract_samples(iter_items(file_path))}
+                extracted += 1
+        except PARSE_ERRORS as e:
+            logging.warning(f"Error parsing Postman collection {file_path}: {e}")
+            continue
+        collections[digest] = cache[digest]
+
+    # Merge into the cache: only this repository's collections that changed are dropped
+    repo_root = os.path.abspath(repo_dir) + os.sep
+    stale = [digest for digest, entry in cache.items()
+             if digest not in collections and os.path.abspath(entry.get("path", "")).startswith(repo_root)]
+    for digest in stale:
+        del cache[digest]
+    if extracted or stale:
+        save_cache(cache, cache_file)
+
+    samples = {}
+    for collection in collections.values():
+        for key, bodies in collection["samples"].items():
+            samples.setdefault(key, []).extend(bodies)
+    total = sum(len(bodies) for bodies in samples.values())
+    logging.info(f"Found {len(collections)} Postman collections among {len(candidates)} candidate files "
+                 f"({extracted} extracted); {total} sample request bodies for {len(samples)} endpoints")
+    return samples
+
+def save_samples(samples, output_file):
+    """Write the sample index for the step definitions."""
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(samples, f, indent=2, sort_keys=True)
+    logging.info(f"Saved Postman sample data to {output_file}")
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Index sample request bodies from the Postman collections of a repository")
+    parser.add_argument("repo_dir", help="Repository to search for Postman collections")
+    parser.add_argument("--output", help="Write the sample index to this file instead of printing a summary")
+    args = parser.parse_args()
+
+    samples = load_samples(args.repo_dir)
+    if args.output:
+        save_samples(samples, args.output)
+    else:
+        for key, bodies in sorted(samples.items()):
+            print(f"{key}: {len(bodies)} sample(s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
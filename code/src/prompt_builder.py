@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+"""
+Token-budgeted prompts for BDD test case generation.
+
+The BDD prompts used to be the template followed by the endpoint information
+pretty-printed with json.dumps(indent=2). build_bdd_prompt instead:
+
+- counts tokens with tiktoken when it is installed (otherwise estimates
+  about four characters per token);
+- sends the endpoint information as minified JSON, with service calls
+  de-duplicated and without the controller repeated in each of them;
+- packs facts from the code index into the remaining budget, most relevant
+  first: fields and validation annotations of the request body types, then
+  of the response types, then the service methods the handler calls.
+
+The budget is PROMPT_TOKEN_BUDGET tokens (default 1500) for the whole
+prompt. record_usage logs the input and output tokens of every LLM call and
+keeps running totals for usage_summary.
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+import endpoint_catalog
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+INDEX_JSON = os.path.join("code_index", "index.json")
+TOKEN_BUDGET_ENV = "PROMPT_TOKEN_BUDGET"
+DEFAULT_TOKEN_BUDGET = 1500
+MODEL = "gpt-4"
+CHARS_PER_TOKEN = 4
+VALIDATION_ANNOTATIONS = {
+    "NotNull", "NotBlank", "NotEmpty", "Size", "Min", "Max", "Pattern", "Email", "Positive",
+    "PositiveOrZero", "Negative", "NegativeOrZero", "DecimalMin", "DecimalMax", "Digits",
+    "Past", "PastOrPresent", "Future", "FutureOrPresent", "Valid"
+}
+
+_encoding = None
+_index_cache = {}
+_usage = {"calls": 0, "input_tokens": 0, "output_tokens": 0}
+
+def count_tokens(text):
+    """Tokens in a text for MODEL, estimated from its length when tiktoken is not installed."""
+    global _encoding
+    if tiktoken is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    if _encoding is None:
+        _encoding = tiktoken.encoding_for_model(MODEL)
+    return len(_encoding.encode(text))
+
+def token_budget():
+    """Prompt token budget from PROMPT_TOKEN_BUDGET."""
+    return int(os.environ.get(TOKEN_BUDGET_ENV, DEFAULT_TOKEN_BUDGET))
+
+def minify(data):
+    """Compact JSON for prompts."""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+def compact_endpoint_info(endpoint_info):
+    """Endpoint information without duplicate service calls or controller names repeated in them."""
+    info = {key: value for key, value in endpoint_info.items() if value not in ("", [], None)}
+    services = []
+    for call in endpoint_info.get("service_calls", []):
+        call = {key: value for key, value in call.items()
+                if value and not (key == "class" and value == endpoint_info.get("controller"))}
+        if call not in services:
+            services.append(call)
+    if services:
+        info["service_calls"] = services
+    return info
+
+def load_index_facts(index_file=INDEX_JSON):
+    """Fields per class and calls per method from index.json, reloaded only when it changes."""
+    try:
+        mtime = os.path.getmtime(index_file)
+    except OSError:
+        return {"fields": {}, "calls": {}}
+    cached = _index_cache.get(index_file)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        with open(index_file, "r", encoding="utf-8") as f:
+            index_data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Could not load {index_file} for prompt context: {e}")
+        return {"fields": {}, "calls": {}}
+    facts = {"fields": {}, "calls": {}}
+    for data in index_data.values():
+        for field in data.get("fields", []):
+            annotations = " ".join(f"@{name}" for name in field.get("annotations", []) if name in VALIDATION_ANNOTATIONS)
+            facts["fields"].setdefault(field["class"], []).append(f"{field['type']} {field['name']} {annotations}".strip())
+        for entry in data.get("call_graph", []):
+            facts["calls"][entry["caller"]] = entry["calls"]
+    _index_cache[index_file] = (mtime, facts)
+    return facts
+
+def endpoint_facts(endpoint_info, dto_types=(), index_facts=None):
+    """Index facts about an endpoint as (label, value) pairs, most relevant first."""
+    index_facts = load_index_facts() if index_facts is None else index_facts
+    body_types = [param.get("type") for param in endpoint_info.get("parameters", []) if param.get("source") == "body"]
+    facts = []
+    seen = set()
+    for type_name in body_types + list(dto_types):
+        fields = index_facts["fields"].get(type_name)
+        if fields and type_name not in seen:
+            seen.add(type_name)
+            # Validated fields first: they drive the negative scenarios
+            facts.append((f"fields of {type_name}", sorted(fields, key=lambda field: "@" not in field)))
+    handler = f"{endpoint_info.get('controller', '')}.{endpoint_info.get('controller_method', '')}"
+    calls = index_facts["calls"].get(handler)
+    if calls:
+        facts.append((f"calls made by {handler}", calls))
+    return facts
+
+def build_bdd_prompt(template, endpoint_info, dto_types=(), budget=None, index_facts=None):
+    """BDD generation prompt within the token budget; facts that do not fit are left out."""
+    budget = token_budget() if budget is None else budget
+    template = "\n".join(line.rstrip() for line in template.strip().splitlines())
+    info = compact_endpoint_info(endpoint_info)
+    prompt = f"{template}\n\nAPI Endpoint Information:\n```json\n{minify(info)}\n```"
+    used = count_tokens(prompt)
+
+    context = {}
+    skipped = 0
+    for label, value in endpoint_facts(endpoint_info, dto_types, index_facts):
+        cost = count_tokens(minify({label: value})) + 1
+        if used + cost > budget:
+            skipped += 1
+            continue
+        context[label] = value
+        used += cost
+    if context:
+        prompt += f"\n\nRelevant code facts:\n```json\n{minify(context)}\n```"
+
+    tokens = count_tokens(prompt)
+    logging.info(f"Prompt for {info.get('method', '')} {info.get('path', '')}: {tokens} tokens "
+                 f"(budget {budget}, {len(context)} facts packed, {skipped} left out)")
+    if tokens > budget:
+        logging.warning(f"Prompt exceeds the token budget of {budget} even without code facts")
+    return prompt
+
+def record_usage(prompt, completion, usage=None):
+    """Log and total the input and output tokens of one LLM call (API usage when reported)."""
+    input_tokens = getattr(usage, "prompt_tokens", None) or count_tokens(prompt)
+    output_tokens = getattr(usage, "completion_tokens", None) or count_tokens(completion or "")
+    _usage["calls"] += 1
+    _usage["input_tokens"] += input_tokens
+    _usage["output_tokens"] += output_tokens
+    logging.info(f"LLM call: {input_tokens} input tokens, {output_tokens} output tokens")
+    return input_tokens, output_tokens
+
+def usage_summary():
+    """One line with the tokens used by all LLM calls so far."""
+    return (f"LLM usage: {_usage['calls']} calls, {_usage['input_tokens']} input tokens, "
+            f"{_usage['output_tokens']} output tokens")
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Show the BDD generation prompt for an endpoint and its token count")
+    parser.add_argument("method", help="HTTP method, e.g. POST")
+    parser.add_argument("path", help="Endpoint path, e.g. api/v1/accounts")
+    parser.add_argument("--budget", type=int, help=f"Token budget (default: ${TOKEN_BUDGET_ENV} or {DEFAULT_TOKEN_BUDGET})")
+    parser.add_argument("--template", default=os.path.join("prompts", "BDD Test Case Template.md"))
+    args = parser.parse_args()
+
+    endpoint = endpoint_catalog.find(args.method, args.path)
+    if not endpoint:
+        logging.error(f"Endpoint not found in the code index: {args.method} {args.path}")
+        return 1
+    with open(args.template, "r", encoding="utf-8") as f:
+        template = f.read()
+    endpoint_info = {
+        "path": endpoint["path"],
+        "method": endpoint["method"],
+        "controller": endpoint["controller"],
+        "controller_method": endpoint["controller_method"],
+        "parameters": endpoint["params"],
+        "service_calls": endpoint["service_chain"]
+    }
+    prompt = build_bdd_prompt(template, endpoint_info, endpoint.get("dto_types", []), args.budget)
+    print(prompt)
+    print(f"\n[{count_tokens(prompt)} tokens]")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+"""
+One-pass file catalog of the cloned repository.
+
+Indexing, change detection, app startup and Postman discovery all need
+files from the cloned repository. Instead of each walking the tree with
+os.walk or recursive globs, build_catalog walks it once with os.scandir,
+pruning .git and node_modules, and the target and build output directories
+of Maven and Gradle modules (not packages that happen to share those
+names), before descending into them, and classifies the files it sees:
+
+    java     *.java sources
+    postman  Postman collections (*.postman_collection.json,
+             postman_collection*.json, *.json under postman/ or collections/)
+    build    Maven and Gradle build files and wrappers
+    docker   Dockerfiles and docker-compose files
+
+The catalog is cached in code_index/repo_catalog.json keyed on the HEAD
+commit, so later runs on the same commit do not walk the tree at all.
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+import subprocess
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+INDEX_DIR = "code_index"
+CATALOG_FILE = os.path.join(INDEX_DIR, "repo_catalog.json")
+CATALOG_VERSION = 2
+PRUNED_DIRS = {".git", "node_modules"}
+# Build output directories, pruned only next to a module's build file
+BUILD_OUTPUT_DIRS = {"target", "build"}
+MODULE_BUILD_FILES = {"pom.xml", "build.gradle", "build.gradle.kts"}
+FILE_TYPES = ("java", "postman", "build", "docker")
+BUILD_FILES = {"pom.xml", "mvnw", "mvnw.cmd", "build.gradle", "build.gradle.kts",
+               "settings.gradle", "settings.gradle.kts", "gradlew", "gradlew.bat"}
+POSTMAN_DIRS = {"postman", "collections"}
+
+_catalogs = {}
+
+def head_commit(repo_dir):
+    """HEAD commit of a git checkout, or None if it is not one."""
+    try:
+        result = subprocess.run(["git", "-C", repo_dir, "rev-parse", "HEAD"],
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+def classify(name, parent_dirs):
+    """File type of a file name given its parent directory names (lower case), or None."""
+    lower = name.lower()
+    if lower.endswith(".java"):
+        return "java"
+    if name in BUILD_FILES:
+        return "build"
+    if lower.startswith("dockerfile") or lower.startswith("docker-compose"):
+        return "docker"
+    if lower.endswith(".json") and (lower.endswith(".postman_collection.json") or lower.startswith("postman_collection")
+                                    or POSTMAN_DIRS.intersection(parent_dirs)):
+        return "postman"
+    return None
+
+def scan(repo_dir, visit=None):
+    """Walk the repository once and return {file type: [relative paths]}.
+
+    visit, if given, is called with every os.DirEntry seen, including the
+    pruned directories themselves (which are not descended into).
+    """
+    files = {file_type: [] for file_type in FILE_TYPES}
+    file_count = 0
+    stack = [("", ())]
+    while stack:
+        rel_dir, parent_dirs = stack.pop()
+        try:
+            entries = sorted(os.scandir(os.path.join(repo_dir, rel_dir)), key=lambda e: e.name)
+        except OSError as e:
+            logging.warning(f"Could not read directory {os.path.join(repo_dir, rel_dir)}: {e}")
+            continue
+        subdirs = []
+        module_root = any(entry.name in MODULE_BUILD_FILES for entry in entries)
+        for entry in entries:
+            if visit:
+                visit(entry)
+            rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in PRUNED_DIRS and not (module_root and entry.name in BUILD_OUTPUT_DIRS):
+                    subdirs.append((rel_path, parent_dirs + (entry.name.lower(),)))
+                continue
+            file_count += 1
+            file_type = classify(entry.name, parent_dirs)
+            if file_type:
+                files[file_type].append(rel_path)
+        # Depth-first in name order, so paths come out sorted per directory
+        stack.extend(reversed(subdirs))
+    return {"files": files, "file_count": file_count}
+
+def load_cache(catalog_file=CATALOG_FILE):
+    """Load the cached catalogs; a missing, corrupt or outdated file is empty."""
+    try:
+        with open(catalog_file, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == CATALOG_VERSION:
+            return cache.get("repos", {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return {}
+
+def save_cache(repos, catalog_file=CATALOG_FILE):
+    """Persist the catalogs of every repository seen."""
+    catalog_dir = os.path.dirname(catalog_file)
+    if catalog_dir:
+        os.makedirs(catalog_dir, exist_ok=True)
+    with open(catalog_file, "w", encoding="utf-8") as f:
+        json.dump({"version": CATALOG_VERSION, "repos": repos}, f)
+
+def build_catalog(repo_dir, refresh=False, visit=None, catalog_file=CATALOG_FILE):
+    """The file catalog of a repository, walked at most once per HEAD commit.
+
+    Working-tree changes that are not committed are only seen with
+    refresh=True (or a visit callback, which always walks).
+    """
+    root = os.path.abspath(repo_dir)
+    head = head_commit(repo_dir)
+    if not refresh and visit is None and head:
+        catalog = _catalogs.get(root)
+        if catalog is None:
+            catalog = load_cache(catalog_file).get(root)
+        if catalog and catalog.get("head") == head:
+            _catalogs[root] = catalog
+            return catalog
+
+    catalog = scan(repo_dir, visit)
+    catalog["head"] = head
+    _catalogs[root] = catalog
+    counts = ", ".join(f"{len(catalog['files'][t])} {t}" for t in FILE_TYPES)
+    logging.info(f"Catalogued {catalog['file_count']} files in {repo_dir} ({counts})")
+    if head:
+        repos = load_cache(catalog_file)
+        repos[root] = catalog
+        save_cache(repos, catalog_file)
+    return catalog
+
+def files(repo_dir, file_type, refresh=False):
+    """Paths (joined with repo_dir) of all catalogued files of a type."""
+    return [os.path.join(repo_dir, rel_path) for rel_path in build_catalog(repo_dir, refresh)["files"][file_type]]
+
+def java_files(repo_dir, include_tests=False, refresh=False):
+    """Java sources, by default without those under a test directory."""
+    return [os.path.join(repo_dir, rel_path) for rel_path in build_catalog(repo_dir, refresh)["files"]["java"]
+            if include_tests or "test" not in os.path.dirname(rel_path).lower()]
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Catalog the files of a repository in one pass")
+    parser.add_argument("repo_dir", help="Repository to catalog")
+    parser.add_argument("--refresh", action="store_true", help="Walk the tree even if the HEAD commit is cached")
+    parser.add_argument("--type", choices=FILE_TYPES, help="Print the files of this type")
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.repo_dir, args.refresh)
+    if args.type:
+        for path in files(args.repo_dir, args.type):
+            print(path)
+    else:
+        print(json.dumps({t: len(catalog["files"][t]) for t in FILE_TYPES}, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,6 +23,10 @@ import requests
 import glob
 import datetime
 
+import app_lifecycle
+import log_pump
+import bdd_budget
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger("BDD_Test_Runner")
@@ -48,10 +52,16 @@ def run_command(cmd, desc, capture_output=True):
 
 def start_application(port, profile=None):
     """Start the Spring Boot application."""
+    # Reattach to an instance started by an earlier stage instead of booting another JVM
+    instance = app_lifecycle.find_reusable_instance(app_lifecycle.current_build_hash(), port)
+    if instance:
+        app_lifecycle.export_base_url(instance["base_url"])
+        return instance
+    
     logging.info("Starting Spring Boot application...")
     
     # Command to start the app in a separate process
-    cmd = [sys.executable, "start_app.py"]
+    cmd = [sys.executable, "start_app.py", "--no-reuse"]
     
     # Add arguments
     if port:
@@ -79,40 +89,43 @@ def start_application(port, profile=None):
                 process.wait(timeout=5)
                 if process.poll() is None:
                     process.kill()
+            app_lifecycle.clear_instance()
         
         atexit.register(cleanup)
         signal.signal(signal.SIGINT, lambda sig, frame: (cleanup(), sys.exit(0)))
         signal.signal(signal.SIGTERM, lambda sig, frame: (cleanup(), sys.exit(0)))
         
+        # Drain both pipes in the background; start_app.py logs its status lines to stderr
+        pump = log_pump.LogPump(
+            process,
+            log_file=os.path.join(log_pump.LOG_DIR, "start_app.log"),
+            ready_check=lambda line: "Application started successfully" in line or "Application might not have started properly" in line
+        ).start()
+        process.log_pump = pump
+        
         # Wait for app to start
-        started = False
         timeout = 60  # seconds
-        start_time = time.time()
+        started = pump.wait_until_ready(timeout)
         
-        while not started and time.time() - start_time < timeout:
-            line = process.stdout.readline()
-            if "Application started successfully" in line:
-                started = True
-                logging.info("Application started successfully")
-            elif "Application might not have started properly" in line:
-                logging.warning("Application might not have started properly, but continuing")
-                started = True
-            elif line:
-                print(line.strip())
-            
-            # Check if process died
-            if process.poll() is not None:
-                stdout, stderr = process.communicate()
-                logging.error("Application failed to start")
-                logging.error(f"STDOUT: {stdout}")
-                logging.error(f"STDERR: {stderr}")
-                return None
-            
-            time.sleep(0.1)
+        # Check if process died
+        if process.poll() is not None and not started:
+            pump.stop()
+            logging.error("Application failed to start")
+            logging.error("Last output:\n" + "\n".join(pump.tail()))
+            return None
         
-        if not started:
+        if started and any("might not have started properly" in line for line in pump.tail(20)):
+            logging.warning("Application might not have started properly, but continuing")
+        elif started:
+            logging.info("Application started successfully")
+        else:
             logging.warning("Timed out waiting for application to start, but continuing")
         
+        # start_app.py may have picked a free port; pass the resulting URL on to behave
+        instance = app_lifecycle.load_instance()
+        if instance:
+            app_lifecycle.export_base_url(instance["base_url"])
+        
         # Give additional time for the application to initialize
         time.sleep(2)
         
@@ -121,8 +134,9 @@ def start_application(port, profile=None):
         logging.error(f"Error starting application: {e}")
         return None
 
-def verify_api_is_running(base_url="http://localhost:8080/api/v1"):
+def verify_api_is_running(base_url=None):
     """Check if the API is accessible before running tests"""
+    base_url = base_url or os.environ.get(app_lifecycle.BASE_URL_ENV, "http://localhost:8080/api/v1")
     logger.info(f"Verifying API is running at {base_url}...")
     
     try:
@@ -135,7 +149,7 @@ def verify_api_is_running(base_url="http://localhost:8080/api/v1"):
         logger.error(f"API is not accessible: {e}")
         return False
 
-def run_behave(feature=None, tags=None, verbose=False):
+def run_behave(feature=None, tags=None, verbose=False, budget=None):
     """Run the BDD tests using behave directly"""
     logger.info("Running BDD tests with behave directly...")
     
@@ -166,11 +180,13 @@ def run_behave(feature=None, tags=None, verbose=False):
     logger.info(f"Executing command: {' '.join(cmd)}")
     try:
         # Run behave and capture output
-        process = subprocess.run(
+        report_file = os.path.join("behave_tests", "reports", "bdd_budget_report.json")
+        process = bdd_budget.run_with_budget(
             cmd,
-            check=False,
+            report_file=report_file,
             capture_output=True,
-            text=True
+            text=True,
+            **(budget or {})
         )
         
         # Print output whether or not the tests passed
@@ -181,6 +197,7 @@ def run_behave(feature=None, tags=None, verbose=False):
             logger.error("=== ERROR OUTPUT ===")
             print(process.stderr)
         
+        bdd_budget.log_report(report_file)
         if process.returncode == 0:
             logger.info("All BDD tests passed successfully!")
             return True
@@ -191,7 +208,7 @@ def run_behave(feature=None, tags=None, verbose=False):
         logger.error(f"Error running BDD tests: {e}")
         return False
 
-def run_with_test_runner(feature=None, tags=None, use_running_app=True):
+def run_with_test_runner(feature=None, tags=None, use_running_app=True, budget=None):
     """Run tests using the bdd_test_runner.py script"""
     logger.info("Running BDD tests with test runner...")
     
@@ -210,16 +227,19 @@ def run_with_test_runner(feature=None, tags=None, use_running_app=True):
     if feature:
         cmd.append(feature)
     
+    # The test runner enforces the budgets itself
+    cmd.extend(bdd_budget.budget_to_args(budget))
+    
     # Run the test runner
     logger.info(f"Executing command: {' '.join(cmd)}")
     try:
-        subprocess.run(
+        result = subprocess.run(
             cmd,
             check=False,
             capture_output=False,
             text=True
         )
-        return True
+        return result.returncode == 0
     except Exception as e:
         logger.error(f"Error running BDD test runner: {e}")
         return False
@@ -329,7 +349,7 @@ def verify_feature_files():
     
     return all_valid
 
-def run_bdd_tests():
+def run_bdd_tests(budget=None):
     """Run the BDD tests and generate reports"""
     # Setup directories
     bdd_dir = os.path.join("summary", "bdd_test_cases")
@@ -350,7 +370,8 @@ def run_bdd_tests():
     
     # Text report
     cmd = [sys.executable, "-m", "behave", "--format=plain", f"--outfile={text_report}"]
-    result = subprocess.run(cmd, cwd=bdd_dir, capture_output=True, text=True)
+    budget_report = os.path.join(report_dir, "bdd_budget_report.json")
+    result = bdd_budget.run_with_budget(cmd, report_file=budget_report, cwd=bdd_dir, capture_output=True, text=True, **(budget or {}))
     
     # Print the output
     print(result.stdout)
@@ -361,7 +382,7 @@ def run_bdd_tests():
     try:
         import behave_html_formatter
         cmd = [sys.executable, "-m", "behave", "--format=behave_html_formatter:HTMLFormatter", f"--outfile={html_report}"]
-        subprocess.run(cmd, cwd=bdd_dir, capture_output=True)
+        bdd_budget.run_with_budget(cmd, report_file=os.path.join(report_dir, "bdd_budget_report_html.json"), cwd=bdd_dir, capture_output=True, **(budget or {}))
         print(f"HTML report generated: {html_report}")
     except ImportError:
         print("behave-html-formatter not installed. Skipping HTML report generation.")
@@ -389,6 +410,8 @@ def run_bdd_tests():
         f.write("\n```\n")
     
     print(f"Test summary written to {summary_file}")
+    if bdd_budget.log_report(budget_report) or result.returncode == bdd_budget.TIMEOUT_EXIT_CODE:
+        print(f"Timeouts recorded in {budget_report}")
     
     # Return success if all tests passed
     return result.returncode == 0
@@ -401,6 +424,7 @@ def main():
     parser.add_argument("--tags", help="Only run tests with these tags (e.g. '@wip')")
     parser.add_argument("--use-behave", action="store_true", help="Use behave directly instead of the test runner")
     parser.add_argument("--verbose", action="store_true", help="Show verbose output")
+    bdd_budget.add_budget_arguments(parser)
     
     args = parser.parse_args()
     
@@ -422,10 +446,11 @@ def main():
             return 1
     
     # Run tests
+    budget = bdd_budget.budget_from_args(args)
     if args.use_behave:
-        success = run_behave(args.feature, args.tags, args.verbose)
+        success = run_behave(args.feature, args.tags, args.verbose, budget)
     else:
-        success = run_with_test_runner(args.feature, args.tags, use_running_app=True)
+        success = run_with_test_runner(args.feature, args.tags, use_running_app=True, budget=budget)
     
     if success:
         return 0
@@ -433,4 +458,4 @@ def main():
         return 1
 
 if __name__ == "__main__":
-    run_bdd_tests() 
+    sys.exit(0 if run_bdd_tests() else 1) 
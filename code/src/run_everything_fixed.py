@@ -19,6 +19,16 @@ import argparse
 import re
 import glob
 import requests
+from urllib.parse import urlsplit
+
+import build_cache
+import app_lifecycle
+import mock_api_server
+import test_selection
+import bdd_budget
+import step_builder
+import endpoint_catalog
+import postman_samples
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -26,6 +36,9 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 # Constants
 CONFIG_FILE = "config.json"
 
+# In-process mock API server, when one is serving in place of the application
+mock_api = None
+
 def load_config():
     """Load configuration from config.json."""
     try:
@@ -128,7 +141,7 @@ def find_maven_executable():
     logging.warning("Maven executable not found.")
     return None
 
-def build_docker_image_without_maven(repo_dir):
+def build_docker_image_without_maven(repo_dir, source_hash=None):
     """Build a Docker image directly without building a JAR first."""
     logging.info("Attempting to build Docker image directly without Maven...")
     
@@ -146,31 +159,24 @@ def build_docker_image_without_maven(repo_dir):
         logging.info("Original Dockerfile requires Maven build artifacts. Creating alternative Dockerfile...")
         alt_dockerfile_path = os.path.join(repo_dir, "Dockerfile.windows")
         
-        with open(alt_dockerfile_path, 'w') as f:
-            f.write("""# Multi-stage build to handle Maven inside Docker
-FROM maven:3-eclipse-temurin-17 AS build
-WORKDIR /app
-COPY . .
-RUN mvn clean package -DskipTests
-
-FROM eclipse-temurin:17-jdk-alpine
-VOLUME /tmp
-COPY --from=build /app/target/*.jar app.jar
-ENTRYPOINT ["java","-jar","/app.jar"]
-""")
-        
-        dockerfile_path = alt_dockerfile_path
-        logging.info(f"Created alternative Dockerfile at {alt_dockerfile_path}")
+        # Resolve dependencies from pom.xml in their own layer so source changes don't re-download them
+        dockerfile_path = build_cache.write_layered_dockerfile(alt_dockerfile_path)
+    
+    # Skip the build when the image was already built from these sources and this Dockerfile
+    image_hash = build_cache.image_hash(source_hash or build_cache.compute_source_hash(repo_dir), dockerfile_path)
+    if build_cache.docker_image_is_current("spring-boot-app:latest", image_hash):
+        return True
     
     # Build Docker image
     try:
         logging.info("Building Docker image with Docker multi-stage build...")
         build_result = subprocess.run(
-            ["docker", "build", "-t", "spring-boot-app:latest", "-f", dockerfile_path, "."],
+            build_cache.docker_build_command("spring-boot-app:latest", image_hash, dockerfile_path),
             cwd=repo_dir,
             check=True,
             capture_output=True,
-            text=True
+            text=True,
+            env=build_cache.docker_build_env()
         )
         
         logging.info("Docker image built successfully")
@@ -181,14 +187,15 @@ ENTRYPOINT ["java","-jar","/app.jar"]
         logging.error(f"STDERR: {e.stderr}")
         return False
 
-def start_app_with_docker(repo_dir, docker_file_type):
+def start_app_with_docker(repo_dir, docker_file_type, keep_running=False, port=8080):
     """Start the application using Docker."""
     logging.info(f"Starting application using {docker_file_type}...")
+    container_name = app_lifecycle.container_name(port)
     
     try:
-        # Check if there's already a container running on port 8080
+        # Check if there's already a container running on this port
         check_port = subprocess.run(
-            ["docker", "ps", "--filter", "publish=8080", "--format", "{{.Names}}"],
+            ["docker", "ps", "--filter", f"publish={port}", "--format", "{{.Names}}"],
             check=False,
             capture_output=True,
             text=True
@@ -196,13 +203,13 @@ def start_app_with_docker(repo_dir, docker_file_type):
         
         running_container = check_port.stdout.strip()
         if running_container:
-            logging.info(f"Container {running_container} is already running on port 8080")
+            logging.info(f"Container {running_container} is already running on port {port}")
             logging.info("Skipping container startup as application is already running")
             return True
         
         # Check if the container exists but is stopped
         check_existing = subprocess.run(
-            ["docker", "ps", "-a", "--filter", "name=spring-boot-app", "--format", "{{.Names}}"],
+            ["docker", "ps", "-a", "--filter", f"name=^{container_name}$", "--format", "{{.Names}}"],
             check=False,
             capture_output=True,
             text=True
@@ -240,10 +247,25 @@ def start_app_with_docker(repo_dir, docker_file_type):
             )
             logging.info("Application started with docker-compose")
         else:  # Dockerfile
+            # Reuse a cached JAR when the sources have not changed since the last build
+            source_hash = build_cache.compute_source_hash(repo_dir)
+            cached_jar = build_cache.restore_cached_jar(repo_dir, source_hash)
+            
+            # The image is built from Dockerfile.windows when an earlier run generated one
+            dockerfile_path = os.path.join(repo_dir, "Dockerfile.windows")
+            if not os.path.exists(dockerfile_path):
+                dockerfile_path = os.path.join(repo_dir, "Dockerfile")
+            image_current = build_cache.docker_image_is_current(
+                "spring-boot-app:latest", build_cache.image_hash(source_hash, dockerfile_path))
+            
             # First check if Maven is available
-            mvn_cmd = find_maven_executable()
+            mvn_cmd = find_maven_executable() if not (cached_jar or image_current) else None
             
-            if mvn_cmd:
+            if image_current:
+                logging.info("Skipping Maven build, the Docker image already contains these sources")
+            elif cached_jar:
+                logging.info(f"Skipping Maven build, using cached JAR: {cached_jar}")
+            elif mvn_cmd:
                 logging.info(f"Using Maven executable: {mvn_cmd}")
                 
                 # Check for Maven wrapper as an alternative
@@ -256,13 +278,14 @@ def start_app_with_docker(repo_dir, docker_file_type):
                         logging.info(f"Using Maven wrapper instead: {mvn_cmd}")
                 
                 # Create build command
+                maven_args = build_cache.maven_build_args(repo_dir)
                 if is_windows and os.path.isabs(mvn_cmd):
                     # Use the full command with quotes for Windows paths with spaces
-                    build_cmd = [f'"{mvn_cmd}"', "clean", "package", "-DskipTests"]
+                    build_cmd = [f'"{mvn_cmd}"'] + [f'"{arg}"' for arg in maven_args]
                     build_cmd = " ".join(build_cmd)  # Join as string for shell=True
                     shell = True
                 else:
-                    build_cmd = [mvn_cmd, "clean", "package", "-DskipTests"]
+                    build_cmd = [mvn_cmd] + maven_args
                     shell = False
                 
                 logging.info(f"Running Maven build with command: {build_cmd}")
@@ -276,6 +299,10 @@ def start_app_with_docker(repo_dir, docker_file_type):
                         shell=shell
                     )
                     logging.info("Maven build completed successfully")
+                    build_cache.record_build_state(repo_dir, "target")
+                    built_jar = build_cache.find_built_jar(repo_dir)
+                    if built_jar:
+                        build_cache.store_jar(built_jar, source_hash)
                 except subprocess.CalledProcessError as e:
                     logging.error(f"Maven build failed: {e}")
                     logging.error(f"STDOUT: {e.stdout}")
@@ -286,9 +313,9 @@ def start_app_with_docker(repo_dir, docker_file_type):
             else:
                 logging.warning("Maven not found. Trying to use Docker multi-stage build...")
                 
-                if not build_docker_image_without_maven(repo_dir):
+                if not build_docker_image_without_maven(repo_dir, source_hash):
                     logging.warning("Failed to build with Docker multi-stage build. Trying pre-built Docker image...")
-                    if run_with_prebuilt_docker_image(repo_dir):
+                    if run_with_prebuilt_docker_image(repo_dir, port):
                         logging.info("Successfully started using pre-built Docker image")
                         return True
                     else:
@@ -318,26 +345,28 @@ ENTRYPOINT ["java","-jar","/app.jar"]
                 # We should already have a Dockerfile.windows from build_docker_image_without_maven
                 logging.info("Using Docker multi-stage build since no target directory was found")
                 
-            # Build Docker image
-            logging.info("Building Docker image...")
+            # Build Docker image unless it is already labelled with the current source and Dockerfile hash
             dockerfile_path = os.path.join(repo_dir, "Dockerfile.windows") 
-            if os.path.exists(dockerfile_path):
-                build_cmd = ["docker", "build", "-t", "spring-boot-app:latest", "-f", dockerfile_path, "."]
-            else:
-                build_cmd = ["docker", "build", "-t", "spring-boot-app:latest", "."]
+            if not os.path.exists(dockerfile_path):
+                dockerfile_path = None
+            image_hash = build_cache.image_hash(source_hash, dockerfile_path or os.path.join(repo_dir, "Dockerfile"))
+            build_cmd = build_cache.docker_build_command("spring-boot-app:latest", image_hash, dockerfile_path)
                 
             try:
-                build_result = subprocess.run(
-                    build_cmd,
-                    cwd=repo_dir,
-                    check=True,
-                    capture_output=True,
-                    text=True
-                )
+                if not build_cache.docker_image_is_current("spring-boot-app:latest", image_hash):
+                    logging.info("Building Docker image...")
+                    build_result = subprocess.run(
+                        build_cmd,
+                        cwd=repo_dir,
+                        check=True,
+                        capture_output=True,
+                        text=True,
+                        env=build_cache.docker_build_env()
+                    )
             except subprocess.CalledProcessError as e:
                 logging.error(f"Docker build failed: {e}")
                 logging.warning("Trying pre-built Docker image instead...")
-                if run_with_prebuilt_docker_image(repo_dir):
+                if run_with_prebuilt_docker_image(repo_dir, port):
                     logging.info("Successfully started using pre-built Docker image")
                     return True
                 else:
@@ -346,7 +375,7 @@ ENTRYPOINT ["java","-jar","/app.jar"]
             
             logging.info("Starting Docker container...")
             run_result = subprocess.run(
-                ["docker", "run", "-d", "-p", "8080:8080", "--name", "spring-boot-app-container", "spring-boot-app:latest"],
+                ["docker", "run", "-d", "-p", f"{port}:8080", "--name", container_name, "spring-boot-app:latest"],
                 cwd=repo_dir,
                 check=True,
                 capture_output=True,
@@ -365,13 +394,15 @@ ENTRYPOINT ["java","-jar","/app.jar"]
                 )
             else:
                 subprocess.run(
-                    ["docker", "rm", "-f", "spring-boot-app-container"],
+                    ["docker", "rm", "-f", container_name],
                     check=False
                 )
         
-        atexit.register(cleanup_docker)
-        signal.signal(signal.SIGINT, lambda sig, frame: (cleanup_docker(), sys.exit(0)))
-        signal.signal(signal.SIGTERM, lambda sig, frame: (cleanup_docker(), sys.exit(0)))
+        # Containers kept running for later stages are stopped with start_app.py --stop instead
+        if not keep_running:
+            atexit.register(cleanup_docker)
+            signal.signal(signal.SIGINT, lambda sig, frame: (cleanup_docker(), sys.exit(0)))
+            signal.signal(signal.SIGTERM, lambda sig, frame: (cleanup_docker(), sys.exit(0)))
         
         # Wait for application to start
         logging.info("Waiting for application to start...")
@@ -384,7 +415,7 @@ ENTRYPOINT ["java","-jar","/app.jar"]
                 # For Windows, use a different approach to ping the application
                 if is_windows:
                     health_check = subprocess.run(
-                        [sys.executable, "-c", f"import requests; print(requests.get('http://localhost:8080/api/v1').status_code)"],
+                        [sys.executable, "-c", f"import requests; print(requests.get('http://localhost:{port}/api/v1').status_code)"],
                         check=False,
                         capture_output=True,
                         text=True
@@ -392,7 +423,7 @@ ENTRYPOINT ["java","-jar","/app.jar"]
                     status_code = health_check.stdout.strip()
                 else:
                     health_check = subprocess.run(
-                        ["curl", "-s", "-o", "/dev/null", "-w", "%{http_code}", "http://localhost:8080/api/v1"],
+                        ["curl", "-s", "-o", "/dev/null", "-w", "%{http_code}", f"http://localhost:{port}/api/v1"],
                         check=False,
                         capture_output=True,
                         text=True
@@ -423,75 +454,6 @@ def find_feature_files(bdd_dir):
     logging.info(f"Found {len(feature_files)} feature files")
     return feature_files
 
-def analyze_repo_for_api_endpoints(repo_dir):
-    """Analyze repository for API endpoints and payloads."""
-    logging.info(f"Analyzing repository for API endpoints: {repo_dir}")
-    
-    # This is a simplified implementation - a more robust one would parse Java files
-    # to extract endpoint information from Spring annotations like @RequestMapping
-    
-    api_endpoints = []
-    
-    # Look for common Spring controller patterns
-    java_files = glob.glob(os.path.join(repo_dir, "**", "*.java"), recursive=True)
-    
-    for java_file in java_files:
-        with open(java_file, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            
-            # Look for Spring controller annotations
-            if '@RestController' in content or '@Controller' in content:
-                # Look for request mapping annotations
-                mappings = re.findall(r'@(GetMapping|PostMapping|PutMapping|DeleteMapping|RequestMapping)\s*\(\s*["\']?([^"\'()]*)["\')?]', content)
-                
-                for mapping_type, path in mappings:
-                    # Determine HTTP method from annotation type
-                    if mapping_type == 'GetMapping':
-                        http_method = 'GET'
-                    elif mapping_type == 'PostMapping':
-                        http_method = 'POST'
-                    elif mapping_type == 'PutMapping':
-                        http_method = 'PUT'
-                    elif mapping_type == 'DeleteMapping':
-                        http_method = 'DELETE'
-                    elif mapping_type == 'RequestMapping':
-                        # Look for method specification inside RequestMapping
-                        method_match = re.search(r'method\s*=\s*RequestMethod\.(GET|POST|PUT|DELETE)', content)
-                        http_method = method_match.group(1) if method_match else 'GET'
-                    else:
-                        http_method = 'GET'  # Default to GET
-                    
-                    # Extract class name
-                    class_match = re.search(r'class\s+(\w+)', content)
-                    class_name = class_match.group(1) if class_match else 'Unknown'
-                    
-                    # Extract method parameters (simplified)
-                    method_params = re.findall(r'@RequestParam\s*\(\s*["\']?([^"\'()]*)["\')?]', content)
-                    
-                    # Extract path from class-level RequestMapping if present
-                    class_path = ''
-                    class_mapping = re.search(r'@RequestMapping\s*\(\s*["\']?([^"\'()]*)["\')?]', content)
-                    if class_mapping:
-                        class_path = class_mapping.group(1)
-                    
-                    # Combine paths
-                    if class_path and not class_path.endswith('/'):
-                        class_path += '/'
-                    
-                    full_path = class_path + path
-                    if not full_path.startswith('/'):
-                        full_path = '/' + full_path
-                    
-                    api_endpoints.append({
-                        "class": class_name,
-                        "method": http_method,
-                        "path": full_path,
-                        "parameters": method_params
-                    })
-    
-    logging.info(f"Found {len(api_endpoints)} API endpoints in repository")
-    return api_endpoints
-
 def generate_step_definitions(repo_dir, bdd_dir, api_verification_results=None):
     """Generate step definitions for BDD tests."""
     logging.info("Generating step definitions for BDD tests...")
@@ -505,17 +467,16 @@ def generate_step_definitions(repo_dir, bdd_dir, api_verification_results=None):
         
         logging.info(f"Found {len(feature_files)} feature files.")
         
-        # Analyze the repo for API endpoints
-        api_endpoints = analyze_repo_for_api_endpoints(repo_dir)
-        
         # Create steps directory if needed
         steps_dir = os.path.join(bdd_dir, "steps")
         os.makedirs(steps_dir, exist_ok=True)
         
-        # Generate api_steps.py in the steps directory
+        # Generate api_steps.py in the steps directory, validated once and only rewritten when it changes.
+        # The generated code does not depend on the repository's controllers, so the Java sources are not scanned.
         steps_file = os.path.join(steps_dir, "api_steps.py")
-        with open(steps_file, "w", encoding="utf-8") as f:
-            f.write(generate_step_definition_code(api_endpoints, api_verification_results))
+        if not step_builder.write_module(steps_file, generate_step_definition_code(None, api_verification_results)):
+            logging.error(f"Generated step definitions for {steps_file} are not valid Python")
+            return False
         
         logging.info(f"Generated step definitions in {steps_file}")
         return True
@@ -524,7 +485,7 @@ def generate_step_definitions(repo_dir, bdd_dir, api_verification_results=None):
         logging.debug("Exception details:", exc_info=True)
         return False
 
-def generate_step_definition_code(api_endpoints, api_verification_results=None):
+def generate_step_definition_code(api_endpoints=None, api_verification_results=None):
     """Generate the Python code for step definitions."""
     
     # Check API verification results to create better targeted step definitions
@@ -576,14 +537,15 @@ def generate_step_definition_code(api_endpoints, api_verification_results=None):
     
     # Start of the code generation
     code = '''
+import os
+import re
 import json
+import time
+import random
+import string
 import logging
 import requests
 import behave
-import random
-import string
-import time
-import os
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -621,20 +583,34 @@ def is_successful_status(status_code):
     """Check if status code indicates success (2xx)"""
     return 200 <= status_code < 300
 
+# Requests that move money; a pooled account they touch is not handed to another scenario
+BALANCE_ENDPOINTS = {"api/v1/deposit", "api/v1/withdraw", "api/v1/transactions"}
+
+def changes_balance(method, endpoint):
+    """Whether a request changes the balance of the account it uses"""
+    return method.upper() == "POST" and endpoint.strip("/") in BALANCE_ENDPOINTS
+
+# Postman samples are keyed like postman_samples.sample_key: ids and path variables become {id}
+ID_SEGMENT = re.compile(r"^(\\d+|[0-9a-fA-F-]{32,36}|\\{\\{?[^/{}]+\\}?\\}|:\\w+)$")
+
+def sample_key(method, endpoint):
+    """Postman sample index key, e.g. 'GET api/v1/transactions/{id}/status'"""
+    segments = ["{id}" if ID_SEGMENT.match(segment) else segment for segment in endpoint.split("/") if segment]
+    return f"{method.upper()} {'/'.join(segments)}"
+
 def get_sample_data(method, endpoint):
     """Get sample data for an endpoint from various sources"""
-    # Check for successful API data first
-    key = f"{method}_{endpoint}"
+    # Check for successful API data first (keyed by the last path segment)
+    key = f"{method}_{endpoint.split('/')[-1]}"
     if key in SUCCESSFUL_API_DATA:
         logging.info(f"Using successful request data for {key}")
         return SUCCESSFUL_API_DATA[key]
     
-    # Then check for Postman sample data
-    if endpoint in POSTMAN_SAMPLE_DATA and method in POSTMAN_SAMPLE_DATA[endpoint]:
-        postman_data = POSTMAN_SAMPLE_DATA[endpoint][method]
-        if postman_data and len(postman_data) > 0:
-            logging.info(f"Using Postman sample data for {method} {endpoint}")
-            return postman_data[0]  # Use the first sample
+    # Then check for Postman sample data, indexed by method and full path
+    postman_data = POSTMAN_SAMPLE_DATA.get(sample_key(method, endpoint))
+    if postman_data:
+        logging.info(f"Using Postman sample data for {method} {endpoint}")
+        return postman_data[0]  # Use the first sample
     
     # Return None if no sample data found
     return None
@@ -647,7 +623,7 @@ def step_impl_authenticated_user(context):
     context.headers = {"Authorization": f"Bearer {token}"}
     
     # Try to use sample data if available
-    accounts_data = get_sample_data("PUT", "accounts")
+    accounts_data = get_sample_data("PUT", "api/v1/accounts")
     
     # Generate account details if not already set
     if not hasattr(context, 'account_details'):
@@ -678,6 +654,13 @@ def step_impl_authenticated_user(context):
     try:
         # Only create account if we're not in mock mode
         if not hasattr(context, 'mock_api') or not context.mock_api:
+            # Check out an account from the pool seeded in before_all instead of creating one
+            pooled = context.account_pool.checkout(context) if getattr(context, 'account_pool', None) else None
+            if pooled:
+                context.account_details, context.account = pooled
+                logging.info(f"Using pooled account: {context.account}")
+                return
+            
             # Try to create via accounts endpoint
             response = requests.put(
                 f"{context.base_url}/accounts",
@@ -724,7 +707,7 @@ def step_impl_authenticated_user(context):
 @behave.given('I am an unauthenticated user')
 def step_impl_unauthenticated_user(context):
     # Try to use sample data if available
-    accounts_data = get_sample_data("PUT", "accounts")
+    accounts_data = get_sample_data("PUT", "api/v1/accounts")
     
     if accounts_data:
         # Use previously successful data with slight modifications
@@ -763,7 +746,7 @@ def step_impl_not_authenticated_user(context):
     context.response = None
     context.response_json = None
 
-@behave.given('I do not have permission to check the balance of other users\' accounts')
+@behave.given(u"I do not have permission to check the balance of other users' accounts")
 def step_impl_no_permission(context):
     # Ensure user is authenticated but with limited permissions
     step_impl_authenticated_user(context)
@@ -806,6 +789,8 @@ def step_impl_send_request(context, method, endpoint):
     
     logging.info(f"Sending {method} request to {url} with payload: {payload}")
     
+    if changes_balance(method, endpoint):
+        context.account_dirty = True
     try:
         if method == "GET":
             context.response = requests.get(url, headers=context.headers)
@@ -837,7 +822,7 @@ def step_impl_check_account_balance(context):
     url = f"{context.base_url}/accounts"
     
     # Try to use sample data if available
-    account_data = get_sample_data("POST", "accounts")
+    account_data = get_sample_data("POST", "api/v1/accounts")
     
     if account_data and hasattr(context, 'account_details'):
         payload = {
@@ -925,7 +910,7 @@ def step_impl_check_missing_account_id(context):
         context.response = None
         context.response_json = None
 
-@behave.when('I send a "POST" request to "api/v1/accounts" with another user\'s account ID to check their account balance')
+@behave.when(u'I send a "POST" request to "api/v1/accounts" with another user\\'s account ID to check their account balance')
 def step_impl_check_other_account(context):
     url = f"{context.base_url}/accounts"
     
@@ -1105,22 +1090,50 @@ def setup_environment_py(bdd_dir):
     env_file = os.path.join(bdd_dir, "environment.py")
     with open(env_file, "w", encoding="utf-8") as f:
         f.write('''
+import os
+import sys
+import time
 import logging
+import importlib
 import requests
-import time
-import sys
-import json
+
+def optional_import(name):
+    """The named module, or None when it cannot be imported."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+# Optional record/replay of HTTP traffic (HTTP_CASSETTE_MODE=record|replay)
+http_cassette = optional_import("http_cassette")
+# Optional per-endpoint request latency histograms
+step_metrics = optional_import("step_metrics")
+# Optional per-step/per-scenario time budgets and fail-fast (see bdd_budget.py)
+bdd_budget = optional_import("bdd_budget")
+# Optional pre-seeded account pool shared across scenarios (see account_pool.py)
+account_pool = optional_import("account_pool")
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 def before_all(context):
     """Setup the environment before all tests."""
-    # Set base URL for API requests
-    context.base_url = "http://localhost:8080/api/v1"
+    # Record or replay HTTP traffic instead of only talking to the live API
+    context.cassette = http_cassette.install_from_env() if http_cassette else None
+    
+    # Time every request the steps make, including retries and connection errors
+    context.step_metrics = step_metrics.install() if step_metrics else None
+    # Bound every request by the step and scenario budgets set by the runner
+    if bdd_budget:
+        bdd_budget.install()
+    
+    # Set base URL for API requests (behave -D base_url=... or API_BASE_URL from the launcher)
+    context.base_url = context.config.userdata.get(
+        "base_url", os.environ.get("API_BASE_URL", "http://localhost:8080/api/v1")
+    )
     
-    # Setup configuration - assume we're testing against a mock API
-    context.mock_api = True
+    # Mock API mode (relaxed checks, no account pool) only against the mock server (behave -D mock_api=true)
+    context.mock_api = str(context.config.userdata.get("mock_api", "false")).lower() == "true"
     context.always_pass = True  # Make all assertions pass
     
     # Define helper functions for working with mock APIs
@@ -1136,22 +1149,48 @@ def before_all(context):
     }
     
     # Verify API is accessible
+    api_available = False
     max_retries = 5
     for i in range(max_retries):
         try:
             response = requests.get(context.base_url)
             logging.info(f"API is accessible at {context.base_url}")
+            api_available = True
             break
-        except requests.exceptions.ConnectionError:
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
             if i < max_retries - 1:
                 logging.warning(f"Could not access API, retrying in 5 seconds ({i+1}/{max_retries})")
                 time.sleep(5)
             else:
                 logging.warning(f"Could not access API at {context.base_url} after {max_retries} attempts")
                 logging.warning("Some tests may fail if the API is not running")
+    
+    # Seed the account pool once the API answers; the steps check accounts out instead of creating them
+    use_pool = account_pool and api_available and not getattr(context, "mock_api", False)
+    context.account_pool = account_pool.install(context) if use_pool else None
+
+def before_scenario(context, scenario):
+    """Start the scenario time budget."""
+    if bdd_budget:
+        bdd_budget.before_scenario(context, scenario)
+
+def before_step(context, step):
+    """Start the step time budget."""
+    if bdd_budget:
+        bdd_budget.before_step(context, step)
+
+def after_step(context, step):
+    """Record steps that ran out of time."""
+    if bdd_budget:
+        bdd_budget.after_step(context, step)
 
 def after_scenario(context, scenario):
     """Clean up after each scenario."""
+    if account_pool:
+        account_pool.after_scenario(context, scenario)
+    if bdd_budget:
+        bdd_budget.after_scenario(context, scenario)
+    
     # Add some delay between API calls to avoid overloading the mock server
     time.sleep(0.1)
     
@@ -1166,264 +1205,23 @@ def after_scenario(context, scenario):
 
 def after_all(context):
     """Clean up after all tests."""
+    if account_pool:
+        account_pool.after_all(context)
+    if bdd_budget:
+        bdd_budget.after_all(context)
+    if context.step_metrics:
+        step_metrics.uninstall()
+        step_metrics.dump(context.step_metrics, os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports", "step_latency.json"))
+    if context.cassette:
+        http_cassette.uninstall()
     logging.info("All tests completed")
 ''')
     
     logging.info(f"Created environment.py in {env_file}")
     return env_file
 
-
-# Function to fix apostrophe issues in step definitions
-def fix_apostrophe_issues(file_path):
-    logging.info(f"Fixing apostrophe issues in {file_path}")
-    
-    if not os.path.exists(file_path):
-        logging.error(f"File not found: {file_path}")
-        return False
-    
-    # Read the file
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Process line by line to handle complex cases
-    lines = content.split('
-')
-    for i in range(len(lines)):
-        line = lines[i]
-        
-        # Skip lines that don't contain behave decorators
-        if '@behave.' not in line:
-            continue
-        
-        # Extract the line type and raw step text
-        if line.startswith('@behave.given'):
-            decorator_type = 'given'
-        elif line.startswith('@behave.when'):
-            decorator_type = 'when'
-        elif line.startswith('@behave.then'):
-            decorator_type = 'then'
-        else:
-            continue
-        
-        # Check if this line has potential issues (apostrophes or nested quotes)
-        if ("'" in line and not line.startswith(f'@behave.{decorator_type}(u"')) or '"' in line:
-            # Extract step text using regex
-            match = re.search(r'@behave\.' + decorator_type + r'\((?:u)?[\'"](.+?)[\'"]', line)
-            if not match:
-                continue
-                
-            step_text = match.group(1)
-            
-            # Check if step text has problematic characters
-            if "'" in step_text or '"' in step_text:
-                # Properly escape the content
-                escaped_text = step_text.replace('"', '\"')
-                # Create new properly formatted decorator
-                lines[i] = f'@behave.{decorator_type}(u"{escaped_text}")'
-    
-    fixed_content = '
-'.join(lines)
-    
-    # Additional fixes for common problematic lines
-    # Fix apostrophes in users' accounts
-    fixed_content = fixed_content.replace(
-        "I do not have permission to check the balance of other users' accounts", 
-        "I do not have permission to check the balance of other users\' accounts"
-    )
-    
-    # Save the fixed content
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(fixed_content)
-    
-    logging.info(f"Fixed apostrophe issues in {file_path}")
-    return True
-
-
-# Function to fix apostrophe issues in step definitions
-def fix_apostrophe_issues(file_path):
-    logging.info(f"Fixing apostrophe issues in {file_path}")
-    
-    if not os.path.exists(file_path):
-        logging.error(f"File not found: {file_path}")
-        return False
-    
-    # Read the file
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Process line by line to handle complex cases
-    lines = content.split('
-')
-    for i in range(len(lines)):
-        line = lines[i]
-        
-        # Skip lines that don't contain behave decorators
-        if '@behave.' not in line:
-            continue
-        
-        # Extract the line type and raw step text
-        if line.startswith('@behave.given'):
-            decorator_type = 'given'
-        elif line.startswith('@behave.when'):
-            decorator_type = 'when'
-        elif line.startswith('@behave.then'):
-            decorator_type = 'then'
-        else:
-            continue
-        
-        # Check if this line has potential issues (apostrophes or nested quotes)
-        if ("'" in line and not line.startswith(f'@behave.{decorator_type}(u"')) or '"' in line:
-            # Extract step text using regex
-            match = re.search(r'@behave\.' + decorator_type + r'\((?:u)?[\'"](.+?)[\'"]', line)
-            if not match:
-                continue
-                
-            step_text = match.group(1)
-            
-            # Check if step text has problematic characters
-            if "'" in step_text or '"' in step_text:
-                # Properly escape the content
-                escaped_text = step_text.replace('"', '\"')
-                # Create new properly formatted decorator
-                lines[i] = f'@behave.{decorator_type}(u"{escaped_text}")'
-    
-    fixed_content = '
-'.join(lines)
-    
-    # Additional fixes for common problematic lines
-    # Fix apostrophes in users' accounts
-    fixed_content = fixed_content.replace(
-        "I do not have permission to check the balance of other users' accounts", 
-        "I do not have permission to check the balance of other users\' accounts"
-    )
-    
-    # Save the fixed content
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(fixed_content)
-    
-    logging.info(f"Fixed apostrophe issues in {file_path}")
-    return True
-
-
-# Function to fix apostrophe issues in step definitions
-def fix_apostrophe_issues(file_path):
-    logging.info(f"Fixing apostrophe issues in {file_path}")
-    
-    if not os.path.exists(file_path):
-        logging.error(f"File not found: {file_path}")
-        return False
-    
-    # Read the file
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Process line by line to handle complex cases
-    lines = content.split('
-')
-    for i in range(len(lines)):
-        line = lines[i]
-        
-        # Skip lines that don't contain behave decorators
-        if '@behave.' not in line:
-            continue
-        
-        # Extract the line type and raw step text
-        if line.startswith('@behave.given'):
-            decorator_type = 'given'
-        elif line.startswith('@behave.when'):
-            decorator_type = 'when'
-        elif line.startswith('@behave.then'):
-            decorator_type = 'then'
-        else:
-            continue
-        
-        # Check if this line has potential issues (apostrophes or nested quotes)
-        if ("'" in line and not line.startswith(f'@behave.{decorator_type}(u"')) or '"' in line:
-            # Extract step text using regex
-            match = re.search(r'@behave\.' + decorator_type + r'\((?:u)?[\'"](.+?)[\'"]', line)
-            if not match:
-                continue
-                
-            step_text = match.group(1)
-            
-            # Check if step text has problematic characters
-            if "'" in step_text or '"' in step_text:
-                # Properly escape the content
-                escaped_text = step_text.replace('"', '\"')
-                # Create new properly formatted decorator
-                lines[i] = f'@behave.{decorator_type}(u"{escaped_text}")'
-    
-    fixed_content = '
-'.join(lines)
-    
-    # Additional fixes for common problematic lines
-    # Fix apostrophes in users' accounts
-    fixed_content = fixed_content.replace(
-        "I do not have permission to check the balance of other users' accounts", 
-        "I do not have permission to check the balance of other users\' accounts"
-    )
-    
-    # Save the fixed content
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(fixed_content)
-    
-    logging.info(f"Fixed apostrophe issues in {file_path}")
-    return True
-
-def run_bdd_tests(bdd_dir):
-
-        # Fix apostrophe issues in step definitions
-        api_steps_path = os.path.join(bdd_dir, "steps", "api_steps.py")
-        if os.path.exists(api_steps_path):
-            fix_apostrophe_issues(api_steps_path)
-            logging.info("Fixed apostrophe issues in step definitions")
-        else:
-            logging.warning(f"Step definitions file not found at {api_steps_path}")
-    
-        # Fix apostrophe issues in step definitions
-        api_steps_path = os.path.join(bdd_dir, "steps", "api_steps.py")
-        if os.path.exists(api_steps_path):
-            fix_apostrophe_issues(api_steps_path)
-            logging.info("Fixed apostrophe issues in step definitions")
-        else:
-            logging.warning(f"Step definitions file not found at {api_steps_path}")
-        """Run BDD tests using behave"""
-    logging.info("Running BDD tests...")
-    
-    # Fix apostrophe issues in step definitions
-    api_steps_path = os.path.join(bdd_dir, "steps", "api_steps.py")
-    if os.path.exists(api_steps_path):
-        fix_apostrophe_issues(api_steps_path)
-        logging.info("Fixed apostrophe issues in step definitions")
-    else:
-        logging.warning(f"Step definitions file not found at {api_steps_path}")
-    
-
-    """Run BDD tests using behave"""
-    logging.info("Running BDD tests...")
-    
-    # Fix apostrophe issues in step definitions
-    api_steps_path = os.path.join(bdd_dir, "steps", "api_steps.py")
-    if os.path.exists(api_steps_path):
-        fix_apostrophe_issues(api_steps_path)
-        logging.info("Fixed apostrophe issues in step definitions")
-    else:
-        logging.warning(f"Step definitions file not found at {api_steps_path}")
-    
-
-    """Run BDD tests using behave"""
-    logging.info("Running BDD tests...")
-    
-    # Fix apostrophe issues in step definitions
-    api_steps_path = os.path.join(bdd_dir, "steps", "api_steps.py")
-    if os.path.exists(api_steps_path):
-        fix_apostrophe_issues(api_steps_path)
-        logging.info("Fixed apostrophe issues in step definitions")
-    else:
-        logging.warning(f"Step definitions file not found at {api_steps_path}")
-    
-
-    """Run BDD tests against the running application."""
+def run_bdd_tests(bdd_dir, base_url=None, features=None, budget=None, use_mock_api=False):
+    """Run BDD tests against the running application (or the mock API server with use_mock_api)."""
     logging.info("Running BDD tests against the application...")
     
     try:
@@ -1436,7 +1234,12 @@ def run_bdd_tests(bdd_dir):
         # Use python -m behave to ensure we use the installed package
         # Add --dry-run to just verify step definitions without actually running tests
         # Add --no-junit and --no-summary to simplify output
-        cmd = [sys.executable, "-m", "behave", bdd_dir, "-v", "--no-junit", "--no-summary"]
+        # Either the whole suite or only the selected feature files / scenario lines
+        cmd = [sys.executable, "-m", "behave", *(features or [bdd_dir]), "-v", "--no-junit", "--no-summary"]
+        if base_url:
+            cmd.extend(["-D", f"base_url={base_url}"])
+        if use_mock_api:
+            cmd.extend(["-D", "mock_api=true"])
         logging.debug(f"Running command: {' '.join(cmd)}")
         
         # On Windows, make sure the working directory is properly set
@@ -1447,21 +1250,20 @@ def run_bdd_tests(bdd_dir):
         else:
             cwd = None  # Default working directory
         
-        result = subprocess.run(
+        # Step, scenario and whole-run time budgets; a hung backend ends the run instead of stalling it
+        report_file = os.path.join(bdd_dir, "reports", "bdd_budget_report.json")
+        result = bdd_budget.run_with_budget(
             cmd,
-            check=False,
+            report_file=report_file,
             capture_output=True,
             text=True,
-            cwd=cwd
+            cwd=cwd,
+            **(budget or {})
         )
-        
-        # Log test results
-        logging.info("BDD tests executed. This is a mock API so failures were expected.")
-        logging.info("We consider the BDD tests successful as long as they run without crashing.")
             
         # Count the undefined steps to provide more information
         undefined_count = 0
-        if "undefined" in result.stdout:
+        if result.stdout and "undefined" in result.stdout:
             match = re.search(r'(\d+) undefined', result.stdout)
             if match:
                 undefined_count = int(match.group(1))
@@ -1473,149 +1275,23 @@ def run_bdd_tests(bdd_dir):
         logging.info(result.stdout)
         
         if result.stderr:
-            logging.warning("BDD Test warnings (these are expected):")
+            logging.warning("BDD Test warnings:")
             logging.warning(result.stderr)
         
-        # Always return success regardless of test results
-        # This is because we're working with a mock API that returns 200 status codes
-        # even for error conditions, so failures are expected
+        timeouts = bdd_budget.log_report(report_file)
+        if result.returncode == bdd_budget.TIMEOUT_EXIT_CODE:
+            logging.error(f"BDD tests ran out of time; see {report_file}")
+            return False
+        if result.returncode != 0:
+            logging.warning(f"BDD tests failed with return code {result.returncode} ({timeouts} timeouts)")
+            return False
+        logging.info("All BDD tests passed")
         return True
     except Exception as e:
         logging.error(f"Error running BDD tests: {e}")
         logging.debug("Exception details:", exc_info=True)
         return False
 
-def find_postman_collections(repo_dir):
-    """Find and parse Postman collections in the repository."""
-    logging.info("Looking for Postman collections in the repository...")
-    
-    collections = []
-    postman_files = []
-    
-    # Look for Postman collection files with common names
-    collection_patterns = [
-        "**/*.postman_collection.json",
-        "**/postman_collection*.json",
-        "**/Postman/**/*.json",
-        "**/postman/**/*.json",
-        "**/collections/**/*.json"
-    ]
-    
-    for pattern in collection_patterns:
-        found_files = glob.glob(os.path.join(repo_dir, pattern), recursive=True)
-        postman_files.extend(found_files)
-    
-    # Remove duplicates
-    postman_files = list(set(postman_files))
-    
-    if not postman_files:
-        logging.info("No Postman collection files found in the repository.")
-        return collections
-    
-    logging.info(f"Found {len(postman_files)} potential Postman collection files.")
-    
-    for file_path in postman_files:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                collection_data = json.load(f)
-                
-            # Check if it's a valid Postman collection
-            if 'info' in collection_data and 'item' in collection_data:
-                logging.info(f"Valid Postman collection found: {file_path}")
-                collections.append({
-                    'path': file_path,
-                    'data': collection_data
-                })
-            else:
-                logging.debug(f"File is not a valid Postman collection: {file_path}")
-        except Exception as e:
-            logging.warning(f"Error parsing potential Postman collection {file_path}: {e}")
-    
-    logging.info(f"Successfully parsed {len(collections)} Postman collections.")
-    return collections
-
-def extract_sample_data_from_postman(collections):
-    """Extract sample request data from Postman collections."""
-    logging.info("Extracting sample request data from Postman collections...")
-    
-    sample_data = {}
-    
-    for collection in collections:
-        collection_data = collection['data']
-        
-        # Process all items in the collection (recursively if needed)
-        def process_items(items, parent_path=''):
-            for item in items:
-                # Skip folders without request data
-                if 'request' not in item and 'item' in item:
-                    # This is a folder, process its items
-                    process_items(item['item'], parent_path)
-                    continue
-                
-                # Skip items without request data
-                if 'request' not in item:
-                    continue
-                
-                request = item['request']
-                
-                # Skip if missing crucial information
-                if 'url' not in request or 'method' not in request:
-                    continue
-                
-                # Get the URL path
-                url_info = request['url']
-                path = ''
-                
-                if isinstance(url_info, dict):
-                    if 'path' in url_info:
-                        path = '/'.join(url_info['path'])
-                elif isinstance(url_info, str):
-                    # Parse the URL string
-                    url_match = re.search(r'localhost:\d+(/[^\s?#]+)', url_info)
-                    if url_match:
-                        path = url_match.group(1).strip('/')
-                
-                # Skip if we couldn't extract a path
-                if not path:
-                    continue
-                
-                method = request['method']
-                endpoint_key = path.split('/')[-1] if path else ''
-                
-                # Extract body data if available
-                body_data = None
-                if 'body' in request and 'raw' in request['body'] and request['body']['mode'] == 'raw':
-                    try:
-                        # Try to parse the raw body as JSON
-                        body_raw = request['body']['raw']
-                        if isinstance(body_raw, str):
-                            body_data = json.loads(body_raw)
-                    except:
-                        logging.debug(f"Could not parse request body as JSON for {method} {path}")
-                
-                if not body_data:
-                    continue
-                
-                # Store the sample data
-                if endpoint_key not in sample_data:
-                    sample_data[endpoint_key] = {}
-                
-                if method not in sample_data[endpoint_key]:
-                    sample_data[endpoint_key][method] = []
-                
-                sample_data[endpoint_key][method].append(body_data)
-                logging.info(f"Extracted sample data for {method} {path}: {body_data}")
-        
-        # Start processing from the top level
-        if 'item' in collection_data:
-            process_items(collection_data['item'])
-    
-    # Count and log summary
-    total_samples = sum(len(methods) for endpoint in sample_data.values() for methods in endpoint.values())
-    logging.info(f"Extracted a total of {total_samples} sample request bodies from Postman collections.")
-    
-    return sample_data
-
 def verify_api_endpoints(base_url):
     """Directly verify basic API endpoints are accessible."""
     logging.info("Verifying API endpoints directly...")
@@ -1629,20 +1305,31 @@ def verify_api_endpoints(base_url):
     def random_number(min_val=1000, max_val=9999):
         return random.randint(min_val, max_val)
     
-    # Define the endpoints to test
-    endpoints = [
-        {"path": "", "method": "GET", "expected_status": [200, 404]},  # Root API path
-        {"path": "accounts", "method": "GET", "expected_status": [200, 404]},
-        {"path": "accounts", "method": "PUT", "expected_status": [200, 201, 400, 404, 405]},
-        {"path": "deposit", "method": "POST", "expected_status": [200, 201, 400, 404, 405]},
-        {"path": "withdraw", "method": "POST", "expected_status": [200, 201, 400, 404, 405]},
-        {"path": "transactions", "method": "POST", "expected_status": [200, 201, 400, 404, 405]}
-    ]
+    # Define the endpoints to test: the ones in the endpoint catalog, relative to the base URL
+    endpoints = [{"path": "", "method": "GET", "expected_status": [200, 404]}]  # Root API path
+    base_path = endpoint_catalog.normalize_path(urlsplit(base_url).path)
+    for endpoint in endpoint_catalog.load_catalog():
+        path = endpoint["path"]
+        if base_path and path.startswith(base_path + "/"):
+            path = path[len(base_path) + 1:]
+        # Path variables get a placeholder id; not finding that resource still proves the endpoint is reachable
+        path = "/".join("1" if endpoint_catalog.PATH_VARIABLE.match(segment) else segment for segment in path.split("/"))
+        expected_status = [200, 404] if endpoint["method"] == "GET" else [200, 201, 400, 404, 405]
+        endpoints.append({"path": path, "method": endpoint["method"], "expected_status": expected_status})
+    
+    if len(endpoints) == 1:
+        logging.warning("No endpoints in the code index; verifying the default banking endpoints")
+        endpoints += [
+            {"path": "accounts", "method": "GET", "expected_status": [200, 404]},
+            {"path": "accounts", "method": "PUT", "expected_status": [200, 201, 400, 404, 405]},
+            {"path": "deposit", "method": "POST", "expected_status": [200, 201, 400, 404, 405]},
+            {"path": "withdraw", "method": "POST", "expected_status": [200, 201, 400, 404, 405]},
+            {"path": "transactions", "method": "POST", "expected_status": [200, 201, 400, 404, 405]}
+        ]
     
     # First try to use sample data from Postman collections
     repo_dir = os.path.abspath(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    postman_collections = find_postman_collections(repo_dir)
-    postman_sample_data = extract_sample_data_from_postman(postman_collections)
+    postman_sample_data = postman_samples.load_samples(repo_dir)
     
     # Generate multiple test data sets with different variations
     sample_data_sets = []
@@ -1746,16 +1433,16 @@ def verify_api_endpoints(base_url):
         url = f"{base_url}/{endpoint['path']}".rstrip("/")
         method = endpoint["method"]
         path = endpoint["path"]
-        endpoint_key = path.split('/')[-1] if path else 'root'
         
         # Try multiple data sets and formats for better chance of success
         success = False
         tried_data = []
         
         # First try data from Postman collection if available
-        if endpoint_key in postman_sample_data and method in postman_sample_data[endpoint_key]:
+        postman_key = postman_samples.sample_key(method, urlsplit(url).path)
+        if postman_key in postman_sample_data:
             logging.info(f"Using sample data from Postman collection for {method} {url}")
-            for postman_data in postman_sample_data[endpoint_key][method]:
+            for postman_data in postman_sample_data[postman_key]:
                 tried_data.append(postman_data)
                 result = try_endpoint(url, method, postman_data, endpoint["expected_status"])
                 if result and result.get("success"):
@@ -1858,9 +1545,10 @@ def try_endpoint(url, method, data, expected_status):
         logging.error(f"Error testing {method} {url}: {e}")
         return {"endpoint": url, "method": method, "status": f"Error: {str(e)}", "success": False}
 
-def run_with_prebuilt_docker_image(repo_dir):
+def run_with_prebuilt_docker_image(repo_dir, port=8080):
     """Run a pre-built Spring Boot Docker image as a last resort."""
     logging.info("Attempting to run pre-built Spring Boot Docker image...")
+    container_name = app_lifecycle.container_name(port)
     
     try:
         # Pull a pre-built Spring Boot image
@@ -1875,7 +1563,7 @@ def run_with_prebuilt_docker_image(repo_dir):
         # Run the container
         logging.info("Starting Docker container with pre-built image...")
         run_result = subprocess.run(
-            ["docker", "run", "-d", "-p", "8080:8080", "--name", "spring-boot-app-container", "springci/spring-boot:latest"],
+            ["docker", "run", "-d", "-p", f"{port}:8080", "--name", container_name, "springci/spring-boot:latest"],
             check=True,
             capture_output=True,
             text=True
@@ -1888,237 +1576,19 @@ def run_with_prebuilt_docker_image(repo_dir):
         logging.error(f"STDOUT: {e.stdout}")
         logging.error(f"STDERR: {e.stderr}")
         
-        # Try one more alternative image - a simple Python container running a mock API
-        try:
-            logging.info("Setting up a mock API server as fallback...")
-            
-            # Create a mock API Python script
-            mock_api_script = """
-import http.server
-import socketserver
-import json
+        # Fall back to the in-process mock API server derived from api_flow.json
+        return start_mock_api(port) is not None
 
-# Function to fix apostrophe issues in step definitions
-def fix_apostrophe_issues(file_path):
-    logging.info(f"Fixing apostrophe issues in {file_path}")
-    
-    if not os.path.exists(file_path):
-        logging.error(f"File not found: {file_path}")
-        return False
-    
-    # Read the file
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Process line by line to handle complex cases
-    lines = content.split('\n')
-    for i in range(len(lines)):
-        line = lines[i]
-        
-        # Skip lines that don't contain behave decorators
-        if '@behave.' not in line:
-            continue
-        
-        # Extract the line type and raw step text
-        if line.startswith('@behave.given'):
-            decorator_type = 'given'
-        elif line.startswith('@behave.when'):
-            decorator_type = 'when'
-        elif line.startswith('@behave.then'):
-            decorator_type = 'then'
-        else:
-            continue
-        
-        # Check if this line has potential issues (apostrophes or nested quotes)
-        if ("'" in line and not line.startswith(f'@behave.{decorator_type}(u"')) or '"' in line:
-            # Extract step text using regex
-            match = re.search(r'@behave\.' + decorator_type + r'\((?:u)?[\'"](.+?)[\'"]', line)
-            if not match:
-                continue
-                
-            step_text = match.group(1)
-            
-            # Check if step text has problematic characters
-            if "'" in step_text or '"' in step_text:
-                # Properly escape the content
-                escaped_text = step_text.replace('"', '\\"')
-                # Create new properly formatted decorator
-                lines[i] = f'@behave.{decorator_type}(u"{escaped_text}")'
-    
-    fixed_content = '\n'.join(lines)
-    
-    # Additional fixes for common problematic lines
-    # Fix apostrophes in users' accounts
-    fixed_content = fixed_content.replace(
-        "I do not have permission to check the balance of other users' accounts", 
-        "I do not have permission to check the balance of other users\' accounts"
-    )
-    
-    # Save the fixed content
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(fixed_content)
-    
-    logging.info(f"Fixed apostrophe issues in {file_path}")
-    return True
-
-
-# Function to fix apostrophe issues in step definitions
-def fix_apostrophe_issues(file_path):
-    logging.info(f"Fixing apostrophe issues in {file_path}")
-    
-    if not os.path.exists(file_path):
-        logging.error(f"File not found: {file_path}")
-        return False
-    
-    # Read the file
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Process line by line to handle complex cases
-    lines = content.split('\n')
-    for i in range(len(lines)):
-        line = lines[i]
-        
-        # Skip lines that don't contain behave decorators
-        if '@behave.' not in line:
-            continue
-        
-        # Extract the line type and raw step text
-        if line.startswith('@behave.given'):
-            decorator_type = 'given'
-        elif line.startswith('@behave.when'):
-            decorator_type = 'when'
-        elif line.startswith('@behave.then'):
-            decorator_type = 'then'
-        else:
-            continue
-        
-        # Check if this line has potential issues (apostrophes or nested quotes)
-        if ("'" in line and not line.startswith(f'@behave.{decorator_type}(u"')) or '"' in line:
-            # Extract step text using regex
-            match = re.search(r'@behave\.' + decorator_type + r'\((?:u)?[\'"](.+?)[\'"]', line)
-            if not match:
-                continue
-                
-            step_text = match.group(1)
-            
-            # Check if step text has problematic characters
-            if "'" in step_text or '"' in step_text:
-                # Properly escape the content
-                escaped_text = step_text.replace('"', '\\"')
-                # Create new properly formatted decorator
-                lines[i] = f'@behave.{decorator_type}(u"{escaped_text}")'
-    
-    fixed_content = '\n'.join(lines)
-    
-    # Additional fixes for common problematic lines
-    # Fix apostrophes in users' accounts
-    fixed_content = fixed_content.replace(
-        "I do not have permission to check the balance of other users' accounts", 
-        "I do not have permission to check the balance of other users\' accounts"
-    )
-    
-    # Save the fixed content
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(fixed_content)
-    
-    logging.info(f"Fixed apostrophe issues in {file_path}")
-    return True
-
-
-class MockAPIHandler(http.server.BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        response = {
-            'message': 'Mock Spring Boot Banking API',
-            'status': 'UP',
-            'version': '1.0.0'
-        }
-        self.wfile.write(json.dumps(response).encode())
-    
-    def do_POST(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        response = {
-            'status': 'success',
-            'message': 'Operation completed successfully',
-            'currentBalance': 100.0
-        }
-        self.wfile.write(json.dumps(response).encode())
-    
-    def do_PUT(self):
-        self.send_response(201)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        response = {
-            'id': '12345',
-            'status': 'created',
-            'sortCode': '123456',
-            'accountNumber': '12345678',
-            'ownerName': 'Mock User',
-            'bankName': 'Mock Bank'
-        }
-        self.wfile.write(json.dumps(response).encode())
-
-PORT = 8080
-Handler = MockAPIHandler
-httpd = socketserver.TCPServer(('', PORT), Handler)
-print(f'Serving mock API at port {PORT}')
-httpd.serve_forever()
-"""
-            
-            # Pull the Python image directly
-            logging.info("Pulling Python Docker image...")
-            pull_result = subprocess.run(
-                ["docker", "pull", "python:3.9-slim"],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            
-            # Create a temporary directory to store the script
-            temp_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp")
-            os.makedirs(temp_dir, exist_ok=True)
-            mock_api_file = os.path.join(temp_dir, "mock_api.py")
-            
-            # Write the mock API script to a file
-            with open(mock_api_file, 'w', encoding='utf-8') as f:
-                f.write(mock_api_script)
-            
-            logging.info(f"Created mock API script at {mock_api_file}")
-            
-            # Convert Windows path to Docker volume format if needed
-            volume_mount = mock_api_file
-            if sys.platform.startswith('win'):
-                # Convert absolute Windows path to Docker format
-                volume_mount = mock_api_file.replace('\\', '/').replace('C:', '/c')
-                logging.info(f"Converted Windows path to Docker format: {volume_mount}")
-            
-            # Run the Python container directly with mock API
-            run_result = subprocess.run(
-                ["docker", "run", "-d", "-p", "8080:8080", 
-                 "-v", f"{volume_mount}:/app/mock_api.py", 
-                 "--name", "spring-boot-app-container", 
-                 "python:3.9-slim", 
-                 "python", "/app/mock_api.py"],
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            
-            logging.info(f"Started mock API server container: {run_result.stdout.strip()}")
-            return True
-        except subprocess.CalledProcessError as e2:
-            logging.error(f"Failed to run mock API server: {e2}")
-            logging.error(f"STDOUT: {e2.stdout}")
-            logging.error(f"STDERR: {e2.stderr}")
-            return False
-        except Exception as e:
-            logging.error(f"Unexpected error setting up mock API: {e}")
-            return False
+def start_mock_api(port=8080):
+    """Start the in-process mock API server in place of the application."""
+    global mock_api
+    try:
+        logging.info("Setting up the in-process mock API server as fallback...")
+        mock_api = mock_api_server.start_in_background(port)
+        return mock_api
+    except OSError as e:
+        logging.error(f"Failed to start mock API server on port {port}: {e}")
+        return None
 
 def main():
     """Main function to run all steps."""
@@ -2127,6 +1597,15 @@ def main():
     parser.add_argument("--skip-start", action="store_true", help="Skip starting the application (assume it's already running)")
     parser.add_argument("--skip-tests", action="store_true", help="Skip running BDD tests")
     parser.add_argument("--debug", action="store_true", help="Print verbose debugging information")
+    parser.add_argument("--keep-app", action="store_true", help="Leave the application running at the end so later runs can reuse it")
+    parser.add_argument("--port", type=int, help="Host port for the application (default: 8080, or a free port if it is taken)")
+    parser.add_argument("--port-range", help="Pick the first free host port from this range (e.g. 8080-8099)")
+    parser.add_argument("--mock-api", action="store_true", help="Test against the in-process mock API instead of starting the application")
+    parser.add_argument("--cassette", choices=["record", "replay"], help="Record BDD HTTP traffic to a cassette, or replay it without starting the application")
+    parser.add_argument("--cassette-file", help="Cassette file to record to or replay from")
+    parser.add_argument("--impacted", action="store_true", help="Only run feature files impacted by the endpoints changed in the last update")
+    parser.add_argument("--smoke-tag", default=test_selection.DEFAULT_SMOKE_TAG, help="With --impacted, also run scenarios with this tag")
+    bdd_budget.add_budget_arguments(parser)
     args = parser.parse_args()
     
     # Set logging level
@@ -2145,18 +1624,22 @@ def main():
     bdd_dir = os.path.abspath(os.path.normpath(bdd_dir))
     logging.info(f"Using BDD test directory: {bdd_dir}")
     
+    # The cassette mode reaches behave's environment.py through the environment
+    if args.cassette:
+        cassette_file = os.path.abspath(args.cassette_file or os.path.join(bdd_dir, "cassettes", "api_cassette.json"))
+        os.environ["HTTP_CASSETTE_MODE"] = args.cassette
+        os.environ["HTTP_CASSETTE_FILE"] = cassette_file
+        logging.info(f"HTTP cassette {args.cassette} mode using {cassette_file}")
+        if args.cassette == "replay":
+            args.skip_start = True
+    
     # Check for Postman collections early so data is available throughout the process
     if not args.skip_tests:
         logging.info("Looking for Postman collections in the repository...")
-        postman_collections = find_postman_collections(clone_dir)
-        if postman_collections:
-            sample_data = extract_sample_data_from_postman(postman_collections)
+        sample_data = postman_samples.load_samples(clone_dir)
+        if sample_data:
             # Save the sample data for use in BDD tests
-            sample_data_file = os.path.join(bdd_dir, "postman_sample_data.json")
-            os.makedirs(os.path.dirname(sample_data_file), exist_ok=True)
-            with open(sample_data_file, "w", encoding="utf-8") as f:
-                json.dump(sample_data, f, indent=2)
-            logging.info(f"Saved Postman sample data to {sample_data_file}")
+            postman_samples.save_samples(sample_data, os.path.join(bdd_dir, "postman_sample_data.json"))
     
     # Step 1: Run generate_artifacts.py
     if not args.skip_glean:
@@ -2167,12 +1650,43 @@ def main():
         logging.info("Skipping generate_artifacts.py as requested.")
     
     # Step 2: Check for Docker file and start application
-    if not args.skip_start:
+    instance = None
+    port = args.port or 8080
+    if not args.skip_start and not args.mock_api:
+        build_hash = app_lifecycle.current_build_hash(clone_dir)
+        instance = app_lifecycle.find_reusable_instance(build_hash, args.port)
+    
+    if args.skip_start:
+        logging.info("Skipping application start as requested.")
+    elif args.mock_api:
+        port = args.port or app_lifecycle.allocate_port(args.port_range)
+        if not port or not start_mock_api(port):
+            logging.error("Failed to start the mock API server. Exiting.")
+            return 1
+    elif instance:
+        port = instance["port"]
+        logging.info("Reusing the application instance started by an earlier stage.")
+    else:
+        port = args.port or app_lifecycle.allocate_port(args.port_range)
+        if not port:
+            logging.error("Could not allocate a port for the application. Exiting.")
+            return 1
         docker_file_type = has_docker_file(clone_dir)
         if docker_file_type:
-            if not start_app_with_docker(clone_dir, docker_file_type):
+            if not start_app_with_docker(clone_dir, docker_file_type, keep_running=args.keep_app, port=port):
                 logging.error("Failed to start application with Docker. Exiting.")
                 return 1
+            if docker_file_type == "docker-compose.yml":
+                app_lifecycle.record_compose(clone_dir, port, build_hash)
+            else:
+                container_id = subprocess.run(
+                    ["docker", "ps", "--filter", f"publish={port}", "--format", "{{.ID}}"],
+                    check=False,
+                    capture_output=True,
+                    text=True
+                ).stdout.strip()
+                if container_id:
+                    app_lifecycle.record_container(container_id.splitlines()[0], port, build_hash)
         else:
             logging.warning("No Docker configuration found. Attempting to use start_app.py instead.")
             if not os.path.exists("start_app.py"):
@@ -2181,7 +1695,7 @@ def main():
             
             try:
                 result = subprocess.run(
-                    [sys.executable, "start_app.py", "--docker"],
+                    [sys.executable, "start_app.py", "--docker", "--detach", "--no-reuse", "--port", str(port)],
                     check=True,
                     capture_output=True,
                     text=True
@@ -2192,15 +1706,16 @@ def main():
                 logging.error(f"STDOUT: {e.stdout}")
                 logging.error(f"STDERR: {e.stderr}")
                 return 1
-    else:
-        logging.info("Skipping application start as requested.")
     
     # Step 3.5: Verify API endpoints are accessible
     api_results = None
     successful_request_data = {}
     
+    # Hand the base URL to behave and any child process of this run
+    api_base_url = f"http://localhost:{port}/api/v1"
+    app_lifecycle.export_base_url(api_base_url)
+    
     if not args.skip_tests:
-        api_base_url = "http://localhost:8080/api/v1"
         logging.info(f"Verifying API endpoints at {api_base_url}")
         api_results = verify_api_endpoints(api_base_url)
         
@@ -2235,14 +1750,29 @@ def main():
             return 1
     
     # Step 4: Run BDD tests
+    tests_failed = False
     if not args.skip_tests:
-        if not run_bdd_tests(bdd_dir):
+        features = None
+        if args.impacted:
+            features = test_selection.select_features(bdd_dir, smoke_tag=args.smoke_tag)
+            if features is None:
+                logging.info("No recorded endpoint changes; running the full BDD suite")
+        if features == []:
+            logging.info("No feature files are impacted by the last change; skipping BDD tests")
+        elif not run_bdd_tests(bdd_dir, api_base_url, features, bdd_budget.budget_from_args(args), mock_api is not None):
             logging.warning("Some BDD tests failed.")
+            tests_failed = True
     else:
         logging.info("Skipping BDD tests as requested.")
     
+    # Step 5: Stop the application unless it should stay warm for the next run
+    if args.keep_app:
+        logging.info("Leaving the application running; stop it with 'start_app.py --stop'")
+    elif not args.skip_start and not args.mock_api:
+        app_lifecycle.teardown_instance()
+    
     logging.info("All done!")
-    return 0
+    return 1 if tests_failed else 0
 
 if __name__ == "__main__":
     sys.exit(main()) 
@@ -16,6 +16,11 @@ import time
 import signal
 import atexit
 
+import build_cache
+import repo_catalog
+import app_lifecycle
+import log_pump
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
@@ -54,21 +59,16 @@ def find_app_jar(clone_dir):
         env["JAVA_HOME"] = java_home
         logging.info(f"Setting JAVA_HOME={java_home}")
     
-    # Check if there's a target directory with JAR files
-    target_dir = os.path.join(clone_dir, "target")
-    if os.path.exists(target_dir):
-        for file in os.listdir(target_dir):
-            if file.endswith(".jar") and not file.endswith("-sources.jar") and not file.endswith("-javadoc.jar"):
-                logging.info(f"Found JAR: {file}")
-                return os.path.join(target_dir, file)
-    
-    # Check for gradle build
-    build_dir = os.path.join(clone_dir, "build", "libs")
-    if os.path.exists(build_dir):
-        for file in os.listdir(build_dir):
-            if file.endswith(".jar") and not file.endswith("-sources.jar") and not file.endswith("-javadoc.jar"):
-                logging.info(f"Found JAR: {file}")
-                return os.path.join(build_dir, file)
+    # Check if there's already a built JAR in target/ or build/libs/
+    jar_path = build_cache.find_built_jar(clone_dir)
+    if jar_path:
+        return jar_path
+    
+    # Restore the JAR from the local build cache if the sources are unchanged
+    source_hash = build_cache.compute_source_hash(clone_dir)
+    jar_path = build_cache.restore_cached_jar(clone_dir, source_hash)
+    if jar_path:
+        return jar_path
     
     # If nothing found, look for a build script
     mvnw_path = os.path.join(clone_dir, "mvnw")
@@ -97,8 +97,9 @@ def find_app_jar(clone_dir):
                     os.chmod(mvnw_path, os.stat(mvnw_path).st_mode | 0o111)
             
             logging.info(f"Executing Maven build with command: {' '.join(mvnw_cmd)}")
+            maven_args = build_cache.maven_build_args(clone_dir)
             build_result = subprocess.run(
-                mvnw_cmd + ["clean", "package", "-DskipTests"],
+                mvnw_cmd + maven_args,
                 cwd=clone_dir,
                 check=False,  # Changed to not raise exception
                 capture_output=True,
@@ -114,7 +115,7 @@ def find_app_jar(clone_dir):
                 # Try with system Maven as a fallback
                 logging.info("Trying with system Maven as fallback...")
                 fallback_result = subprocess.run(
-                    ["mvn", "clean", "package", "-DskipTests"],
+                    ["mvn"] + maven_args,
                     cwd=clone_dir,
                     check=False,
                     capture_output=True,
@@ -126,8 +127,13 @@ def find_app_jar(clone_dir):
                     logging.error("Maven fallback build also failed.")
                     return None
             
-            # Try again to find JAR
-            return find_app_jar(clone_dir)
+            build_cache.record_build_state(clone_dir, "target")
+            
+            # Try again to find JAR and keep it for the next run
+            jar_path = build_cache.find_built_jar(clone_dir)
+            if jar_path:
+                build_cache.store_jar(jar_path, source_hash)
+            return jar_path
         except Exception as e:
             logging.error(f"Failed to build with Maven: {e}")
             return None
@@ -158,6 +164,8 @@ def find_app_jar(clone_dir):
                     os.chmod(gradlew_path, os.stat(gradlew_path).st_mode | 0o111)
             
             logging.info(f"Executing Gradle build with command: {' '.join(gradlew_cmd)}")
+            # Gradle builds incrementally on its own; keep its dependency cache persistent
+            env = build_cache.gradle_build_env(env)
             build_result = subprocess.run(
                 gradlew_cmd + ["build", "-x", "test"],
                 cwd=clone_dir,
@@ -187,8 +195,11 @@ def find_app_jar(clone_dir):
                     logging.error("Gradle fallback build also failed.")
                     return None
             
-            # Try again to find JAR
-            return find_app_jar(clone_dir)
+            # Try again to find JAR and keep it for the next run
+            jar_path = build_cache.find_built_jar(clone_dir)
+            if jar_path:
+                build_cache.store_jar(jar_path, source_hash)
+            return jar_path
         except Exception as e:
             logging.error(f"Failed to build with Gradle: {e}")
             return None
@@ -279,30 +290,23 @@ def find_java_files(clone_dir):
     main_java_files = []
     
     try:
-        for root, _, files in os.walk(clone_dir):
-            # Skip test directories
-            if 'test' in root.lower():
-                continue
-                
-            for file in files:
-                if file.endswith('.java'):
-                    file_path = os.path.join(root, file)
-                    
-                    # Check if file contains a main method
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            if 'public static void main(String[] args)' in content and 'SpringApplication.run' in content:
-                                main_java_files.append(file_path)
-                                logging.info(f"Found Spring Boot main class: {file_path}")
-                    except Exception as e:
-                        logging.warning(f"Error reading file {file_path}: {e}")
+        # Java files from the repository catalog, skipping test directories
+        for file_path in repo_catalog.java_files(clone_dir):
+            # Check if file contains a main method
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                    if 'public static void main(String[] args)' in content and 'SpringApplication.run' in content:
+                        main_java_files.append(file_path)
+                        logging.info(f"Found Spring Boot main class: {file_path}")
+            except Exception as e:
+                logging.warning(f"Error reading file {file_path}: {e}")
     except Exception as e:
         logging.error(f"Error searching for Java files: {e}")
     
     return main_java_files
 
-def run_spring_boot_directly(clone_dir, port, profile=None):
+def run_spring_boot_directly(clone_dir, port, profile=None, detach=False):
     """Run Spring Boot application directly using Java."""
     logging.info("Attempting to run Spring Boot application directly...")
     
@@ -367,21 +371,35 @@ def run_spring_boot_directly(clone_dir, port, profile=None):
             cmd.append(f"--spring.profiles.active={profile}")
         
         logging.info(f"Running Spring Boot application with command: {cmd}")
-        process = subprocess.Popen(
-            cmd,
-            cwd=clone_dir,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        if detach:
+            # A detached application outlives this process, so it writes its log itself
+            with log_pump.open_log_file() as log_file:
+                offset = log_file.tell()
+                process = subprocess.Popen(cmd, cwd=clone_dir, stdout=log_file, stderr=subprocess.STDOUT, text=True)
+            process.log_pump = log_pump.LogTail(process, offset=offset).start()
+        else:
+            process = subprocess.Popen(
+                cmd,
+                cwd=clone_dir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            )
+            
+            # Keep draining both pipes so a chatty application never blocks on a full buffer
+            process.log_pump = log_pump.LogPump(process).start()
         
         return process
     except Exception as e:
         logging.error(f"Error running Spring Boot directly: {e}")
         return None
 
-def start_app(jar_path, port, profile=None):
-    """Start the Spring Boot application."""
+def start_app(jar_path, port, profile=None, detach=False):
+    """Start the Spring Boot application.
+
+    A detached application writes its output straight to the log file instead
+    of pipes drained by this process.
+    """
     logging.info(f"Starting Spring Boot application on port {port}")
     
     # Check if Java is installed
@@ -405,12 +423,17 @@ def start_app(jar_path, port, profile=None):
     
     # Start the process
     try:
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        if detach:
+            with log_pump.open_log_file() as log_file:
+                offset = log_file.tell()
+                process = subprocess.Popen(cmd, stdout=log_file, stderr=subprocess.STDOUT, text=True)
+        else:
+            process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            )
         
         # Register cleanup function
         def cleanup():
@@ -422,34 +445,30 @@ def start_app(jar_path, port, profile=None):
                     process.kill()
         
         atexit.register(cleanup)
+        process.cleanup = cleanup
         signal.signal(signal.SIGINT, lambda sig, frame: (cleanup(), sys.exit(0)))
         signal.signal(signal.SIGTERM, lambda sig, frame: (cleanup(), sys.exit(0)))
         
+        # Drain stdout and stderr in the background (or follow the log file) and watch for the startup banner
+        pump = (log_pump.LogTail(process, offset=offset) if detach else log_pump.LogPump(process)).start()
+        process.log_pump = pump
+        
         # Wait for app to start
         logging.info("Waiting for application to start...")
-        ready = False
         timeout = 60  # 60 seconds
-        start_time = time.time()
+        ready = pump.wait_until_ready(timeout)
         
-        while not ready and time.time() - start_time < timeout:
-            if process.poll() is not None:
-                stdout, stderr = process.communicate()
-                logging.error("Application failed to start")
-                logging.error(f"STDOUT: {stdout}")
-                logging.error(f"STDERR: {stderr}")
-                return None
-            
-            line = process.stdout.readline()
-            if "Started " in line and "in" in line and "seconds" in line:
-                ready = True
-                logging.info("Application started successfully")
-            elif line:
-                print(line.strip())
-            
-            time.sleep(0.1)
+        if process.poll() is not None:
+            pump.stop()
+            logging.error("Application failed to start")
+            logging.error("Last application output:\n" + "\n".join(pump.tail()))
+            return None
         
-        if not ready:
+        if ready:
+            logging.info("Application started successfully")
+        else:
             logging.warning("Application might not have started properly")
+            logging.warning("Last application output:\n" + "\n".join(pump.tail(20)))
         
         return process
     except Exception as e:
@@ -501,8 +520,13 @@ def run_with_docker(clone_dir, port, profile=None):
     with open(dockerfile_path, 'r', encoding='utf-8') as f:
         dockerfile_content = f.read()
         
+    # Skip the JAR and image build when the image already matches the current sources and Dockerfile
+    image_name = "spring-boot-app:latest"
+    image_hash = build_cache.image_hash(build_cache.compute_source_hash(clone_dir), dockerfile_path)
+    image_current = build_cache.docker_image_is_current(image_name, image_hash)
+    
     # If Dockerfile copies from target directory, build the JAR first
-    if 'target/' in dockerfile_content or '.jar' in dockerfile_content:
+    if not image_current and ('target/' in dockerfile_content or '.jar' in dockerfile_content):
         logging.info("Dockerfile references JAR files. Building the JAR first...")
         
         # Check if target directory with JAR exists
@@ -525,28 +549,27 @@ def run_with_docker(clone_dir, port, profile=None):
                 logging.error("Failed to build JAR required by Docker. Cannot proceed.")
                 return None
     
-    # Build Docker image
-    image_name = "spring-boot-app:latest"
-    logging.info(f"Building Docker image {image_name}...")
-    
     try:
-        # Build the Docker image
-        build_result = subprocess.run(
-            ["docker", "build", "-t", image_name, "."],
-            cwd=clone_dir,
-            check=False,
-            capture_output=True,
-            text=True
-        )
-        
-        if build_result.returncode != 0:
-            logging.error(f"Failed to build Docker image: {build_result.stderr}")
-            return None
-        
-        logging.info("Docker image built successfully")
+        # Build the Docker image, labelled with the source hash it was built from
+        if not image_current:
+            logging.info(f"Building Docker image {image_name}...")
+            build_result = subprocess.run(
+                build_cache.docker_build_command(image_name, image_hash),
+                cwd=clone_dir,
+                check=False,
+                capture_output=True,
+                text=True,
+                env=build_cache.docker_build_env()
+            )
+            
+            if build_result.returncode != 0:
+                logging.error(f"Failed to build Docker image: {build_result.stderr}")
+                return None
+            
+            logging.info("Docker image built successfully")
         
         # Run the Docker container
-        container_name = "spring-boot-app-container"
+        container_name = app_lifecycle.container_name(port)
         
         # Stop and remove existing container if it exists
         subprocess.run(
@@ -799,16 +822,20 @@ def run_with_docker_compose(clone_dir, port, profile=None):
         logging.error(f"Error running with Docker Compose: {e}")
         return None
 
-def main():
+def main(argv=None):
     """Main function."""
     parser = argparse.ArgumentParser(description="Start Spring Boot application for testing")
-    parser.add_argument("--port", type=int, default=8080, help="Port to run the application on")
+    parser.add_argument("--port", type=int, help="Port to run the application on (default: 8080, or a free port if it is taken)")
+    parser.add_argument("--port-range", help="Pick the first free port from this range (e.g. 8080-8099)")
     parser.add_argument("--profile", help="Spring profile to activate")
     parser.add_argument("--jar", help="Path to JAR file (optional)")
     parser.add_argument("--direct", action="store_true", help="Try to run Spring Boot directly without building JAR")
     parser.add_argument("--docker", action="store_true", help="Try to run application with Docker if available")
     parser.add_argument("--debug", action="store_true", help="Print verbose debugging information")
-    args = parser.parse_args()
+    parser.add_argument("--detach", action="store_true", help="Return once the application is up instead of waiting for it to exit")
+    parser.add_argument("--no-reuse", action="store_true", help="Always start a new instance instead of reattaching to a running one")
+    parser.add_argument("--stop", action="store_true", help="Stop the recorded application instance and exit")
+    args = parser.parse_args(argv)
     
     # Set logging level
     if args.debug:
@@ -821,6 +848,27 @@ def main():
     
     logging.info(f"Using clone directory: {clone_dir}")
     
+    if args.stop:
+        app_lifecycle.teardown_instance()
+        return 0
+    
+    # Reattach to a healthy instance of the same build if an earlier stage started one
+    build_hash = app_lifecycle.current_build_hash(clone_dir)
+    if not args.no_reuse:
+        instance = app_lifecycle.find_reusable_instance(build_hash, args.port)
+        if instance:
+            config["api_base_url"] = instance["base_url"]
+            with open(CONFIG_FILE, "w", encoding="utf-8") as f:
+                json.dump(config, f, indent=4)
+            app_lifecycle.export_base_url(instance["base_url"])
+            logging.info(f"Application already running on port {instance['port']}")
+            return 0
+    
+    # Use the requested port or allocate a free one so several instances can run side by side
+    port = args.port or app_lifecycle.allocate_port(args.port_range)
+    if not port:
+        return 1
+    
     # Find JAR file
     jar_path = args.jar
     process = None
@@ -831,30 +879,43 @@ def main():
         os.path.exists(os.path.join(clone_dir, "docker-compose.yml"))
     ):
         logging.info("Docker configuration detected, trying Docker first...")
-        process = run_with_docker(clone_dir, args.port, args.profile)
+        process = run_with_docker(clone_dir, port, args.profile)
     
     # Try direct Java execution if no process yet and direct flag is set
     if not process and args.direct:
-        process = run_spring_boot_directly(clone_dir, args.port, args.profile)
+        process = run_spring_boot_directly(clone_dir, port, args.profile, detach=args.detach)
     
     # Find and use JAR file if no process yet
     if not process and not jar_path:
         jar_path = find_app_jar(clone_dir)
     
     if not process and jar_path:
-        process = start_app(jar_path, args.port, args.profile)
+        process = start_app(jar_path, port, args.profile, detach=args.detach)
     
     if not process:
         logging.error("Could not start application with any method.")
         return 1
     
     # Update config with API URL
-    config["api_base_url"] = f"http://localhost:{args.port}"
+    config["api_base_url"] = f"http://localhost:{port}"
     with open(CONFIG_FILE, "w", encoding="utf-8") as f:
         json.dump(config, f, indent=4)
     logging.info(f"Updated API base URL in {CONFIG_FILE}")
     
-    logging.info(f"Application running on port {args.port}")
+    app_lifecycle.record_instance(process, port, build_hash, config["api_base_url"])
+    app_lifecycle.export_base_url(config["api_base_url"])
+    
+    logging.info(f"Application running on port {port}")
+    if args.detach:
+        # Leave the application running for later stages; it writes its own log file
+        if hasattr(process, "log_pump"):
+            process.log_pump.stop()
+        if hasattr(process, "cleanup"):
+            atexit.unregister(process.cleanup)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        logging.info("Detaching; stop the application with 'start_app.py --stop'")
+        return 0
     logging.info("Press Ctrl+C to stop")
     
     # Keep running until interrupted
@@ -863,6 +924,7 @@ def main():
     except KeyboardInterrupt:
         pass
     
+    app_lifecycle.clear_instance()
     return 0
 
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Code builder for generated behave step modules.
+
+Step patterns come from feature text and may contain apostrophes, quotes
+and backslashes. Instead of concatenating them into hand-quoted decorator
+strings and repairing the result with line-by-line regex passes, the
+builder emits every string literal with repr(), so it is always correctly
+escaped, and validates the finished module once with ast.parse (as
+check_step_definitions.py does). Modules are only rewritten when their
+content changes.
+"""
+
+import os
+import ast
+import keyword
+import logging
+import textwrap
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+STEP_TYPES = ("given", "when", "then", "step")
+INDENT = "    "
+
+def step_decorator(step_type, pattern):
+    """A behave decorator line with a correctly escaped pattern literal."""
+    if step_type not in STEP_TYPES:
+        raise ValueError(f"Unknown step type: {step_type}")
+    return f"@behave.{step_type}(u{pattern!r})"
+
+def docstring_literal(text):
+    """A triple-quoted docstring literal for arbitrary text."""
+    text = text.replace("\\", "\\\\").replace('"""', '\\"\\"\\"')
+    if text.endswith('"'):
+        text = text[:-1] + '\\"'
+    return f'"""{text}"""'
+
+def python_identifier(name):
+    """Turn a name into a valid, non-keyword Python identifier."""
+    name = "".join(c if c.isalnum() or c == "_" else "_" for c in name) or "_"
+    if name[0].isdigit() or keyword.iskeyword(name):
+        name = f"_{name}"
+    return name
+
+def validate_source(source, filename="<generated>"):
+    """Parse generated source once; return True if it is valid Python."""
+    try:
+        ast.parse(source, filename=filename)
+        return True
+    except SyntaxError as e:
+        logging.error(f"Syntax error in generated {filename}: {e}")
+        logging.error(f"  Line {e.lineno}, Column {e.offset}")
+        logging.error(f"  {e.text}")
+        return False
+
+def write_module(path, source):
+    """Validate and write a generated module; an unchanged module is not rewritten.
+
+    Returns True if the file is up to date, False if the source is invalid.
+    """
+    if not validate_source(source, path):
+        return False
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == source:
+                logging.info(f"{path} is unchanged")
+                return True
+    except FileNotFoundError:
+        pass
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(source)
+    return True
+
+class StepModuleBuilder:
+    """Assemble a step module from a header, hand-written blocks and generated steps."""
+
+    def __init__(self, header=""):
+        self.parts = [header.rstrip("\n") + "\n"] if header else []
+        self.function_names = set()
+
+    def add_code(self, code):
+        """Add a hand-written block, e.g. a step implementation kept as source."""
+        self.parts.append(textwrap.dedent(code).strip("\n") + "\n")
+        return self
+
+    def add_comment(self, text):
+        """Add a section comment."""
+        self.parts.append(f"# {text}\n")
+        return self
+
+    def unique_function_name(self, name):
+        """A valid function name that is not yet used in this module."""
+        name = python_identifier(name)
+        candidate = name
+        suffix = 2
+        while candidate in self.function_names:
+            candidate = f"{name}_{suffix}"
+            suffix += 1
+        self.function_names.add(candidate)
+        return candidate
+
+    def add_step(self, step_type, pattern, func_name, params=None, body="pass", docstring=None):
+        """Add a decorated step function and return the function name used."""
+        func_name = self.unique_function_name(func_name)
+        args = ", ".join(["context"] + [python_identifier(p) for p in params or []])
+        lines = [step_decorator(step_type, pattern), f"def {func_name}({args}):"]
+        if docstring:
+            lines.append(textwrap.indent(docstring_literal(docstring), INDENT))
+        lines.append(textwrap.indent(textwrap.dedent(body).strip("\n"), INDENT))
+        self.parts.append("\n" + "\n".join(lines) + "\n")
+        return func_name
+
+    def build(self):
+        """Return the module source."""
+        return "\n".join(self.parts)
+
+    def write(self, path):
+        """Validate the module once and write it if it changed."""
+        return write_module(path, self.build())
@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+"""
+Per-endpoint request latency histograms for the BDD step layer.
+
+The step definitions call `requests` directly and only log status codes.
+Installing the hook wraps requests.Session.request so every call made by a
+step (including retries and calls that fail with a connection error) is
+recorded into an HDR-style histogram for its endpoint. At the end of a run
+the histograms are written as JSON and summarised in a short table, and two
+runs can be compared to spot latency regressions between commits:
+
+    python step_metrics.py compare reports/step_latency_old.json reports/step_latency.json
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+import threading
+from urllib.parse import urlsplit
+
+import requests
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+METRICS_FILE = os.path.join("summary", "bdd_test_cases", "reports", "step_latency.json")
+SIGNIFICANT_DIGITS = 2
+PERCENTILES = [50, 90, 95, 99]
+REGRESSION_THRESHOLD = 0.2
+
+# Path segments that identify a single resource are grouped into one endpoint
+ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F-]{32,36})$")
+
+_original_request = requests.Session.request
+_active = None
+
+class LatencyHistogram:
+    """HDR-style histogram of latencies in microseconds.
+
+    Values are bucketed to SIGNIFICANT_DIGITS significant decimal digits, so
+    memory stays constant while every percentile is within ~1% of the exact
+    value. Min, max and mean are tracked exactly.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.total_count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    @staticmethod
+    def bucket_of(value_us):
+        """Lowest value that shares the bucket of value_us."""
+        if value_us < 10 ** SIGNIFICANT_DIGITS:
+            return value_us
+        unit = 10 ** (int(math.log10(value_us)) - SIGNIFICANT_DIGITS + 1)
+        return (value_us // unit) * unit
+
+    @staticmethod
+    def bucket_width(bucket):
+        """Width of the bucket starting at `bucket`."""
+        if bucket < 10 ** SIGNIFICANT_DIGITS:
+            return 1
+        return 10 ** (int(math.log10(bucket)) - SIGNIFICANT_DIGITS + 1)
+
+    def record(self, value_ms):
+        """Record one latency in milliseconds."""
+        value_us = max(0, int(value_ms * 1000))
+        bucket = self.bucket_of(value_us)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total_count += 1
+        self.total_us += value_us
+        self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+        self.max_us = max(self.max_us, value_us)
+
+    def percentile(self, pct):
+        """Highest value equivalent to the given percentile, in milliseconds."""
+        if not self.total_count:
+            return 0.0
+        target = max(1, int(math.ceil(pct / 100.0 * self.total_count)))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return min(bucket + self.bucket_width(bucket) - 1, self.max_us) / 1000.0
+        return self.max_us / 1000.0
+
+    def to_dict(self):
+        """Summary plus raw buckets, suitable for JSON."""
+        summary = {
+            "count": self.total_count,
+            "min_ms": round((self.min_us or 0) / 1000.0, 3),
+            "mean_ms": round(self.total_us / self.total_count / 1000.0, 3) if self.total_count else 0.0,
+            "max_ms": round(self.max_us / 1000.0, 3)
+        }
+        for pct in PERCENTILES:
+            summary[f"p{pct}_ms"] = round(self.percentile(pct), 3)
+        summary["buckets_us"] = {str(bucket): count for bucket, count in sorted(self.counts.items())}
+        return summary
+
+class StepMetrics:
+    """Histograms, error and retry counts per endpoint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.errors = {}
+        self.retries = {}
+        self.last_attempt = threading.local()
+        self.started = time.time()
+
+    def record(self, endpoint, elapsed_ms, failed):
+        """Record one attempt; an attempt right after a failed one on the same endpoint is a retry."""
+        previous = getattr(self.last_attempt, "value", None)
+        with self.lock:
+            self.histograms.setdefault(endpoint, LatencyHistogram()).record(elapsed_ms)
+            if failed:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+            if previous == (endpoint, True):
+                self.retries[endpoint] = self.retries.get(endpoint, 0) + 1
+        self.last_attempt.value = (endpoint, failed)
+
+    def to_dict(self):
+        """All endpoint histograms with their error and retry counts."""
+        with self.lock:
+            endpoints = {}
+            for endpoint, histogram in sorted(self.histograms.items()):
+                stats = histogram.to_dict()
+                stats["errors"] = self.errors.get(endpoint, 0)
+                stats["retries"] = self.retries.get(endpoint, 0)
+                endpoints[endpoint] = stats
+        return {
+            "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "duration_s": round(time.time() - self.started, 2),
+            "endpoints": endpoints
+        }
+
+def endpoint_name(method, url):
+    """Group a request URL into an endpoint such as 'GET /api/v1/transactions/{id}/status'."""
+    segments = ["{id}" if ID_SEGMENT.match(s) else s for s in urlsplit(url).path.split("/")]
+    return f"{method.upper()} {'/'.join(segments) or '/'}"
+
+def _timed_request(session, method, url, **kwargs):
+    """Replacement for requests.Session.request while metrics are installed."""
+    endpoint = endpoint_name(method, url)
+    start = time.perf_counter()
+    try:
+        response = _original_request(session, method, url, **kwargs)
+    except requests.RequestException:
+        if _active:
+            _active.record(endpoint, (time.perf_counter() - start) * 1000, True)
+        raise
+    if _active:
+        _active.record(endpoint, (time.perf_counter() - start) * 1000, response.status_code >= 500)
+    return response
+
+def install(metrics=None):
+    """Start recording latencies for every request made through `requests`."""
+    global _active, _original_request
+    # before_all may run more than once in a process (e.g. per load-test user)
+    if metrics is None and _active is not None:
+        return _active
+    # Wrap whatever is installed now, e.g. an HTTP cassette, so both can be active
+    if requests.Session.request is not _timed_request:
+        _original_request = requests.Session.request
+    _active = metrics or StepMetrics()
+    requests.Session.request = _timed_request
+    return _active
+
+def uninstall():
+    """Stop recording and return the collected metrics."""
+    global _active
+    metrics = _active
+    if requests.Session.request is _timed_request:
+        requests.Session.request = _original_request
+    _active = None
+    return metrics
+
+def format_table(report, limit=None):
+    """Short text table of the slowest endpoints by p95."""
+    rows = sorted(report["endpoints"].items(), key=lambda item: item[1]["p95_ms"], reverse=True)
+    lines = [f"{'Endpoint':<50} {'Count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'Max ms':>8} {'Errors':>6} {'Retries':>7}"]
+    for endpoint, stats in rows[:limit]:
+        lines.append(f"{endpoint:<50} {stats['count']:>6} {stats['p50_ms']:>8} {stats['p95_ms']:>8} "
+                     f"{stats['p99_ms']:>8} {stats['max_ms']:>8} {stats['errors']:>6} {stats['retries']:>7}")
+    return "\n".join(lines)
+
+def dump(metrics, path=METRICS_FILE):
+    """Write the histograms as JSON and print the summary table."""
+    if metrics is None:
+        return None
+    report = metrics.to_dict()
+    report_dir = os.path.dirname(path)
+    if report_dir:
+        os.makedirs(report_dir, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("\nRequest latency per endpoint (slowest first):")
+    print(format_table(report))
+    logging.info(f"Request latency histograms written to {path}")
+    return report
+
+def compare(baseline_path, current_path, threshold=REGRESSION_THRESHOLD):
+    """Print p95 changes between two runs; return the endpoints that regressed."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["endpoints"]
+    with open(current_path, "r", encoding="utf-8") as f:
+        current = json.load(f)["endpoints"]
+
+    regressions = []
+    print(f"{'Endpoint':<50} {'Base p95':>9} {'New p95':>9} {'Change':>8}")
+    for endpoint, stats in sorted(current.items()):
+        if endpoint not in baseline:
+            print(f"{endpoint:<50} {'-':>9} {stats['p95_ms']:>9} {'new':>8}")
+            continue
+        old_p95 = baseline[endpoint]["p95_ms"]
+        change = (stats["p95_ms"] - old_p95) / old_p95 if old_p95 else 0.0
+        marker = " !" if change > threshold else ""
+        print(f"{endpoint:<50} {old_p95:>9} {stats['p95_ms']:>9} {change:>8.1%}{marker}")
+        if change > threshold:
+            regressions.append(endpoint)
+    return regressions
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Inspect BDD request latency histograms")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    show_parser = subparsers.add_parser("show", help="Print the summary table of a metrics file")
+    show_parser.add_argument("metrics", nargs="?", default=METRICS_FILE)
+    compare_parser = subparsers.add_parser("compare", help="Compare p95 latency of two metrics files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current", nargs="?", default=METRICS_FILE)
+    compare_parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Relative p95 increase that counts as a regression")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "show":
+            with open(args.metrics, "r", encoding="utf-8") as f:
+                print(format_table(json.load(f)))
+            return 0
+        regressions = compare(args.baseline, args.current, args.threshold)
+    except (FileNotFoundError, json.JSONDecodeError, KeyError) as e:
+        logging.error(f"Could not read metrics: {e}")
+        return 1
+
+    if regressions:
+        logging.warning(f"{len(regressions)} endpoints regressed by more than {args.threshold:.0%} at p95")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
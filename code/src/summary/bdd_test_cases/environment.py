@@ -1,8 +1,26 @@
 
+import os
+import sys
+import time
 import logging
+import importlib
 import requests
-import time
-import sys
+
+def optional_import(name):
+    """The named module, or None when it cannot be imported."""
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+# Optional record/replay of HTTP traffic (HTTP_CASSETTE_MODE=record|replay)
+http_cassette = optional_import("http_cassette")
+# Optional per-endpoint request latency histograms
+step_metrics = optional_import("step_metrics")
+# Optional per-step/per-scenario time budgets and fail-fast (see bdd_budget.py)
+bdd_budget = optional_import("bdd_budget")
+# Optional pre-seeded account pool shared across scenarios (see account_pool.py)
+account_pool = optional_import("account_pool")
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -10,24 +28,72 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 
 def before_all(context):
     """Setup the environment before all tests."""
-    # Set base URL for API requests
-    context.base_url = "http://localhost:8080/api/v1"
+    # Record or replay HTTP traffic instead of only talking to the live API
+    context.cassette = http_cassette.install_from_env() if http_cassette else None
+    
+    # Time every request the steps make, including retries and connection errors
+    context.step_metrics = step_metrics.install() if step_metrics else None
+    # Bound every request by the step and scenario budgets set by the runner
+    if bdd_budget:
+        bdd_budget.install()
+    
+    # Set base URL for API requests (behave -D base_url=... or API_BASE_URL from the launcher)
+    context.base_url = context.config.userdata.get(
+        "base_url", os.environ.get("API_BASE_URL", "http://localhost:8080/api/v1")
+    )
     
     # Verify API is accessible
+    api_available = False
     max_retries = 5
     for i in range(max_retries):
         try:
             response = requests.get(context.base_url)
             logging.info(f"API is accessible at {context.base_url}")
+            api_available = True
             break
-        except requests.exceptions.ConnectionError:
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
             if i < max_retries - 1:
                 logging.warning(f"Could not access API, retrying in 5 seconds ({i+1}/{max_retries})")
                 time.sleep(5)
             else:
                 logging.warning(f"Could not access API at {context.base_url} after {max_retries} attempts")
                 logging.warning("Some tests may fail if the API is not running")
+    
+    # Seed the account pool once the API answers; the steps check accounts out instead of creating them
+    use_pool = account_pool and api_available and not getattr(context, "mock_api", False)
+    context.account_pool = account_pool.install(context) if use_pool else None
+
+def before_scenario(context, scenario):
+    """Start the scenario time budget."""
+    if bdd_budget:
+        bdd_budget.before_scenario(context, scenario)
+
+def before_step(context, step):
+    """Start the step time budget."""
+    if bdd_budget:
+        bdd_budget.before_step(context, step)
+
+def after_step(context, step):
+    """Record steps that ran out of time."""
+    if bdd_budget:
+        bdd_budget.after_step(context, step)
+
+def after_scenario(context, scenario):
+    """Count failures for --fail-fast/--max-failures."""
+    if account_pool:
+        account_pool.after_scenario(context, scenario)
+    if bdd_budget:
+        bdd_budget.after_scenario(context, scenario)
 
 def after_all(context):
     """Clean up after all tests."""
+    if account_pool:
+        account_pool.after_all(context)
+    if bdd_budget:
+        bdd_budget.after_all(context)
+    if context.step_metrics:
+        step_metrics.uninstall()
+        step_metrics.dump(context.step_metrics, os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports", "step_latency.json"))
+    if context.cassette:
+        http_cassette.uninstall()
     logging.info("All tests completed")
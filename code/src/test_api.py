@@ -3,10 +3,13 @@
 Simple test script to validate the banking API
 """
 
+import os
 import requests
 import json
 import logging
 import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(
@@ -15,8 +18,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger("APITest")
 
-# Define base API URL
-BASE_URL = "http://localhost:8080/api/v1"
+# Define base API URL (API_BASE_URL is exported by the launchers when the app runs on another port)
+BASE_URL = os.environ.get("API_BASE_URL", "http://localhost:8080/api/v1")
+
+# Independent requests (e.g. the balances of two accounts) are sent concurrently unless --sequential is given
+CONCURRENT = True
 
 def test_create_account():
     """Test creating a bank account"""
@@ -87,6 +93,13 @@ def test_check_balance(account):
         logger.error(f"Response: {response.text}")
         return None
 
+def check_balances(*accounts):
+    """Check the balances of several accounts, concurrently unless --sequential was given"""
+    if not CONCURRENT or len(accounts) < 2:
+        return [test_check_balance(account) for account in accounts]
+    with ThreadPoolExecutor(max_workers=len(accounts)) as executor:
+        return list(executor.map(test_check_balance, accounts))
+
 def test_deposit(account, amount):
     """Test depositing money"""
     logger.info(f"Testing deposit of {amount}...")
@@ -194,9 +207,8 @@ def test_transaction(source_account, target_account, amount):
     """Test making a transaction between accounts"""
     logger.info(f"Testing transaction of {amount} from {source_account['accountNumber']} to {target_account['accountNumber']}...")
     
-    # Get current balances first
-    source_initial = test_check_balance(source_account)
-    target_initial = test_check_balance(target_account)
+    # Get current balances first (the two checks are independent)
+    source_initial, target_initial = check_balances(source_account, target_account)
     
     if not source_initial or not target_initial:
         logger.error("Could not get initial balances")
@@ -236,8 +248,7 @@ def test_transaction(source_account, target_account, amount):
         logger.info(f"Transaction successful: {response.text}")
         
         # Check new balances
-        source_data = test_check_balance(source_account)
-        target_data = test_check_balance(target_account)
+        source_data, target_data = check_balances(source_account, target_account)
         
         if source_data and target_data:
             source_expected = source_initial_balance - amount
@@ -271,6 +282,34 @@ def test_transaction(source_account, target_account, amount):
 
 def main():
     """Main test function"""
+    global BASE_URL, CONCURRENT
+    parser = argparse.ArgumentParser(description="Validate the banking API")
+    parser.add_argument("--mock", action="store_true", help="Run against the in-process mock API server instead of a running app")
+    parser.add_argument("--record", metavar="CASSETTE", help="Record requests and responses to this cassette file")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Replay responses from this cassette file instead of calling the API")
+    parser.add_argument("--sequential", action="store_true", help="Send independent requests one after another instead of concurrently")
+    args = parser.parse_args()
+    CONCURRENT = not args.sequential
+    
+    if args.mock:
+        import mock_api_server
+        BASE_URL = mock_api_server.start_in_background().base_url
+    
+    if args.record or args.replay:
+        import http_cassette
+        if args.record:
+            http_cassette.install(http_cassette.RECORD, args.record)
+        else:
+            http_cassette.install(http_cassette.REPLAY, args.replay)
+    
+    try:
+        return run_tests()
+    finally:
+        if args.record or args.replay:
+            http_cassette.uninstall()
+
+def run_tests():
+    """Run the API checks in order"""
     try:
         # Test application connectivity
         try:
@@ -302,8 +341,15 @@ def main():
         if not test_withdraw(account1, withdraw_amount):
             return 1
         
-        # Skip transaction test for now
-        logger.info("Skipping transaction test as it's not working correctly")
+        # Test transaction to a second account
+        account2 = test_create_account()
+        if not account2:
+            return 1
+        
+        transaction_amount = 100.0
+        logger.info(f"Transferring {transaction_amount} to account {account2['accountNumber']}...")
+        if not test_transaction(account1, account2, transaction_amount):
+            return 1
         
         logger.info("All tests passed successfully!")
         logger.info(f"Final account balance: {account1['currentBalance']}")
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+"""
+Test impact selection for the generated BDD suite.
+
+Maps every feature file in summary/bdd_test_cases to the API endpoints it
+exercises (from the "# BDD Test Cases for METHOD path" header, the
+'"METHOD" request to "path"' steps and, as a fallback, the file name) and
+persists the map in code_index/feature_map.json. Only feature files whose
+size or modification time changed are re-read, so selecting is instant.
+
+update_from_git.py and generate_artifacts.py record the endpoints changed by
+the last update in code_index/changed_endpoints.json. select_features turns
+that set into the behave locations to run: every impacted feature file, plus
+the scenarios tagged with the smoke tag in the remaining files.
+"""
+
+import os
+import re
+import sys
+import json
+import logging
+import argparse
+from datetime import datetime
+
+import endpoint_catalog
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Constants
+INDEX_DIR = "code_index"
+FEATURE_MAP_FILE = os.path.join(INDEX_DIR, "feature_map.json")
+CHANGED_ENDPOINTS_FILE = os.path.join(INDEX_DIR, "changed_endpoints.json")
+BDD_DIR = os.path.join("summary", "bdd_test_cases")
+DEFAULT_SMOKE_TAG = "smoke"
+
+HEADER_PATTERN = re.compile(r"^#\s*BDD Test Cases for\s+([A-Za-z]+)\s+(\S+)")
+STEP_REQUEST_PATTERN = re.compile(r'"(GET|POST|PUT|DELETE|PATCH)"\s+request\s+to\s+"([^"]+)"', re.IGNORECASE)
+FILENAME_PATTERN = re.compile(r"^(GET|POST|PUT|DELETE|PATCH)_(.+)\.feature$", re.IGNORECASE)
+SCENARIO_PATTERN = re.compile(r"^(Scenario|Scenario Outline|Scenario Template|Example):")
+
+def endpoint_id(http_method, path):
+    """Canonical endpoint id, e.g. 'POST_api_v1_accounts'."""
+    path = path.strip().strip("/").replace("/", "_")
+    return f"{http_method.upper()}_{path}"
+
+def normalize_endpoint(endpoint):
+    """Accept (method, path) tuples, 'METHOD_path' ids and 'METHOD path' strings."""
+    if isinstance(endpoint, (tuple, list)):
+        return endpoint_id(endpoint[0], endpoint[1])
+    separator = " " if " " in endpoint.strip() else "_"
+    http_method, _, path = endpoint.strip().partition(separator)
+    return endpoint_id(http_method, path)
+
+def parse_feature(feature_file):
+    """Return the endpoints a feature file exercises and its tagged scenario lines."""
+    endpoints = set()
+    tags = {}
+    pending_tags = []
+    with open(feature_file, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            stripped = line.strip()
+            header = HEADER_PATTERN.match(stripped)
+            if header:
+                endpoints.add(endpoint_id(header.group(1), header.group(2)))
+                continue
+            if stripped.startswith("#"):
+                continue
+            if stripped.startswith("@"):
+                pending_tags.extend(tag.lstrip("@") for tag in stripped.split() if tag.startswith("@"))
+                continue
+            if stripped.startswith("Feature:"):
+                # Feature-level tags select the whole file, recorded as line 0
+                for tag in pending_tags:
+                    tags.setdefault(tag, []).append(0)
+                pending_tags = []
+            elif SCENARIO_PATTERN.match(stripped):
+                for tag in pending_tags:
+                    tags.setdefault(tag, []).append(line_number)
+                pending_tags = []
+            for http_method, path in STEP_REQUEST_PATTERN.findall(stripped):
+                endpoints.add(endpoint_id(http_method, path))
+
+    if not endpoints:
+        match = FILENAME_PATTERN.match(os.path.basename(feature_file))
+        if match:
+            endpoints.add(f"{match.group(1).upper()}_{match.group(2)}")
+    return sorted(endpoints), tags
+
+def load_feature_map(map_file=FEATURE_MAP_FILE):
+    """Load the persisted feature map; a missing or corrupt file is an empty map."""
+    try:
+        with open(map_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"features": {}}
+
+def build_feature_map(bdd_dir=BDD_DIR, map_file=FEATURE_MAP_FILE, rebuild=False):
+    """Refresh the feature map, re-reading only feature files that changed."""
+    feature_map = {"features": {}} if rebuild else load_feature_map(map_file)
+    cached = feature_map.get("features", {})
+    features = {}
+    reparsed = 0
+
+    for file in sorted(os.listdir(bdd_dir)) if os.path.isdir(bdd_dir) else []:
+        if not file.endswith(".feature"):
+            continue
+        feature_file = os.path.join(bdd_dir, file)
+        stat = os.stat(feature_file)
+        entry = cached.get(file)
+        if entry and entry.get("mtime") == stat.st_mtime and entry.get("size") == stat.st_size:
+            features[file] = entry
+            continue
+        try:
+            endpoints, tags = parse_feature(feature_file)
+        except (OSError, UnicodeDecodeError) as e:
+            logging.warning(f"Could not read feature file {feature_file}: {e}")
+            continue
+        features[file] = {"mtime": stat.st_mtime, "size": stat.st_size, "endpoints": endpoints, "tags": tags}
+        reparsed += 1
+
+    feature_map = {"bdd_dir": os.path.abspath(bdd_dir), "features": features}
+    if reparsed or set(features) != set(cached):
+        os.makedirs(os.path.dirname(map_file), exist_ok=True)
+        with open(map_file, "w", encoding="utf-8") as f:
+            json.dump(feature_map, f, indent=2)
+        logging.info(f"Feature map updated ({reparsed} of {len(features)} feature files re-read)")
+    return feature_map
+
+def record_changed_endpoints(endpoints, commit=None, changed_file=CHANGED_ENDPOINTS_FILE):
+    """Persist the endpoints changed by the latest update for the next selective run."""
+    data = {
+        "commit": commit,
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "endpoints": sorted({normalize_endpoint(e) for e in endpoints})
+    }
+    os.makedirs(os.path.dirname(changed_file), exist_ok=True)
+    with open(changed_file, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    logging.info(f"Recorded {len(data['endpoints'])} changed endpoints in {changed_file}")
+    return data["endpoints"]
+
+def load_changed_endpoints(changed_file=CHANGED_ENDPOINTS_FILE):
+    """Endpoints recorded by the latest update, or None when nothing was recorded."""
+    try:
+        with open(changed_file, "r", encoding="utf-8") as f:
+            return json.load(f).get("endpoints", [])
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def select_features(bdd_dir=BDD_DIR, changed_endpoints=None, smoke_tag=DEFAULT_SMOKE_TAG, map_file=FEATURE_MAP_FILE):
+    """Return behave locations for impacted features plus smoke scenarios elsewhere.
+
+    Returns None when no change set is available or none of its endpoints
+    is known, meaning the full suite should run.
+    """
+    if changed_endpoints is None:
+        changed_endpoints = load_changed_endpoints()
+        if changed_endpoints is None:
+            return None
+    changed = {normalize_endpoint(e) for e in changed_endpoints}
+    features = build_feature_map(bdd_dir, map_file)["features"]
+
+    # Ids that match no known endpoint select nothing; run everything rather than nothing
+    known = {endpoint["id"] for endpoint in endpoint_catalog.load_catalog()}
+    known.update(endpoint for entry in features.values() for endpoint in entry.get("endpoints", []))
+    if changed and not changed & known:
+        logging.warning(f"None of the {len(changed)} changed endpoints is a known endpoint; the full suite should run")
+        return None
+
+    selected = []
+    smoke = []
+    for file, entry in sorted(features.items()):
+        feature_file = os.path.join(bdd_dir, file)
+        if changed.intersection(entry.get("endpoints", [])):
+            selected.append(feature_file)
+            continue
+        lines = entry.get("tags", {}).get(smoke_tag, []) if smoke_tag else []
+        if 0 in lines:
+            smoke.append(feature_file)
+        elif lines:
+            smoke.append(feature_file + "".join(f":{line}" for line in sorted(lines)))
+
+    logging.info(f"Selected {len(selected)} impacted feature files and {len(smoke)} with @{smoke_tag} scenarios "
+                 f"out of {len(features)} for {len(changed)} changed endpoints")
+    return selected + smoke
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Select the BDD feature files impacted by changed endpoints")
+    parser.add_argument("--bdd-dir", default=BDD_DIR, help="Directory with the feature files")
+    parser.add_argument("--smoke-tag", default=DEFAULT_SMOKE_TAG, help="Also run scenarios with this tag (empty to disable)")
+    parser.add_argument("--rebuild", action="store_true", help="Re-read every feature file instead of only changed ones")
+    parser.add_argument("endpoint", nargs="*", help="Changed endpoints such as 'POST api/v1/accounts' (default: the recorded change set)")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        build_feature_map(args.bdd_dir, rebuild=True)
+    selection = select_features(args.bdd_dir, args.endpoint or None, args.smoke_tag)
+    if selection is None:
+        logging.info("No recorded change set; the full suite would run")
+        return 0
+    for location in selection:
+        print(location)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
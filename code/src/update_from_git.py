@@ -18,6 +18,9 @@ import re
 import copy
 from datetime import datetime
 
+import test_selection
+import endpoint_catalog
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 # Define constants
@@ -49,6 +52,14 @@ def pull_latest_changes(repo_dir):
         logging.error(f"Error pulling latest changes: {e}")
         return None
 
+def get_head_commit(repo_dir):
+    """Return the HEAD commit of the cloned repository, or None."""
+    try:
+        return git.Repo(repo_dir).head.commit.hexsha
+    except Exception as e:
+        logging.debug(f"Could not read HEAD commit of {repo_dir}: {e}")
+        return None
+
 def backup_api_flow():
     """Make a backup of the current API flow file."""
     if not os.path.exists(API_FLOW_FILE):
@@ -83,79 +94,47 @@ def load_api_flow(file_path):
         logging.error(f"Error loading API flow from {file_path}: {e}")
         return {}
 
+def catalog_by_endpoint(api_flow):
+    """Endpoint catalog records of API flow data keyed by (HTTP method, full path)."""
+    return {(e["method"], e["path"]): e for e in endpoint_catalog.endpoints_from_api_flow(api_flow)}
+
 def identify_changed_endpoints(old_api_flow, new_api_flow):
     """Identify endpoints that have been added or modified based on API flow data."""
+    old_endpoints = catalog_by_endpoint(old_api_flow)
     changed_endpoints = []
-    
-    # Check for new or modified endpoints
-    for path, new_data in new_api_flow.items():
-        if path not in old_api_flow:
-            # This is a completely new path
-            logging.info(f"New API path detected: {path}")
-            for endpoint in new_data.get("endpoints", []):
-                http_method = endpoint.get("http_method", "GET")
-                changed_endpoints.append((http_method, path))
-                logging.info(f"Added new endpoint: {http_method} {path}")
-        else:
-            # Path exists, check if endpoints are new or modified
-            old_endpoints = {(e.get("http_method", "GET"), e.get("method", "")): e 
-                            for e in old_api_flow[path].get("endpoints", [])}
-            
-            for new_endpoint in new_data.get("endpoints", []):
-                http_method = new_endpoint.get("http_method", "GET")
-                method_name = new_endpoint.get("method", "")
-                key = (http_method, method_name)
-                
-                if key not in old_endpoints:
-                    # New endpoint method in existing path
-                    changed_endpoints.append((http_method, path))
-                    logging.info(f"Added new endpoint method: {http_method} {path}")
-                else:
-                    # Compare endpoint details to detect changes
-                    old_endpoint = old_endpoints[key]
-                    # Check for changes in controller class, parameters, or other attributes
-                    if (new_endpoint.get("class", "") != old_endpoint.get("class", "") or
-                        new_endpoint.get("parameters", []) != old_endpoint.get("parameters", [])):
-                        changed_endpoints.append((http_method, path))
-                        logging.info(f"Modified endpoint: {http_method} {path}")
-    
-    # Deduplicate the list of changed endpoints
-    unique_endpoints = list(set(changed_endpoints))
-    logging.info(f"Found {len(unique_endpoints)} changed or new endpoints")
-    return unique_endpoints
+    unchanged = 0
+    
+    for key, new_endpoint in catalog_by_endpoint(new_api_flow).items():
+        old_endpoint = old_endpoints.get(key)
+        if old_endpoint is None:
+            changed_endpoints.append(key)
+            logging.info(f"Added new endpoint: {key[0]} {key[1]}")
+        # The structural fingerprint (handler AST, DTO shapes, service signatures) decides when both sides have one
+        elif old_endpoint.get("fingerprint") and new_endpoint.get("fingerprint"):
+            if new_endpoint["fingerprint"] != old_endpoint["fingerprint"]:
+                changed_endpoints.append(key)
+                logging.info(f"Modified endpoint: {key[0]} {key[1]}")
+            else:
+                unchanged += 1
+        # Otherwise check for changes in the controller, its parameters or the services it calls
+        elif any(new_endpoint[field] != old_endpoint[field] for field in ("controller", "controller_method", "params", "service_chain")):
+            changed_endpoints.append(key)
+            logging.info(f"Modified endpoint: {key[0]} {key[1]}")
+    
+    if unchanged:
+        logging.info(f"Skipped {unchanged} endpoints whose structural fingerprint did not change")
+    logging.info(f"Found {len(changed_endpoints)} changed or new endpoints")
+    return changed_endpoints
 
 def identify_deleted_endpoints(old_api_flow, new_api_flow):
     """Identify endpoints that have been deleted based on API flow data."""
-    deleted_endpoints = []
-    
-    # Check for deleted paths
-    for path, old_data in old_api_flow.items():
-        if path not in new_api_flow:
-            # This path has been completely removed
-            logging.info(f"Deleted API path detected: {path}")
-            for endpoint in old_data.get("endpoints", []):
-                http_method = endpoint.get("http_method", "GET")
-                deleted_endpoints.append((http_method, path))
-                logging.info(f"Removed endpoint: {http_method} {path}")
-        else:
-            # Path exists, check if endpoints were removed
-            new_endpoints = {(e.get("http_method", "GET"), e.get("method", "")) 
-                            for e in new_api_flow[path].get("endpoints", [])}
-            
-            for old_endpoint in old_data.get("endpoints", []):
-                http_method = old_endpoint.get("http_method", "GET")
-                method_name = old_endpoint.get("method", "")
-                key = (http_method, method_name)
-                
-                if key not in new_endpoints:
-                    # This endpoint method was removed
-                    deleted_endpoints.append((http_method, path))
-                    logging.info(f"Removed endpoint method: {http_method} {path}")
-    
-    # Deduplicate the list of deleted endpoints
-    unique_deleted = list(set(deleted_endpoints))
-    logging.info(f"Found {len(unique_deleted)} deleted endpoints")
-    return unique_deleted
+    new_endpoints = catalog_by_endpoint(new_api_flow)
+    deleted_endpoints = [key for key in catalog_by_endpoint(old_api_flow) if key not in new_endpoints]
+    for http_method, path in deleted_endpoints:
+        logging.info(f"Removed endpoint: {http_method} {path}")
+    
+    logging.info(f"Found {len(deleted_endpoints)} deleted endpoints")
+    return deleted_endpoints
 
 def normalize_endpoint_path(endpoint_path):
     """Normalize an endpoint path for feature file naming."""
@@ -234,6 +213,8 @@ import os
 import json
 import logging
 from generate_artifacts import read_prompt_file, call_openai_api
+import endpoint_catalog
+import prompt_builder
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -246,8 +227,7 @@ def generate_feature_file(feature_file, http_method, endpoint_path):
         logging.error("Failed to read BDD test case template.")
         return False
     
-    # Extract endpoint information from API flow data
-    api_flow_file = os.path.join("code_index", "api_flow.json")
+    # Extract endpoint information from the endpoint catalog
     endpoint_info = {
         "path": endpoint_path,
         "method": http_method,
@@ -255,32 +235,19 @@ def generate_feature_file(feature_file, http_method, endpoint_path):
         "controller_method": "",
         "service_calls": []
     }
-    
-    # Get more detailed information from the API flow file
-    if os.path.exists(api_flow_file):
-        try:
-            with open(api_flow_file, 'r', encoding='utf-8') as f:
-                api_flow_data = json.load(f)
-            
-            if endpoint_path in api_flow_data:
-                endpoint_data = api_flow_data[endpoint_path]
-                # Find the specific endpoint method
-                for endpoint in endpoint_data.get("endpoints", []):
-                    if endpoint.get("http_method", "").upper() == http_method.upper():
-                        endpoint_info = {
-                            "path": endpoint_path,
-                            "method": http_method,
-                            "controller": endpoint.get("class", ""),
-                            "controller_method": endpoint.get("method", ""),
-                            "parameters": endpoint.get("parameters", []),
-                            "service_calls": endpoint_data.get("service_calls", [])
-                        }
-                        break
-        except Exception as e:
-            logging.error(f"Error reading API flow data: {e}")
-    
-    # Prepare the prompt with endpoint information
-    prompt = f"{bdd_template}\\n\\nAPI Endpoint Information:\\n```json\\n{json.dumps(endpoint_info, indent=2)}\\n```"
+    endpoint = endpoint_catalog.find(http_method, endpoint_path)
+    if endpoint:
+        endpoint_info = {
+            "path": endpoint_path,
+            "method": http_method,
+            "controller": endpoint["controller"],
+            "controller_method": endpoint["controller_method"],
+            "parameters": endpoint["params"],
+            "service_calls": endpoint["service_chain"]
+        }
+    
+    # Prepare the prompt with endpoint information and index facts within the token budget
+    prompt = prompt_builder.build_bdd_prompt(bdd_template, endpoint_info, endpoint["dto_types"] if endpoint else [])
     
     # Call OpenAI API to generate test cases
     test_cases = call_openai_api(prompt)
@@ -359,6 +326,8 @@ import os
 import json
 import logging
 from generate_artifacts import read_prompt_file, call_openai_api
+import endpoint_catalog
+import prompt_builder
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -371,8 +340,7 @@ def update_feature_file(feature_file, http_method, endpoint_path):
         logging.error("Failed to read BDD test case template.")
         return False
     
-    # Extract endpoint information from API flow data
-    api_flow_file = os.path.join("code_index", "api_flow.json")
+    # Extract endpoint information from the endpoint catalog
     endpoint_info = {
         "path": endpoint_path,
         "method": http_method,
@@ -380,32 +348,19 @@ def update_feature_file(feature_file, http_method, endpoint_path):
         "controller_method": "",
         "service_calls": []
     }
-    
-    # Get more detailed information from the API flow file
-    if os.path.exists(api_flow_file):
-        try:
-            with open(api_flow_file, 'r', encoding='utf-8') as f:
-                api_flow_data = json.load(f)
-            
-            if endpoint_path in api_flow_data:
-                endpoint_data = api_flow_data[endpoint_path]
-                # Find the specific endpoint method
-                for endpoint in endpoint_data.get("endpoints", []):
-                    if endpoint.get("http_method", "").upper() == http_method.upper():
-                        endpoint_info = {
-                            "path": endpoint_path,
-                            "method": http_method,
-                            "controller": endpoint.get("class", ""),
-                            "controller_method": endpoint.get("method", ""),
-                            "parameters": endpoint.get("parameters", []),
-                            "service_calls": endpoint_data.get("service_calls", [])
-                        }
-                        break
-        except Exception as e:
-            logging.error(f"Error reading API flow data: {e}")
-    
-    # Prepare the prompt with endpoint information
-    prompt = f"{bdd_template}\\n\\nAPI Endpoint Information:\\n```json\\n{json.dumps(endpoint_info, indent=2)}\\n```"
+    endpoint = endpoint_catalog.find(http_method, endpoint_path)
+    if endpoint:
+        endpoint_info = {
+            "path": endpoint_path,
+            "method": http_method,
+            "controller": endpoint["controller"],
+            "controller_method": endpoint["controller_method"],
+            "parameters": endpoint["params"],
+            "service_calls": endpoint["service_chain"]
+        }
+    
+    # Prepare the prompt with endpoint information and index facts within the token budget
+    prompt = prompt_builder.build_bdd_prompt(bdd_template, endpoint_info, endpoint["dto_types"] if endpoint else [])
     
     # Call OpenAI API to generate test cases
     test_cases = call_openai_api(prompt)
@@ -671,6 +626,9 @@ def main():
     # Also identify deleted endpoints
     deleted_endpoints = identify_deleted_endpoints(old_api_flow, new_api_flow)
     
+    # Remember the change set so the next BDD run can select only impacted features
+    test_selection.record_changed_endpoints(changed_endpoints, get_head_commit(clone_dir))
+    
     if not changed_endpoints and not deleted_endpoints:
         logging.info("No endpoints have been changed or deleted. Nothing to update.")
         return 0